@@ -1,17 +1,77 @@
 from __future__ import annotations
 
-from decimal import Decimal, getcontext
-from typing import Union
+import threading
+from time import time_ns
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Optional, Union
 
 from bank_app.logger import log_exc
+from .ledger import DEPOSIT, WITHDRAWAL, Ledger
 
-getcontext()
+Money = Union[int, float, str, Decimal]
+
+CENT = Decimal("0.01")
+
+# Accounts share a fixed pool of locks instead of carrying one each
+LOCK_STRIPES = 4096
+_LOCKS = tuple(threading.RLock() for _ in range(LOCK_STRIPES))
+
+
+def to_cents(amount: Money) -> int:
+    """
+    Convert an amount of money to a whole number of cents, rounding half a cent up.
+    Floats are read through their shortest repr, so 0.1 is exactly 10 cents.
+    :param amount: The amount of money
+    :return: The amount in cents
+    """
+    if type(amount) is int:
+        return amount * 100
+
+    if type(amount) is float and -1e9 < amount < 1e9:
+        scaled = amount * 100
+        cents = round(scaled)
+        # Only amounts close to half a cent need the exact decimal rounding below
+        if abs(abs(scaled - cents) - 0.5) > 1e-6:
+            return cents
+
+    try:
+        value = Decimal(repr(amount) if isinstance(amount, float) else amount)
+        return int(value.quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2))
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"Invalid amount: {amount!r}") from None
 
 
 class Account:
-    def __init__(self, account_number: int, balance: Union[int, float] = 0):
+    __slots__ = ("account_number", "_cents", "dirty", "_ledger")
+
+    def __init__(self, account_number: int, balance: Money = 0):
         self.account_number = account_number
-        self.__balance = Decimal(balance)
+        self._cents = to_cents(balance)
+        self.dirty = True
+        self._ledger = None
+
+    @property
+    def lock(self) -> threading.RLock:
+        """
+        Lock that guards the balance, shared with the accounts whose numbers fall in the same stripe
+        """
+        return _LOCKS[hash(self.account_number) % LOCK_STRIPES]
+
+    @classmethod
+    def from_cents(cls, account_number: int, cents: int) -> Account:
+        """
+        Create an account with a balance in cents
+        :param account_number: Account number of the account
+        :param cents: Balance in cents
+        :return: The account
+        """
+        # Skips converting a balance in __init__, loading creates one account per saved account
+        account = cls.__new__(cls)
+        account.account_number = account_number
+        account._cents = cents
+        account.dirty = True
+        account._ledger = None
+        return account
 
     @property
     def balance(self) -> float:
@@ -19,37 +79,74 @@ class Account:
         Get the balance to be presented to the user, not to be used for arithmetic operations.
         :return: Balance represented as a float with 2 decimals of precision
         """
-        return float(round(self.__balance, 2))
+        return self._cents / 100
+
+    @property
+    def cents(self) -> int:
+        """
+        Get the exact balance
+        :return: Balance in cents
+        """
+        return self._cents
+
+    @property
+    def ledger(self) -> Ledger:
+        """
+        Transactions of the account since it was created or loaded, created on first use
+        """
+        if self._ledger is None:
+            self._ledger = Ledger()
+        return self._ledger
 
     @log_exc(exc=ValueError, return_value=False)
-    def balance_add(self, amount: Union[int, float]) -> bool:
+    def balance_add(self, amount: Money) -> bool:
         """
         Add an amount to the current account balance
         :param amount: Amount to be added
         :return: True if successful else False
         """
-        if amount <= 0:
+        cents = to_cents(amount)
+        if cents <= 0:
             raise ValueError(f"Amount: {amount} <= 0")
 
-        self.__balance = self.__balance + Decimal(amount)
-        return True
+        return self._apply(cents)
 
     @log_exc(exc=ValueError, return_value=False)
-    def balance_sub(self, amount: Union[int, float]) -> bool:
+    def balance_sub(self, amount: Money) -> bool:
         """
         Subtract an amount from the current account balance
         :param amount: Amount to be subtracted
         :return: True if successful else False
         """
-        if amount <= 0:
+        cents = to_cents(amount)
+        if cents <= 0:
             raise ValueError(f"Amount: {amount} <= 0")
 
-        if amount > self.__balance:
+        if not self._apply(-cents):
             raise ValueError(f"Amount: {amount} > {self.balance}")
-
-        self.__balance = self.__balance - Decimal(amount)
         return True
 
+    def _apply(self, cents: int, kind: Optional[int] = None) -> bool:
+        """
+        Add a signed amount unless the balance would become negative, without logging
+        :param cents: Amount in cents to be added, negative to subtract
+        :param kind: Kind of the transaction in the ledger, a deposit or withdrawal by the sign if not specified
+        :return: True if successful else False
+        """
+        with self.lock:
+            balance = self._cents + cents
+            if balance < 0:
+                return False
+
+            self._cents = balance
+            self.dirty = True
+            if (ledger := self._ledger) is None:
+                ledger = self._ledger = Ledger()
+            if kind is None:
+                kind = DEPOSIT if cents > 0 else WITHDRAWAL
+            ledger.append(time_ns() // 1000, cents, balance, kind)
+            return True
+
     def check_account_number(self, other_account_number: int):
         """
         Check if account number matches another account number
@@ -65,7 +162,7 @@ class Account:
     def __eq__(self, other_account: Account):
         return (
             self.account_number == other_account.account_number
-            and self.balance == other_account.balance
+            and self._cents == other_account._cents
         )
 
     def __str__(self):
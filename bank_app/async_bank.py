@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Union
+
+from .account import Account
+from .bank import Bank
+from .customer import Customer
+from .logger import log_exc
+
+
+class AsyncBank:
+    """
+    Asyncio front end for a Bank.
+
+    Hashing and verifying passwords with bcrypt takes hundreds of milliseconds,
+    so it runs in a bounded thread pool. Everything else is cheap and runs on the
+    event loop, which keeps one slow login from stalling other requests.
+    """
+
+    def __init__(self, bank: Optional[Bank] = None, max_workers: Optional[int] = None):
+        """
+        :param bank: The bank to serve, a new Bank if not specified
+        :param max_workers: Maximum number of concurrent bcrypt operations
+        """
+        self.bank = bank if bank else Bank()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="bcrypt"
+        )
+
+    async def _run(self, func: Callable, *args) -> Any:
+        """
+        Run a blocking function in the thread pool
+        :param func: The function to be run
+        :param args: Arguments of the function
+        :return: The return value of the function
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    @log_exc(exc=(TypeError, ValueError), return_value=False)
+    async def add_customer(self, name: str, password: str) -> bool:
+        """
+        Add a new customer
+        :param name: Username of the customer. Should be unique.
+        :param password: Password of the customer
+        :return: True if successful else False
+        """
+        self.bank._check_new_customer(name, password)
+        password_hash = await self._run(Customer.create_password_hash, password)
+        # The name may have been taken while the password was hashed
+        return self.bank.add_hashed_customer(name, password_hash)
+
+    async def change_customer_password(self, name: str, new_password: str) -> bool:
+        """
+        Change a customers password
+        :param name: Name of the customer
+        :param new_password: The new password
+        :return: True if successful else False
+        """
+        if not self.bank.get_customer(name):
+            return False
+
+        password_hash = await self._run(Customer.create_password_hash, new_password)
+        return self.bank.change_customer_password_hash(name, password_hash)
+
+    @log_exc(exc=ValueError, return_value=False)
+    async def login(self, name: str, password: str) -> Union[str, bool]:
+        """
+        Start a session for a customer if the password matches.
+        Many customers are active at once, so the logged in customer of the bank is left alone.
+        :param name: Name of the customer
+        :param password: Password of the customer
+        :return: A session token if successful else False
+        """
+        if customer := self.bank.get_customer(name):
+            if await self._run(customer.check_password, password):
+                return self.bank._start_session(customer)
+            raise ValueError("Incorrect password")
+        return False
+
+    async def logout(self, session: Optional[str] = None) -> bool:
+        return self.bank.logout(session)
+
+    async def remove_customer(self, name: str) -> bool:
+        return self.bank.remove_customer(name)
+
+    async def get_accounts(self, session: Optional[str] = None) -> Optional[list[Account]]:
+        return self.bank.get_accounts(session)
+
+    async def get_account(
+        self, account_number: int, session: Optional[str] = None
+    ) -> Optional[Account]:
+        return self.bank.get_account(account_number, session)
+
+    async def add_account(self, account_number: int, session: Optional[str] = None) -> bool:
+        return self.bank.add_account(account_number, session)
+
+    async def remove_account(
+        self, account_number: int, session: Optional[str] = None
+    ) -> bool:
+        return self.bank.remove_account(account_number, session)
+
+    async def deposit(
+        self,
+        account_number: int,
+        amount: Union[int, float],
+        session: Optional[str] = None,
+    ) -> bool:
+        return self.bank.deposit(account_number, amount, session)
+
+    async def withdraw(
+        self,
+        account_number: int,
+        amount: Union[int, float],
+        session: Optional[str] = None,
+    ) -> bool:
+        return self.bank.withdraw(account_number, amount, session)
+
+    def close(self) -> None:
+        """
+        Wait for running bcrypt operations and shut down the thread pool
+        """
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self) -> AsyncBank:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
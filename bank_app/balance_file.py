@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+from typing import Optional
+
+from .account import Account
+
+MAGIC = b"BKBL"
+VERSION = 1
+# Magic, version of the format and size of a record, padded so the records are 8 byte aligned
+HEADER = struct.Struct("<4sII4x")
+# Account number, balance in cents and a version that grows with every write, all int64
+FIELDS = 3
+RECORD_SIZE = FIELDS * 8
+
+
+class MappedAccount(Account):
+    """
+    Account whose balance lives in a record of a BalanceFile.
+    Every balance change is written to the mapped file, so it only marks the
+    account dirty until its first save, when the account itself is new.
+    """
+
+    __slots__ = ("_file", "_row", "_detached", "_unsaved")
+
+    def __init__(self, balance_file: BalanceFile, row: int, account_number: int):
+        self.account_number = account_number
+        self._unsaved = True
+        self._ledger = None
+        self._file = balance_file
+        self._row = row
+
+    @property
+    def _cents(self) -> int:
+        if self._file is None:
+            return self._detached
+        return self._file._fields[self._row * FIELDS + 1]
+
+    @_cents.setter
+    def _cents(self, cents: int) -> None:
+        if self._file is None:
+            self._detached = cents
+        else:
+            fields = self._file._fields
+            idx = self._row * FIELDS
+            fields[idx + 1] = cents
+            fields[idx + 2] += 1
+
+    @property
+    def dirty(self) -> bool:
+        return self._unsaved
+
+    @dirty.setter
+    def dirty(self, dirty: bool) -> None:
+        # The balance file already holds every balance change, only a save clears the flag
+        if not dirty:
+            self._unsaved = False
+
+    @property
+    def version(self) -> int:
+        """
+        Number of times the balance was written since the record was created
+        """
+        if self._file is None:
+            return 0
+        return self._file._fields[self._row * FIELDS + 2]
+
+    def _restore(self, cents: int, version: int) -> None:
+        """
+        Put back a journaled balance if the record is older than it
+        :param cents: Balance in cents
+        :param version: Version of the record when the balance was journaled
+        """
+        if self._file is None:
+            self._detached = cents
+        elif version > self.version:
+            fields = self._file._fields
+            idx = self._row * FIELDS
+            fields[idx + 1] = cents
+            fields[idx + 2] = version
+
+    def _detach(self) -> None:
+        """
+        Keep the balance on the account itself once its record is removed from the file
+        """
+        self._detached = self._cents
+        self._file = None
+
+
+class BalanceFile:
+    """
+    Account balances in a memory mapped file of fixed size records.
+
+    Accounts read and write their record in place, so a balance change costs a
+    store to memory and persists with a page flush instead of a rewrite of the
+    save file. Records of removed accounts are reused, rows never move.
+    Adding and removing accounts is not thread safe on its own, a Bank does it
+    while holding its write lock.
+    """
+
+    def __init__(self, file_path: str, capacity: int = 1024):
+        """
+        :param file_path: Path to the file, created if it does not exist
+        :param capacity: Number of records to allocate room for when the file is created
+        """
+        if sys.byteorder != "little":
+            raise OSError("Balance files are little endian and can only be mapped on little endian machines")
+
+        self.file_path = file_path
+        fd = os.open(file_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            if size == 0:
+                size = HEADER.size + max(capacity, 1) * RECORD_SIZE
+                os.ftruncate(fd, size)
+                os.pwrite(fd, HEADER.pack(MAGIC, VERSION, RECORD_SIZE), 0)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        magic, version, record_size = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            self._map.close()
+            raise OSError(f"{file_path} is not a balance file of version {VERSION}")
+        if (size - HEADER.size) % RECORD_SIZE:
+            self._map.close()
+            raise OSError(f"Balance file {file_path} is truncated")
+
+        self._map_fields()
+        numbers = self._fields[0::FIELDS].tolist()
+        versions = self._fields[2::FIELDS].tolist()
+        # A record that was never written has version 0
+        self._rows: dict[int, int] = {
+            number: row for row, (number, version) in enumerate(zip(numbers, versions)) if version
+        }
+        self._free = [row for row in range(len(versions) - 1, -1, -1) if not versions[row]]
+
+    def _map_fields(self) -> None:
+        self._fields = memoryview(self._map)[HEADER.size:].cast("q")
+
+    @property
+    def capacity(self) -> int:
+        """
+        Number of records the file has room for
+        """
+        return len(self._fields) // FIELDS
+
+    def _grow(self) -> None:
+        """
+        Double the number of records of the file
+        """
+        capacity = self.capacity
+        self._fields.release()
+        self._map.resize(HEADER.size + capacity * 2 * RECORD_SIZE)
+        self._map_fields()
+        self._free = list(range(capacity * 2 - 1, capacity - 1, -1))
+
+    def add(self, account_number: int, cents: int = 0) -> MappedAccount:
+        """
+        Add a record for an account
+        :param account_number: Account number of the account
+        :param cents: Balance in cents
+        :return: An account backed by the new record
+        """
+        if account_number in self._rows:
+            raise ValueError(f"Account with account number {account_number} already exists")
+
+        if not self._free:
+            self._grow()
+        row = self._free.pop()
+        idx = row * FIELDS
+        self._fields[idx] = account_number
+        self._fields[idx + 1] = cents
+        self._fields[idx + 2] = 1
+        self._rows[account_number] = row
+        return MappedAccount(self, row, account_number)
+
+    def adopt(self, account: Account, version: int = 0) -> MappedAccount:
+        """
+        Back an account with a record. The file holds the latest balances, so an account
+        that already has a record takes its balance from the file, unless the record is
+        older than the version of the balance of the account.
+        :param account: The account
+        :param version: Version of the record when the balance of the account was journaled, 0 if unknown
+        :return: An account backed by the file to be used in place of the account
+        """
+        if isinstance(account, MappedAccount) and account._file is self:
+            return account
+
+        row = self._rows.get(account.account_number)
+        if row is None:
+            mapped = self.add(account.account_number, account.cents)
+        else:
+            mapped = MappedAccount(self, row, account.account_number)
+        mapped._restore(account.cents, version)
+        mapped._unsaved = account.dirty
+        mapped._ledger = account._ledger
+        return mapped
+
+    def remove(self, account: MappedAccount) -> bool:
+        """
+        Free the record of an account, the account keeps its balance on its own
+        :param account: The account
+        :return: True if the account had a record in the file else False
+        """
+        if account._file is not self:
+            return False
+        row = self._rows.pop(account.account_number, None)
+        account._detach()
+        if row is None:
+            return False
+
+        idx = row * FIELDS
+        self._fields[idx:idx + FIELDS] = memoryview(bytes(RECORD_SIZE)).cast("q")
+        self._free.append(row)
+        return True
+
+    def cents(self, account_number: int) -> Optional[int]:
+        """
+        Read a balance without creating an account
+        :param account_number: Account number of the account
+        :return: The balance in cents if the account has a record else None
+        """
+        row = self._rows.get(account_number)
+        return None if row is None else self._fields[row * FIELDS + 1]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, account_number: int) -> bool:
+        return account_number in self._rows
+
+    def flush(self) -> None:
+        """
+        Write the changed pages to disk, the balances survive a power loss once this returns
+        """
+        self._map.flush()
+
+    def close(self) -> None:
+        self._map.flush()
+        self._fields.release()
+        self._map.close()
@@ -1,12 +1,28 @@
 import atexit
-import logging
-from typing import Union, Optional
+import os
+import pathlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, Union, Optional
 
-from bank_app import parser_json
-from .account import Account
+from bank_app import export
+from .account import Account, Money, to_cents
+from .balance_file import BalanceFile, MappedAccount
+from .columnar import ColumnarAccounts
 from .customer import Customer
 from .exceptions import CustomerNotFoundError
-from .logger import log_exc
+from .journal import Journal
+from .ledger import TRANSFER_IN, TRANSFER_OUT, LedgerArchive
+from .locks import NullRWLock, RWLock
+from .logger import DEFAULT_LOGGER, log_exc
+from .profiling import DEFAULT_OPERATIONS, Profiler
+from .session import SessionTable
+from .storage import Storage, open_storage
+
+BATCH_OK = 0
+BATCH_INVALID = 1
+BATCH_NOT_FOUND = 2
+BATCH_INSUFFICIENT_FUNDS = 3
 
 
 class Bank:
@@ -15,28 +31,436 @@ class Bank:
             customers: Optional[list[Customer]] = None,
             save_on_exit: bool = True,
             save_file_path: Optional[str] = None,
+            journal_path: Optional[str] = None,
+            compact_every: int = 16,
+            session_ttl: float = 900.0,
+            thread_safe: bool = False,
+            storage: Optional[Storage] = None,
     ):
+        """
+        :param customers: Customers to start with
+        :param save_on_exit: Save the customers when the program exits
+        :param save_file_path: Path to save the customers to on exit
+        :param journal_path: Path to a journal that makes every mutation durable without a full save
+        :param compact_every: Number of delta segments after which an incremental save writes a full save instead
+        :param session_ttl: Number of idle seconds after which a login session expires
+        :param thread_safe: Guard the customer and account indexes with a readers-writer lock
+        :param storage: Where customers are loaded from and saved to when no file path is given, the json file by default
+        """
         self.customers: list[Customer] = customers if customers else []
         self.current_user: Optional[Customer] = None
+        self.sessions = SessionTable(session_ttl)
+        self._customer_index: dict[str, Customer] = {}
+        self._account_index: dict[int, tuple[Customer, Account]] = {}
+        self._removed_names: set[str] = set()
+        # Balance file versions of replayed balances, for a balance file enabled after the replay
+        self._journal_versions: dict[int, int] = {}
+        self.compact_every = compact_every
+        self._lock = RWLock() if thread_safe else NullRWLock()
+        self.columnar: Optional[ColumnarAccounts] = None
+        self.balance_file: Optional[BalanceFile] = None
+        self.ledger_archive: Optional[LedgerArchive] = None
+        self.profiler: Optional[Profiler] = None
+        self.storage = storage
+        for customer in self.customers:
+            self._index_customer(customer)
+
+        self.journal: Optional[Journal] = None
+        if journal_path:
+            self.journal = Journal(journal_path)
+            atexit.register(self.journal.close)
 
         if save_on_exit:
-            atexit.register(parser_json.save_customers, self.customers, save_file_path)
+            atexit.register(self._save_on_exit, save_file_path)
 
     @log_exc(exc=OSError, return_value=False)
-    def load_customers(self, file_path: Optional[str] = None) -> bool:
+    def load_customers(
+            self,
+            file_path: Optional[str] = None,
+            stream: bool = False,
+            progress: Optional[Callable[[int, int], None]] = None,
+            lazy: Optional[bool] = None,
+    ) -> bool:
         """
-        Load the saved customers
-        :param file_path: Path to the file to load from
+        Load the saved customers. A lazy storage, such as a SQLite file, becomes the storage
+        of the bank and its customers are loaded when they are first used.
+        :param file_path: Path to the file to load from, the storage of the bank if not specified
+        :param stream: Decode the file incrementally to keep memory use bounded for large files
+        :param progress: Called with the number of customers and bytes read so far, only when streaming
+        :param lazy: Load customers when they are first used, the default of the file format if not specified
         :return: True if successful else False
         """
-        if customers := parser_json.load_customers(file_path):
-            self.customers.extend(customers)
+        storage = self._storage_for(file_path, lazy)
+        if storage.lazy:
+            with self._lock.write():
+                previous, self.storage = self.storage, storage
+                self.replay_journal()
+            if previous is not None and previous is not storage:
+                previous.close()
+            return True
+
+        customers = storage.load(stream, progress)
+        if storage is not self.storage:
+            storage.close()
+        with self._lock.write():
+            if customers:
+                self.customers.extend(customers)
+                for customer in customers:
+                    self._index_customer(customer)
+
+            # The journal holds everything since the last snapshot, even if there is none yet
+            self.replay_journal()
+        if customers:
             return True
 
         raise OSError("Failed to load customers")
 
-    def save_customers(self, save_file_path: Optional[str] = None) -> bool:
-        return parser_json.save_customers(self.customers, save_file_path)
+    def save_customers(
+            self, save_file_path: Optional[str] = None, incremental: bool = False
+    ) -> bool:
+        """
+        Save the customers
+        :param save_file_path: Path to save location, the storage of the bank if not specified
+        :param incremental: Only save the changed customers, as a delta segment next to the last full json save
+        :return: True if successful else False
+        """
+        storage = self._storage_for(save_file_path)
+        # Writing blocks mutations, so none can be marked clean or truncated from the journal unsaved
+        with self._lock.write():
+            if self.balance_file is not None:
+                self.balance_file.flush()
+            saved = storage.save(self.customers, self._removed_names, incremental)
+            if saved:
+                self._removed_names.clear()
+                if self.journal:
+                    self.journal.truncate()
+        if storage is not self.storage:
+            storage.close()
+        return saved
+
+    def _save_on_exit(self, save_file_path: Optional[str] = None) -> None:
+        """
+        Save the customers and close the storage when the program exits.
+        A lazy storage only gave the bank the customers that were used, so they are saved back into it
+        :param save_file_path: Path to save to if the bank has no lazy storage
+        """
+        lazy = self.storage is not None and self.storage.lazy
+        self.save_customers(None if lazy else save_file_path)
+        if self.storage is not None:
+            self.storage.close()
+
+    def _storage_for(self, file_path: Optional[str] = None, lazy: Optional[bool] = None) -> Storage:
+        """
+        Get the storage to load from or save to
+        :param file_path: Path to a file, its extension picks the format
+        :param lazy: Load customers from the file when they are first used, the default of the format if not specified
+        :return: The storage of the bank if no file path is given, else a storage for the file
+        """
+        if not file_path and self.storage:
+            return self.storage
+        return open_storage(file_path, self.compact_every, lazy)
+
+    def replay_journal(self) -> int:
+        """
+        Apply the journaled mutations on top of the loaded customers
+        :return: The number of records that were applied
+        """
+        if not self.journal:
+            return 0
+
+        count = 0
+        with self._lock.write():
+            for record in self.journal.records():
+                self._apply_record(*record)
+                count += 1
+        return count
+
+    def _apply_record(self, op: str, *args) -> None:
+        """
+        Apply a journal record without journaling it again
+        :param op: Name of the operation
+        :param args: Arguments of the operation
+        """
+        if op == "customer":
+            name, password_hash = args
+            if customer := self._lookup_customer(name):
+                customer.set_password_hash(password_hash)
+            else:
+                self._insert_customer(Customer(name, password_hash, hash_password=False))
+        elif op == "del_customer":
+            if customer := self._lookup_customer(args[0]):
+                self._drop_customer(customer)
+        elif op == "account":
+            name, account_number = args
+            if entry := self._lookup_account(account_number):
+                self._detach_account(*entry)
+            if customer := self._lookup_customer(name):
+                self._attach_account(customer, Account(account_number))
+        elif op == "del_account":
+            if entry := self._lookup_account(args[0]):
+                self._detach_account(*entry)
+        elif op in ("cents", "balance"):
+            account_number, balance, *version = args
+            if entry := self._lookup_account(account_number):
+                account = entry[1]
+                # Journals written before balances were kept in cents hold the balance
+                cents = balance if op == "cents" else to_cents(balance)
+                if not version:
+                    account._cents = cents
+                elif isinstance(account, MappedAccount):
+                    # Pages of the balance file that were flushed after the journal are newer
+                    account._restore(cents, version[0])
+                else:
+                    account._cents = cents
+                    self._journal_versions[account_number] = version[0]
+                account.dirty = True
+        else:
+            raise ValueError(f"Unknown journal operation {op}")
+
+    def _journal(self, *record) -> None:
+        """
+        Append a record to the journal if journaling is enabled
+        :param record: Operation name followed by its arguments
+        """
+        if self.journal:
+            self.journal.append(*record)
+
+    def _journal_balance(self, account: Account) -> None:
+        """
+        Journal the balance of an account, with the version of its record if it is kept in the balance file
+        :param account: The account
+        """
+        if self.journal:
+            if isinstance(account, MappedAccount) and account._file is not None:
+                self.journal.append("cents", account.account_number, account.cents, account.version)
+            else:
+                self.journal.append("cents", account.account_number, account.cents)
+
+    def _lookup_customer(self, name: str) -> Optional[Customer]:
+        """
+        Find a customer, loading it from a lazy storage the first time.
+        Call with the read or write lock held, loading upgrades to the write lock.
+        :param name: Normalized name of the customer
+        :return: The customer if it exists else None
+        """
+        if (customer := self._customer_index.get(name)) is not None:
+            return customer
+        # A customer removed since the last save is still in the storage
+        if not self.storage or not self.storage.lazy or name in self._removed_names:
+            return None
+
+        # Loading changes the indexes and the stores, which readers must not see halfway
+        with self._lock.upgrade():
+            return self._load_customer(name)
+
+    def _lookup_account(self, account_number: int) -> Optional[tuple[Customer, Account]]:
+        """
+        Find any account, loading its owner from a lazy storage the first time.
+        Call with the read or write lock held, loading upgrades to the write lock.
+        :param account_number: Account number of the account
+        :return: The owner and the account if it exists else None
+        """
+        if (entry := self._account_index.get(account_number)) is not None:
+            return entry
+        if not self.storage or not self.storage.lazy:
+            return None
+
+        owner = self.storage.find_account_owner(account_number)
+        if owner is None:
+            return None
+        with self._lock.upgrade():
+            # An owner that was already loaded has the final say on its accounts
+            if owner not in self._customer_index:
+                self._load_customer(owner)
+            return self._account_index.get(account_number)
+
+    def _load_customer(self, name: str) -> Optional[Customer]:
+        """
+        Load a customer from the lazy storage unless it was loaded or removed since, with the write lock held
+        :param name: Normalized name of the customer
+        :return: The customer if it exists else None
+        """
+        if (customer := self._customer_index.get(name)) is None and name not in self._removed_names:
+            if (customer := self.storage.get_customer(name)) is not None:
+                self._insert_customer(customer)
+        return customer
+
+    def _index_customer(self, customer: Customer) -> None:
+        """
+        Add a customer and its accounts to the indexes, keeping the first entry on duplicates
+        :param customer: The customer to be indexed
+        """
+        self._customer_index.setdefault(customer.name, customer)
+        for account in customer.view_accounts():
+            if account.account_number in self._account_index:
+                continue
+            if (stored := self._store_account(customer, account)) is not account:
+                customer.replace_account(account, stored)
+            self._account_index[stored.account_number] = (customer, stored)
+
+    def _insert_customer(self, customer: Customer) -> None:
+        """
+        Add a customer with a unique name to the bank
+        :param customer: The customer to be added
+        """
+        self.customers.append(customer)
+        self._index_customer(customer)
+
+    def _drop_customer(self, customer: Customer) -> None:
+        """
+        Remove a customer and its accounts from the bank
+        :param customer: The customer to be removed
+        """
+        self.customers.remove(customer)
+        del self._customer_index[customer.name]
+        self._removed_names.add(customer.name)
+        for account in customer.view_accounts():
+            self._unindex_account(account)
+        self.sessions.remove_customer(customer)
+        if self.current_user == customer:
+            self.logout()
+
+    def _attach_account(self, customer: Customer, account: Account) -> bool:
+        """
+        Add an account with a unique account number to a customer
+        :param customer: Owner of the account
+        :param account: The account to be added
+        :return: True if successful else False
+        """
+        if customer.add_account(account):
+            if (stored := self._store_account(customer, account)) is not account:
+                customer.replace_account(account, stored)
+            self._account_index[stored.account_number] = (customer, stored)
+            return True
+        return False
+
+    def _detach_account(self, customer: Customer, account: Account) -> None:
+        """
+        Remove an account from a customer
+        :param customer: Owner of the account
+        :param account: The account to be removed
+        """
+        customer.remove_account(account)
+        self._unindex_account(account)
+
+    def _unindex_account(self, account: Account) -> None:
+        """
+        Remove an account from the account index if it is the indexed one
+        :param account: The account to be removed
+        """
+        entry = self._account_index.get(account.account_number)
+        if entry and entry[1] is account:
+            del self._account_index[account.account_number]
+            if self.columnar is not None:
+                self.columnar.remove(account.account_number)
+            elif self.balance_file is not None:
+                self.balance_file.remove(account)
+
+    def _store_account(self, customer: Customer, account: Account) -> Account:
+        """
+        Move the balance of an account into the columnar store or the balance file, if one is enabled
+        :param customer: Owner of the account
+        :param account: The account
+        :return: The account to be used in its place
+        """
+        if self.columnar is not None:
+            return self.columnar.adopt(customer.name, account)
+        if self.balance_file is not None:
+            return self.balance_file.adopt(account)
+        return account
+
+    def _find_customer_account(
+            self, customer: Customer, account_number: int
+    ) -> Optional[Account]:
+        """
+        Find an account owned by a customer, using the account index when possible
+        :param customer: Owner of the account
+        :param account_number: Account number of the account
+        :return: The account if the customer owns it else None
+        """
+        entry = self._account_index.get(account_number)
+        if entry and entry[0] is customer:
+            return entry[1]
+
+        for account in customer.view_accounts():
+            if account.check_account_number(account_number):
+                return account
+        return None
+
+    def enable_columnar(self) -> ColumnarAccounts:
+        """
+        Move all account balances into a numpy backed store for bank wide queries.
+        The accounts are replaced with views into the store, so the rest of the bank works as before.
+        :return: The store
+        """
+        with self._lock.write():
+            if self.columnar is not None:
+                return self.columnar
+            if self.balance_file is not None:
+                raise ValueError("Balances are already kept in a balance file")
+
+            store = ColumnarAccounts(len(self._account_index))
+            for account_number, (customer, account) in self._account_index.items():
+                view = store.adopt(customer.name, account)
+                customer.replace_account(account, view)
+                self._account_index[account_number] = (customer, view)
+            self.columnar = store
+        return store
+
+    def enable_balance_file(self, file_path: str) -> BalanceFile:
+        """
+        Keep all account balances in a memory mapped file that every balance change is written to,
+        so balances persist without a save. Balances in an existing file replace the loaded ones
+        unless the journal replayed newer ones, it is meant to be used with the same save file every run.
+        :param file_path: Path to the balance file
+        :return: The balance file
+        """
+        with self._lock.write():
+            if self.balance_file is not None:
+                return self.balance_file
+            if self.columnar is not None:
+                raise ValueError("Balances are already kept in a columnar store")
+
+            balance_file = BalanceFile(file_path, max(len(self._account_index), 1024))
+            for account_number, (customer, account) in self._account_index.items():
+                mapped = balance_file.adopt(account, self._journal_versions.get(account_number, 0))
+                customer.replace_account(account, mapped)
+                self._account_index[account_number] = (customer, mapped)
+            self._journal_versions.clear()
+            self.balance_file = balance_file
+        return balance_file
+
+    def enable_profiling(
+            self,
+            operations: Iterable[str] = DEFAULT_OPERATIONS,
+            mode: str = "timing",
+            sample: float = 1.0,
+            log_dir: str = "logs",
+    ) -> Profiler:
+        """
+        Start profiling some operations of the bank, replacing a running profiler.
+        Can also be used as a context manager that disables profiling on exit.
+        :param operations: Names of the methods to profile
+        :param mode: "timing" for wall-clock latencies, "cprofile" for call statistics or "tracemalloc" for memory
+        :param sample: Fraction of calls to profile
+        :param log_dir: Directory the report is written to
+        :return: The running profiler
+        """
+        self.disable_profiling()
+        self.profiler = Profiler(self, operations, mode, sample, log_dir).start()
+        return self.profiler
+
+    def disable_profiling(self) -> Optional[pathlib.Path]:
+        """
+        Stop profiling and write the report
+        :return: Path to the report, None if profiling was not enabled
+        """
+        if not self.profiler:
+            return None
+
+        report_path = self.profiler.stop()
+        self.profiler = None
+        return report_path
 
     def get_customers(self) -> list[Customer]:
         """
@@ -54,17 +478,103 @@ class Bank:
         :return: True if successful else False
         """
 
-        if any(customer.check_name(name) for customer in self.customers):
-            raise ValueError(f"Customer with name {name} already exists.")
+        self._check_new_customer(name, password)
+        customer = Customer(name, password)
+        with self._lock.write():
+            # The name may have been taken while the password was hashed
+            self._check_new_customer(name, password)
+            self._insert_customer(customer)
+            self._journal("customer", customer.name, customer.password)
+        return True
+
+    @log_exc(exc=(TypeError, ValueError), return_value=False)
+    def add_hashed_customer(self, name: str, password_hash: str) -> bool:
+        """
+        Add a new customer whose password was already hashed
+        :param name: Username of the customer. Should be unique.
+        :param password_hash: Hash of the password from Customer.create_password_hash
+        :return: True if successful else False
+        """
+        with self._lock.write():
+            self._check_new_customer(name, password_hash)
+            customer = Customer(name, password_hash, hash_password=False)
+            self._insert_customer(customer)
+            self._journal("customer", customer.name, customer.password)
+        return True
+
+    def add_customers_bulk(
+            self,
+            customers: Iterable[tuple[str, str]],
+            processes: Optional[int] = None,
+    ) -> list[Optional[Exception]]:
+        """
+        Add many new customers at once, hashing their passwords in parallel.
+        Either every valid row is added or, if hashing fails, none are.
+        :param customers: Pairs of username and password
+        :param processes: Number of worker processes, one per CPU if not specified. 1 hashes in this process
+        :return: None for every added row, or the exception explaining why the row was rejected
+        """
+        rows = list(customers)
+        errors: list[Optional[Exception]] = [None] * len(rows)
+        valid: list[int] = []
+        names: set[str] = set()
+        for idx, row in enumerate(rows):
+            try:
+                name, password = row
+                self._check_new_customer(name, password)
+                if Customer.normalize_name(name) in names:
+                    raise ValueError(f"Customer with name {name} appears more than once.")
+            except (TypeError, ValueError) as e:
+                DEFAULT_LOGGER.error(f"Row {idx}: {e.__class__.__name__}: {e}")
+                errors[idx] = e
+                continue
+            names.add(Customer.normalize_name(name))
+            valid.append(idx)
+
+        passwords = [rows[idx][1] for idx in valid]
+        processes = processes if processes else os.cpu_count() or 1
+        if processes == 1 or len(passwords) < 2:
+            hashes = [Customer.create_password_hash(password) for password in passwords]
+        else:
+            chunksize = max(1, len(passwords) // (processes * 4))
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                hashes = list(
+                    executor.map(Customer.create_password_hash, passwords, chunksize=chunksize)
+                )
+
+        with self._lock.write():
+            for idx, password_hash in zip(valid, hashes):
+                name = rows[idx][0]
+                if self.has_customer(name):
+                    errors[idx] = ValueError(f"Customer with name {name} already exists.")
+                    continue
+                customer = Customer(name, password_hash, hash_password=False)
+                self._insert_customer(customer)
+                self._journal("customer", customer.name, customer.password)
+        return errors
 
+    def _check_new_customer(self, name: str, password: str) -> None:
+        """
+        Raise if a customer can not be added
+        :param name: Username of the customer
+        :param password: Password or password hash of the customer
+        """
         if not isinstance(name, str) or not isinstance(password, str):
             raise TypeError(
                 f"Expected type (str, str), got ({type(name)}, {type(password)})"
             )
 
-        customer = Customer(name, password)
-        self.customers.append(customer)
-        return True
+        if self.has_customer(name):
+            raise ValueError(f"Customer with name {name} already exists.")
+
+    def has_customer(self, name: str) -> bool:
+        """
+        Check if a customer exists without logging a failed lookup
+        :param name: Username of a customer
+        :return: True if the customer exists else False
+        """
+        with self._lock.read():
+            return self._lookup_customer(Customer.normalize_name(name)) is not None
 
     @log_exc(exc=CustomerNotFoundError, return_value=None)
     def get_customer(self, name: str) -> Optional[Customer]:
@@ -73,9 +583,10 @@ class Bank:
         :param name: Username of a customer
         :return: The customer matching the name
         """
-        for customer in self.customers:
-            if customer.check_name(name):
-                return customer
+        with self._lock.read():
+            customer = self._lookup_customer(Customer.normalize_name(name))
+        if customer:
+            return customer
 
         raise CustomerNotFoundError(f"Customer of name {name} not found")
 
@@ -88,145 +599,571 @@ class Bank:
         """
 
         if customer := self.get_customer(name):
-            customer.password = new_password
+            password_hash = Customer.create_password_hash(new_password)
+            with self._lock.read():
+                customer.set_password_hash(password_hash)
+                self._journal("customer", customer.name, customer.password)
             return True
         return False
 
-    def remove_customer(self, name: str) -> bool:
+    def change_customer_password_hash(self, name: str, password_hash: str) -> bool:
         """
-        Remove a customer
+        Change a customers password to an already hashed password
         :param name: Name of the customer
+        :param password_hash: Hash of the new password from Customer.create_password_hash
         :return: True if successful else False
         """
         if customer := self.get_customer(name):
-            self.customers.remove(customer)
-            if self.current_user == customer:
-                self.logout()
+            with self._lock.read():
+                customer.set_password_hash(password_hash)
+                self._journal("customer", customer.name, customer.password)
             return True
         return False
 
+    def remove_customer(self, name: str) -> bool:
+        """
+        Remove a customer
+        :param name: Name of the customer
+        :return: True if successful else False
+        """
+        with self._lock.write():
+            if customer := self.get_customer(name):
+                self._drop_customer(customer)
+                self._journal("del_customer", customer.name)
+                return True
+        return False
+
     @log_exc(exc=ValueError, return_value=False)
-    def login(self, name: str, password: str) -> bool:
+    def login(self, name: str, password: str) -> Union[str, bool]:
         """
         If the password matches,
         add this customer from the list of customers
-        as the new logged in customer.
+        as the new logged in customer and start a session for it.
+        Calls without a session token act as the last customer logged in this way,
+        use open_session when many customers are active at once.
 
         :param name: Name of the customer
         :param password: Password of the customer
-        :return: True if successful else False
+        :return: A session token if successful else False
+        """
+        if customer := self._check_login(name, password):
+            session = self._start_session(customer)
+            self.current_user = customer
+            return session
+        return False
+
+    @log_exc(exc=ValueError, return_value=False)
+    def open_session(self, name: str, password: str) -> Union[str, bool]:
+        """
+        Start a session for a customer if the password matches, without changing the logged in customer
+        :param name: Name of the customer
+        :param password: Password of the customer
+        :return: A session token if successful else False
+        """
+        if customer := self._check_login(name, password):
+            return self._start_session(customer)
+        return False
+
+    def _check_login(self, name: str, password: str) -> Optional[Customer]:
+        """
+        :param name: Name of the customer
+        :param password: Password of the customer
+        :return: The customer if the password matches, None if there is no such customer
         """
         if customer := self.get_customer(name):
             if customer.check_password(password):
-                self.current_user = customer
-                return True
+                return customer
             raise ValueError("Incorrect password")
-        return False
+        return None
+
+    def _start_session(self, customer: Customer) -> str:
+        """
+        Start a session for a customer whose password was verified.
+        The password is checked without the lock, so the customer may have been removed or replaced meanwhile.
+        :param customer: The customer
+        :return: The session token
+        """
+        with self._lock.read():
+            if self._customer_index.get(customer.name) is not customer:
+                raise ValueError(f"Customer {customer.name} was removed during login")
+            return self.sessions.create(customer)
 
     @log_exc(exc=CustomerNotFoundError, return_value=False)
-    def logout(self) -> bool:
+    def logout(self, session: Optional[str] = None) -> bool:
         """
-        Log out the currently logged in customer
+        Log out the currently logged in customer, or end a session
+        :param session: Session token, the currently logged in customer if not specified
         :return: True if successful else False
         """
+        if session is not None:
+            if not self.sessions.remove(session):
+                raise CustomerNotFoundError("Session expired or unknown")
+            return True
+
         if not self.current_user:
             raise CustomerNotFoundError("No customer is logged in")
 
         self.current_user = None
         return True
 
+    def _get_user(self, session: Optional[str] = None) -> Customer:
+        """
+        Get the customer of a session
+        :param session: Session token, the currently logged in customer if not specified
+        :return: The customer
+        """
+        if session is None:
+            if not self.current_user:
+                raise CustomerNotFoundError("No customer is logged in")
+            return self.current_user
+
+        if customer := self.sessions.get(session):
+            return customer
+        raise CustomerNotFoundError("Session expired or unknown")
+
     @log_exc(exc=CustomerNotFoundError, return_value=None)
-    def get_accounts(self) -> Optional[list[Account]]:
+    def get_accounts(self, session: Optional[str] = None) -> Optional[list[Account]]:
         """
         Get all accounts that belong to the currently logged in customer
+        :param session: Session token, the currently logged in customer if not specified
         :return: The list of accounts
         """
-        if not self.current_user:
-            raise CustomerNotFoundError("No customer is logged in")
-
-        return self.current_user.accounts
+        user = self._get_user(session)
+        with self._lock.read():
+            return user.accounts
 
     @log_exc(exc=(CustomerNotFoundError, ValueError, TypeError), return_value=False)
-    def add_account(self, account_number: int) -> bool:
+    def add_account(self, account_number: int, session: Optional[str] = None) -> bool:
         """
         Add an account to the currently logged in customer.
         :param account_number: Account number of the new account.
+        :param session: Session token, the currently logged in customer if not specified
         :return: True if successful else False
         """
-        if not self.current_user:
-            raise CustomerNotFoundError("No customer is logged in", logging.WARNING)
-
-        if any(
-                user_account.check_account_number(account_number)
-                for user_account in self.current_user.accounts
-        ):
-            raise ValueError(
-                f"Customer has no account with account number {account_number}"
-            )
+        user = self._get_user(session)
 
         if not isinstance(account_number, int):
             raise TypeError(f"Expected type int, got {type(account_number)}")
 
-        acc = Account(account_number)
-        return self.current_user.add_account(acc)
+        with self._lock.write():
+            if self._lookup_account(account_number) or self._find_customer_account(
+                    user, account_number
+            ):
+                raise ValueError(
+                    f"Account with account number {account_number} already exists"
+                )
 
-    def remove_account(self, account_number: int) -> bool:
+            if self._attach_account(user, Account(account_number)):
+                self._journal("account", user.name, account_number)
+                return True
+        return False
+
+    @log_exc(exc=CustomerNotFoundError, return_value=False)
+    def remove_account(self, account_number: int, session: Optional[str] = None) -> bool:
         """
         Remove an account from the currently logged in customer.
         :param account_number: Account number of the account.
+        :param session: Session token, the currently logged in customer if not specified
         :return: True if successful else False
         """
-        if account := self.get_account(account_number):
-            self.current_user.accounts.remove(account)
-            return True
+        user = self._get_user(session)
+        with self._lock.write():
+            if account := self._get_user_account(user, account_number):
+                self._detach_account(user, account)
+                self._journal("del_account", account_number)
+                return True
         return False
 
-    @log_exc(exc=ValueError, return_value=None)
-    def get_account(self, account_number: int) -> Optional[Account]:
+    @log_exc(exc=CustomerNotFoundError, return_value=None)
+    def get_account(
+            self, account_number: int, session: Optional[str] = None
+    ) -> Optional[Account]:
         """
         Get an account from the currently logged in customer.
         :param account_number: Account number of the account.
+        :param session: Session token, the currently logged in customer if not specified
         :return: The account matching the account number.
         """
-        if accounts := self.get_accounts():
-            for account in accounts:
-                if account.check_account_number(account_number):
-                    return account
-            raise ValueError(f"Account with account number {account_number} not found.")
-        return None
+        user = self._get_user(session)
+        with self._lock.read():
+            return self._get_user_account(user, account_number)
+
+    @log_exc(exc=ValueError, return_value=None)
+    def _get_user_account(self, user: Customer, account_number: int) -> Optional[Account]:
+        """
+        Get an account of a logged in customer.
+        :param user: The logged in customer.
+        :param account_number: Account number of the account.
+        :return: The account matching the account number.
+        """
+        if account := self._find_customer_account(user, account_number):
+            return account
+        raise ValueError(f"Account with account number {account_number} not found.")
+
+    @log_exc(exc=ValueError, return_value=None)
+    def find_account(self, account_number: int) -> Optional[tuple[Customer, Account]]:
+        """
+        Find any account in the bank without logging in as its owner.
+        :param account_number: Account number of the account.
+        :return: The owner and the account matching the account number.
+        """
+        with self._lock.read():
+            entry = self._lookup_account(account_number)
+        if entry:
+            return entry
+        raise ValueError(f"Account with account number {account_number} not found.")
+
+    def statement(
+            self,
+            account_number: int,
+            start: Optional[float] = None,
+            end: Optional[float] = None,
+            session: Optional[str] = None,
+    ) -> Optional[list[tuple[float, int, int, str]]]:
+        """
+        Get the transactions of an account of the currently logged in customer, archived ones included
+        :param account_number: Account number of the account.
+        :param start: Earliest time to include in seconds since the epoch, the first transaction if not specified
+        :param end: Time to stop before in seconds since the epoch, the last transaction if not specified
+        :param session: Session token, the currently logged in customer if not specified
+        :return: The time in seconds, amount in cents, balance in cents and kind of every transaction
+        """
+        if not (account := self.get_account(account_number, session)):
+            return None
+
+        entries = []
+        # Spilling holds the account lock too, so no transaction is seen twice or missed
+        with account.lock:
+            if self.ledger_archive is not None:
+                entries.extend(self.ledger_archive.entries(account_number, start, end))
+            if account._ledger is not None:
+                entries.extend(account._ledger.entries(start, end))
+        return entries
+
+    def enable_ledger_archive(self, file_path: str) -> LedgerArchive:
+        """
+        Open the file that spill_ledgers moves older transactions to and statements read them back from
+        :param file_path: Path to the archive
+        :return: The archive
+        """
+        with self._lock.write():
+            if self.ledger_archive is None:
+                self.ledger_archive = LedgerArchive(file_path)
+        return self.ledger_archive
+
+    def spill_ledgers(self, before: float) -> int:
+        """
+        Move the transactions older than a time from memory to the ledger archive
+        :param before: Time in seconds since the epoch
+        :return: The number of transactions that were moved
+        """
+        if self.ledger_archive is None:
+            raise ValueError("Call enable_ledger_archive first")
+
+        count = 0
+        with self._lock.read():
+            for account_number, (_, account) in list(self._account_index.items()):
+                if account._ledger is None:
+                    continue
+                with account.lock:
+                    count += self.ledger_archive.append(account_number, account._ledger.take_before(before))
+        return count
+
+    def _export_customers(self, names: Optional[Iterable[str]]) -> Iterator[Customer]:
+        """
+        Walk the customers to export under the read lock, so no save replaces the storage while it is read
+        :param names: Names of the customers to export, every customer if not specified
+        :return: An iterator over the customers, customers a lazy storage has not loaded are read from it one at a time
+        """
+        with self._lock.read():
+            if names is not None:
+                for name in names:
+                    if (customer := self._lookup_customer(Customer.normalize_name(name))) is not None:
+                        yield customer
+                return
+
+            yield from self.customers
+            if self.storage and self.storage.lazy:
+                # The bank has the final say on the customers it loaded
+                for customer in self.storage.iter_customers():
+                    if customer.name not in self._customer_index and customer.name not in self._removed_names:
+                        yield customer
+
+    @log_exc(exc=OSError, return_value=None)
+    def export_customers(
+            self,
+            file_path: str,
+            names: Optional[Iterable[str]] = None,
+            chunk_size: int = export.DEFAULT_CHUNK_SIZE,
+    ) -> Optional[int]:
+        """
+        Stream the customers to a CSV file, or a JSON lines file if the extension is .jsonl
+        :param file_path: Path to the file
+        :param names: Names of the customers to export, every customer if not specified
+        :param chunk_size: Number of rows encoded before they are written
+        :return: The number of rows written, None if writing failed
+        """
+        customers = export.iter_customers(self._export_customers(names))
+        return export.write_rows(export.customer_rows(customers), file_path, export.CUSTOMER_FIELDS, chunk_size)
+
+    @log_exc(exc=OSError, return_value=None)
+    def export_accounts(
+            self,
+            file_path: str,
+            names: Optional[Iterable[str]] = None,
+            min_balance: Optional[Money] = None,
+            max_balance: Optional[Money] = None,
+            chunk_size: int = export.DEFAULT_CHUNK_SIZE,
+    ) -> Optional[int]:
+        """
+        Stream the accounts to a CSV file, or a JSON lines file if the extension is .jsonl
+        :param file_path: Path to the file
+        :param names: Names of the owners to export, every customer if not specified
+        :param min_balance: Lowest balance to include
+        :param max_balance: Highest balance to include
+        :param chunk_size: Number of rows encoded before they are written
+        :return: The number of rows written, None if writing failed
+        """
+        accounts = export.iter_accounts(self._export_customers(names), min_balance, max_balance)
+        return export.write_rows(export.account_rows(accounts), file_path, export.ACCOUNT_FIELDS, chunk_size)
+
+    @log_exc(exc=OSError, return_value=None)
+    def export_statements(
+            self,
+            file_path: str,
+            start: Optional[float] = None,
+            end: Optional[float] = None,
+            names: Optional[Iterable[str]] = None,
+            min_balance: Optional[Money] = None,
+            max_balance: Optional[Money] = None,
+            chunk_size: int = export.DEFAULT_CHUNK_SIZE,
+    ) -> Optional[int]:
+        """
+        Stream the transactions of accounts in a time range, archived ones included,
+        to a CSV file, or a JSON lines file if the extension is .jsonl
+        :param file_path: Path to the file
+        :param start: Earliest time to include in seconds since the epoch
+        :param end: Time to stop before in seconds since the epoch
+        :param names: Names of the owners to export, every customer if not specified
+        :param min_balance: Lowest current balance of the accounts to include
+        :param max_balance: Highest current balance of the accounts to include
+        :param chunk_size: Number of rows encoded before they are written
+        :return: The number of rows written, None if writing failed
+        """
+        accounts = export.iter_accounts(self._export_customers(names), min_balance, max_balance)
+        transactions = export.iter_transactions(accounts, start, end, self.ledger_archive)
+        return export.write_rows(
+            export.transaction_rows(transactions), file_path, export.TRANSACTION_FIELDS, chunk_size
+        )
 
     @log_exc(exc=TypeError, return_value=False)
-    def deposit(self, account_number: int, amount: Union[int, float]) -> bool:
+    def deposit(
+            self,
+            account_number: int,
+            amount: Union[int, float],
+            session: Optional[str] = None,
+    ) -> bool:
         """
         Deposit money to an account.
         :param account_number: Account number of the account.
         :param amount: The amount to be added.
+        :param session: Session token, the currently logged in customer if not specified
         :return: True if successful else False
         """
         if not isinstance(amount, (int, float)):
             raise TypeError(f"Expected type (int | float), got {type(amount)}")
 
-        if account := self.get_account(account_number):
-            return account.balance_add(amount)
+        with self._lock.read():
+            if account := self.get_account(account_number, session):
+                # The account lock keeps journaled balances in the order they happened
+                with account.lock:
+                    if account.balance_add(amount):
+                        self._journal_balance(account)
+                        return True
 
         return False
 
     @log_exc(exc=TypeError, return_value=False)
-    def withdraw(self, account_number: int, amount: Union[int, float]) -> bool:
+    def withdraw(
+            self,
+            account_number: int,
+            amount: Union[int, float],
+            session: Optional[str] = None,
+    ) -> bool:
         """
         Withdraw money from an account.
         :param account_number: Account number of the account.
         :param amount: The amount to be subtracted.
+        :param session: Session token, the currently logged in customer if not specified
         :return: True if successful else False
         """
         if not isinstance(amount, (int, float)):
             raise TypeError(f"Expected type (int | float), got {type(amount)}")
 
-        if account := self.get_account(account_number):
-            return account.balance_sub(amount)
+        with self._lock.read():
+            if account := self.get_account(account_number, session):
+                with account.lock:
+                    if account.balance_sub(amount):
+                        self._journal_balance(account)
+                        return True
 
         return False
 
+    @log_exc(exc=(CustomerNotFoundError, TypeError, ValueError), return_value=False)
+    def transfer(
+            self,
+            src: int,
+            dst: int,
+            amount: Union[int, float],
+            session: Optional[str] = None,
+    ) -> bool:
+        """
+        Move money from an account of the currently logged in customer to any account.
+        Either both balances change or neither does.
+        :param src: Account number of the account to withdraw from.
+        :param dst: Account number of the account to deposit to.
+        :param amount: The amount to be moved.
+        :param session: Session token, the currently logged in customer if not specified
+        :return: True if successful else False
+        """
+        if not isinstance(amount, (int, float)):
+            raise TypeError(f"Expected type (int | float), got {type(amount)}")
+        # Checked after rounding, like deposit, so an amount below half a cent is no transfer
+        cents = to_cents(amount)
+        if cents <= 0:
+            raise ValueError(f"Amount: {amount} <= 0")
+        if src == dst:
+            raise ValueError(f"Can not transfer from account {src} to itself")
+
+        user = self._get_user(session)
+        with self._lock.read():
+            # Loading dst may let a writer in, so src is found after it
+            if not (dst_entry := self._lookup_account(dst)):
+                raise ValueError(f"Account with account number {dst} not found.")
+            if not (src_account := self._get_user_account(user, src)):
+                return False
+
+            if not self._move(src_account, dst_entry[1], cents):
+                raise ValueError(f"Amount: {amount} > {src_account.balance}")
+        return True
+
+    def transfer_many(
+            self, transfers: Iterable[tuple[int, int, Union[int, float]]]
+    ) -> list[bool]:
+        """
+        Move money between any accounts in the bank, for back office batches.
+        Every transfer is atomic on its own and a failed transfer does not stop the batch.
+        :param transfers: Tuples of source account number, destination account number and amount
+        :return: For every transfer True if successful else False
+        """
+        results = []
+        touched: dict[int, Account] = {}
+        get_entry = self._lookup_account
+        get_loaded = self._account_index.get
+        with self._lock.read():
+            try:
+                for row in transfers:
+                    try:
+                        src, dst, amount = row
+                        cents = to_cents(amount) if isinstance(amount, (int, float)) else 0
+                        valid = cents > 0 and src != dst
+                        src_entry = get_entry(src) if valid else None
+                        dst_entry = get_entry(dst) if src_entry else None
+                        # Loading dst may have let a writer remove src
+                        src_entry = get_loaded(src) if dst_entry else None
+                    except (TypeError, ValueError):
+                        src_entry = dst_entry = None
+                    if (
+                            src_entry is None
+                            or dst_entry is None
+                            or not self._move(src_entry[1], dst_entry[1], cents, False)
+                    ):
+                        results.append(False)
+                        continue
+
+                    touched[src] = src_entry[1]
+                    touched[dst] = dst_entry[1]
+                    results.append(True)
+            finally:
+                # Journal each account once with its final balance instead of once per transfer,
+                # also when reading the transfers fails midway
+                for account_number, account in touched.items():
+                    with account.lock:
+                        self._journal_balance(account)
+
+        if failed := results.count(False):
+            DEFAULT_LOGGER.error(f"{failed} of {len(results)} transfers failed")
+        return results
+
+    def apply_batch(
+            self, operations: Iterable[tuple[str, int, Union[int, float]]]
+    ) -> array:
+        """
+        Apply many deposits and withdrawals to any accounts in the bank, for settlement feeds.
+        Operations on the same account are applied in order, a withdrawal fails on its own
+        if the balance at that point is insufficient.
+        :param operations: Tuples of "deposit" or "withdraw", account number and amount
+        :return: Array with a BATCH_* result code for every operation
+        """
+        rows = list(operations)
+        results = array("B", bytes(len(rows)))
+        # Signed amounts in cents, converted once while the rows are checked
+        amounts = [0] * len(rows)
+        groups: dict[int, list[int]] = {}
+        for idx, row in enumerate(rows):
+            try:
+                kind, account_number, amount = row
+                if kind not in ("deposit", "withdraw") or not isinstance(amount, (int, float)):
+                    raise ValueError(f"Invalid operation: {row!r}")
+                if (cents := to_cents(amount)) <= 0:
+                    raise ValueError(f"Amount: {amount} <= 0")
+                groups.setdefault(account_number, []).append(idx)
+            except (TypeError, ValueError):
+                results[idx] = BATCH_INVALID
+                continue
+            amounts[idx] = -cents if kind == "withdraw" else cents
+
+        with self._lock.read():
+            for account_number, indices in groups.items():
+                if not (entry := self._lookup_account(account_number)):
+                    for idx in indices:
+                        results[idx] = BATCH_NOT_FOUND
+                    continue
+
+                account = entry[1]
+                with account.lock:
+                    for idx in indices:
+                        if not account._apply(amounts[idx]):
+                            results[idx] = BATCH_INSUFFICIENT_FUNDS
+                    self._journal_balance(account)
+
+        if failed := len(rows) - results.count(BATCH_OK):
+            DEFAULT_LOGGER.error(f"{failed} of {len(rows)} batch operations failed")
+        return results
+
+    def _move(
+            self, src: Account, dst: Account, cents: int, journal: bool = True
+    ) -> bool:
+        """
+        Atomically move money between two accounts.
+        The account locks are always taken in the same order, so two opposite transfers can not deadlock.
+        :param src: The account to withdraw from.
+        :param dst: The account to deposit to.
+        :param cents: The positive amount in cents to be moved.
+        :param journal: Journal the new balances
+        :return: True if successful, False if the source account has insufficient funds
+        """
+        # Accounts share striped locks, so order by lock rather than by account number
+        first, second = sorted((src.lock, dst.lock), key=id)
+        with first, second:
+            if not src._apply(-cents, TRANSFER_OUT):
+                return False
+            dst._apply(cents, TRANSFER_IN)
+            if journal:
+                self._journal_balance(src)
+                self._journal_balance(dst)
+        return True
+
     def to_json(self) -> dict:
         """
         Convert the object to json format
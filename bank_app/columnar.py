@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+from typing import Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, only this store needs it
+    np = None
+
+from .account import Account, to_cents
+
+
+class AccountView(Account):
+    """
+    Account whose balance lives in a row of a ColumnarAccounts store.
+    It works everywhere an Account does, every balance change goes straight to the store.
+    """
+
+    __slots__ = ("_store", "_row", "_detached")
+
+    def __init__(self, store: ColumnarAccounts, row: int, account_number: int):
+        self.account_number = account_number
+        self.dirty = True
+        self._ledger = None
+        self._store = store
+        self._row = row
+
+    @property
+    def _cents(self) -> int:
+        if self._store is None:
+            return self._detached
+        return int(self._store._cents[self._row])
+
+    @_cents.setter
+    def _cents(self, cents: int) -> None:
+        if self._store is None:
+            self._detached = cents
+        else:
+            self._store._cents[self._row] = cents
+
+    def _detach(self) -> None:
+        """
+        Keep the balance on the view itself once its row is removed from the store
+        """
+        self._detached = self._cents
+        self._store = None
+
+
+class ColumnarAccounts:
+    """
+    Account numbers, owners and balances in cents kept in contiguous numpy arrays,
+    so bank wide totals and filters run as vectorized operations.
+
+    Rows are kept dense, removing an account moves the last row into its place.
+    Adding and removing accounts is not thread safe on its own, a Bank does it
+    while holding its write lock.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """
+        :param capacity: Number of accounts to allocate room for up front
+        """
+        if np is None:
+            raise ImportError("ColumnarAccounts requires numpy, install it with pip install numpy")
+
+        capacity = max(capacity, 1)
+        self._numbers = np.zeros(capacity, dtype=np.int64)
+        self._owners = np.zeros(capacity, dtype=np.int32)
+        self._cents = np.zeros(capacity, dtype=np.int64)
+        self._views: list[AccountView] = []
+        self._rows: dict[int, int] = {}
+        self._owner_names: list[str] = []
+        self._owner_ids: dict[str, int] = {}
+
+    def _grow(self, capacity: int) -> None:
+        """
+        Reallocate the arrays with room for more rows
+        :param capacity: The new number of rows
+        """
+        size = len(self)
+        for name in ("_numbers", "_owners", "_cents"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:size] = column[:size]
+            setattr(self, name, grown)
+
+    def _owner_id(self, owner: str) -> int:
+        if (owner_id := self._owner_ids.get(owner)) is None:
+            owner_id = self._owner_ids[owner] = len(self._owner_names)
+            self._owner_names.append(owner)
+        return owner_id
+
+    def add(self, owner: str, account_number: int, cents: int = 0) -> AccountView:
+        """
+        Add an account to the store
+        :param owner: Name of the customer that owns the account
+        :param account_number: Account number of the account
+        :param cents: Balance in cents
+        :return: A view of the new row
+        """
+        if account_number in self._rows:
+            raise ValueError(f"Account with account number {account_number} already exists")
+
+        row = len(self)
+        if row == len(self._cents):
+            self._grow(row * 2)
+        self._numbers[row] = account_number
+        self._owners[row] = self._owner_id(owner)
+        self._cents[row] = cents
+        view = AccountView(self, row, account_number)
+        self._views.append(view)
+        self._rows[account_number] = row
+        return view
+
+    def adopt(self, owner: str, account: Account) -> AccountView:
+        """
+        Copy an account into the store, a view is returned unchanged
+        :param owner: Name of the customer that owns the account
+        :param account: The account to be copied
+        :return: A view to be used in place of the account
+        """
+        if isinstance(account, AccountView) and account._store is self:
+            return account
+
+        view = self.add(owner, account.account_number, account.cents)
+        view.dirty = account.dirty
+        view._ledger = account._ledger
+        return view
+
+    def remove(self, account_number: int) -> bool:
+        """
+        Remove an account from the store
+        :param account_number: Account number of the account
+        :return: True if the account was in the store else False
+        """
+        row = self._rows.pop(account_number, None)
+        if row is None:
+            return False
+
+        last = len(self) - 1
+        removed = self._views[row]
+        # The removed view keeps working on its own, detached from the store
+        removed._detach()
+        if row != last:
+            for column in (self._numbers, self._owners, self._cents):
+                column[row] = column[last]
+            moved = self._views[last]
+            moved._row = row
+            self._views[row] = moved
+            self._rows[moved.account_number] = row
+        self._views.pop()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._views)
+
+    def __contains__(self, account_number: int) -> bool:
+        return account_number in self._rows
+
+    @property
+    def account_numbers(self) -> np.ndarray:
+        """
+        Account numbers of all rows, read only
+        """
+        return self._column(self._numbers)
+
+    @property
+    def cents(self) -> np.ndarray:
+        """
+        Balances in cents of all rows, read only
+        """
+        return self._column(self._cents)
+
+    def _column(self, column: np.ndarray) -> np.ndarray:
+        view = column[: len(self)]
+        view.flags.writeable = False
+        return view
+
+    def total(self) -> float:
+        """
+        Sum of all balances
+        :return: The total represented as a float with 2 decimals of precision
+        """
+        return int(self.cents.sum()) / 100
+
+    def below(self, amount) -> np.ndarray:
+        """
+        Find the accounts with a balance below an amount
+        :param amount: The amount
+        :return: The account numbers
+        """
+        return self.account_numbers[self.cents < to_cents(amount)]
+
+    def between(self, low, high) -> np.ndarray:
+        """
+        Find the accounts with a balance in a range
+        :param low: Lowest balance to include
+        :param high: Highest balance to include
+        :return: The account numbers
+        """
+        cents = self.cents
+        return self.account_numbers[(cents >= to_cents(low)) & (cents <= to_cents(high))]
+
+    def histogram(self, bins=10) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Count the accounts per balance range
+        :param bins: Number of equal ranges or a sequence of range edges in money
+        :return: The counts and the range edges
+        """
+        return np.histogram(self.cents / 100, bins=bins)
+
+    def owner_totals(self) -> dict[str, float]:
+        """
+        Sum the balances of every customer
+        :return: Total balance per customer name, for customers with accounts in the store
+        """
+        owners = self._owners[: len(self)]
+        cents = self.cents
+        if int(np.abs(cents).sum()) < 2**53:
+            # Float sums of whole cents are exact below 2**53
+            totals = np.bincount(owners, cents, len(self._owner_names)).astype(np.int64)
+        else:
+            totals = np.zeros(len(self._owner_names), dtype=np.int64)
+            np.add.at(totals, owners, cents)
+        present = np.flatnonzero(np.bincount(owners, minlength=len(self._owner_names)))
+        names = self._owner_names
+        return {
+            names[owner]: total / 100
+            for owner, total in zip(present.tolist(), totals[present].tolist())
+        }
+
+    def find(self, account_number: int) -> Optional[AccountView]:
+        """
+        Find the view of an account
+        :param account_number: Account number of the account
+        :return: The view if the account is in the store else None
+        """
+        row = self._rows.get(account_number)
+        return None if row is None else self._views[row]
@@ -1,26 +1,183 @@
+import binascii
+import re
+from typing import Optional, Sequence, Union
+
 from passlib.hash import bcrypt
 
 from bank_app.logger import log_exc
 from .account import Account
 
+# Cost factor of new password hashes
+BCRYPT_ROUNDS = 13
+
+_BCRYPT64 = b"./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+_BASE64 = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+# Bcrypt writes salt and digest in base64 with its own alphabet and no padding
+_TO_BASE64 = bytes.maketrans(_BCRYPT64, _BASE64)
+_TO_BCRYPT64 = bytes.maketrans(_BASE64, _BCRYPT64)
+_BCRYPT_HASH = re.compile(rb"\$2([abxy])\$(\d\d)\$([./A-Za-z0-9]{53})")
+# First byte of a packed hash, never the first byte of a hash in its text form
+PACKED = b"\0"
+
+
+def pack_hash(password_hash: bytes) -> bytes:
+    """
+    Pack a bcrypt hash into raw bytes, 45 instead of 60.
+    Salt and digest are decoded together as one base64 string, so every valid hash round-trips exactly.
+    :param password_hash: The hash in its text form
+    :return: The packed hash, or the hash itself if it is not a bcrypt hash
+    """
+    if (match := _BCRYPT_HASH.fullmatch(password_hash)) is None:
+        return password_hash
+    ident, cost, encoded = match.groups()
+    # Three more characters make the 53 a whole number of base64 quads
+    return PACKED + ident + bytes((int(cost),)) + binascii.a2b_base64(encoded.translate(_TO_BASE64) + b"AAA")
+
+
+def unpack_hash(password_hash: bytes) -> bytes:
+    """
+    :param password_hash: A hash from pack_hash
+    :return: The hash in its text form
+    """
+    if password_hash[:1] != PACKED:
+        return password_hash
+    encoded = binascii.b2a_base64(password_hash[3:], newline=False)[:53].translate(_TO_BCRYPT64)
+    return b"$2%c$%02d$" % (password_hash[1], password_hash[2]) + encoded
+
 
 class Customer:
+    __slots__ = ("_dirty", "name", "__password", "_accounts")
+
     def __init__(self, name: str, password: str, hash_password: bool = True):
-        self.name = name.lower()
+        self._dirty = True
+        self.name = self.normalize_name(name)
         if hash_password:
             self.password = password
         else:
-            self.__password = password
+            self.set_password_hash(password)
 
-        self.accounts: list[Account] = []
+        # None without accounts and the account itself while there is only one, see accounts
+        self._accounts: Union[None, Account, list[Account]] = None
 
     @property
-    def password(self):
-        return self.__password
+    def password(self) -> str:
+        return unpack_hash(self.__password).decode()
 
     @password.setter
     def password(self, password: str):
-        self.__password = bcrypt.using(rounds=13).hash(password)
+        self.__password = pack_hash(self.create_password_hash(password).encode())
+        self._dirty = True
+
+    @staticmethod
+    def create_password_hash(password: str, rounds: Optional[int] = None) -> str:
+        """
+        Hash a password, this is slow on purpose and can be run outside the bank
+        :param password: The password to be hashed
+        :param rounds: Cost factor of the hash, BCRYPT_ROUNDS if not specified
+        :return: The bcrypt hash of the password
+        """
+        return bcrypt.using(rounds=rounds or BCRYPT_ROUNDS).hash(password)
+
+    @property
+    def password_hash(self) -> bytes:
+        """
+        The bcrypt hash of the password as it is stored, packed by pack_hash if it is a bcrypt hash
+        """
+        return self.__password
+
+    def set_password_hash(self, password_hash: Union[str, bytes]) -> None:
+        """
+        Replace the password with an already hashed password
+        :param password_hash: The bcrypt hash of the password, as text or as packed by pack_hash
+        """
+        if isinstance(password_hash, str):
+            password_hash = password_hash.encode()
+        self.__password = pack_hash(password_hash)
+        self._dirty = True
+
+    @property
+    def accounts(self) -> list[Account]:
+        """
+        A new list of the accounts of the customer, changing it does not change the customer.
+        Most customers own a single account, which is kept without a list, see view_accounts.
+        """
+        return list(self.view_accounts())
+
+    @accounts.setter
+    def accounts(self, accounts: list[Account]):
+        self._accounts = accounts
+
+    def set_accounts(self, accounts: list[Account]) -> None:
+        """
+        Replace the accounts, keeping a single account without a list
+        :param accounts: The accounts
+        """
+        self._accounts = accounts[0] if len(accounts) == 1 else accounts or None
+
+    def view_accounts(self) -> Sequence[Account]:
+        """
+        Read the accounts without creating a list for a single account
+        :return: The accounts, not to be modified
+        """
+        accounts = self._accounts
+        if accounts is None:
+            return ()
+        return accounts if type(accounts) is list else (accounts,)
+
+    def replace_account(self, account: Account, replacement: Account) -> None:
+        """
+        Put another account in the place of an account of the customer
+        :param account: The account
+        :param replacement: The account to take its place
+        """
+        if self._accounts is account:
+            self._accounts = replacement
+        else:
+            accounts = self._accounts
+            accounts[next(idx for idx, other in enumerate(self.view_accounts()) if other is account)] = replacement
+
+    def remove_account(self, account: Account) -> None:
+        """
+        Remove an account of the customer
+        :param account: The account
+        """
+        if self._accounts is account:
+            self._accounts = None
+        elif type(self._accounts) is list:
+            self._accounts.remove(account)
+        else:
+            raise ValueError(f"Account {account.account_number} does not belong to {self.name}")
+        self._dirty = True
+
+    @property
+    def dirty(self) -> bool:
+        """
+        Whether the customer or any of its accounts changed since it was last saved
+        """
+        return self._dirty or any(account.dirty for account in self.view_accounts())
+
+    def mark_dirty(self) -> None:
+        """
+        Flag the customer as changed, for changes made directly to its accounts list
+        """
+        self._dirty = True
+
+    def mark_clean(self) -> None:
+        """
+        Flag the customer and its accounts as saved
+        """
+        self._dirty = False
+        for account in self.view_accounts():
+            account.dirty = False
+
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        """
+        Normalize a name the same way as it is stored on a customer
+        :param name: The name to be normalized
+        :return: The normalized name
+        """
+        return name.lower()
 
     def check_name(self, other_name: str) -> bool:
         """
@@ -28,7 +185,7 @@ class Customer:
         :param other_name: The name to be checked
         :return: True if equal else False
         """
-        return self.name == other_name.lower()
+        return self.name == self.normalize_name(other_name)
 
     def check_password(self, other_password: str) -> bool:
         """
@@ -48,18 +205,25 @@ class Customer:
         if not isinstance(account, Account):
             raise TypeError(f"Expected type Account, got {type(account)}")
 
-        self.accounts.append(account)
+        accounts = self._accounts
+        if accounts is None:
+            self._accounts = account
+        elif type(accounts) is list:
+            accounts.append(account)
+        else:
+            self._accounts = [accounts, account]
+        self._dirty = True
         return True
 
     def to_json(self):
         return {
             "name": self.name,
             "password": self.password,
-            "accounts": [account.to_json() for account in self.accounts],
+            "accounts": [account.to_json() for account in self.view_accounts()],
         }
 
     def __str__(self):
-        return f"Customer({self.name}, {self.password}, accounts={self.accounts})"
+        return f"Customer({self.name}, {self.password}, accounts={list(self.view_accounts())})"
 
     def __repr__(self):
         return f"Customer({self.name}, {self.password})"
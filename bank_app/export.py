@@ -0,0 +1,195 @@
+"""
+Stream customers, accounts and transactions to CSV or JSON lines files in constant memory.
+
+Every stage is a generator, so exports can be chained from any iterable of customers,
+the customers of a bank or parser_json.iter_customers reading a save file alike:
+
+    accounts = iter_accounts(parser_json.iter_customers(path), min_balance=1000)
+    write_rows(account_rows(accounts), "accounts.csv", ACCOUNT_FIELDS)
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional
+
+from .account import Account, Money, to_cents
+from .customer import Customer
+from .ledger import LedgerArchive
+from .parser_json import _atomic_write
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+CUSTOMER_FIELDS = ("name", "accounts", "balance")
+ACCOUNT_FIELDS = ("name", "account_number", "balance")
+TRANSACTION_FIELDS = ("name", "account_number", "time", "kind", "amount", "balance")
+
+# json.dumps builds a new encoder per call when given options, one is shared instead
+_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+
+def iter_customers(
+    customers: Iterable[Customer], names: Optional[Iterable[str]] = None
+) -> Iterator[Customer]:
+    """
+    Filter customers by name
+    :param customers: The customers
+    :param names: Names of the customers to keep, all customers if not specified
+    :return: An iterator over the kept customers
+    """
+    if names is None:
+        yield from customers
+        return
+
+    names = {Customer.normalize_name(name) for name in names}
+    for customer in customers:
+        if customer.name in names:
+            yield customer
+
+
+def iter_accounts(
+    customers: Iterable[Customer],
+    min_balance: Optional[Money] = None,
+    max_balance: Optional[Money] = None,
+) -> Iterator[tuple[Customer, Account]]:
+    """
+    Walk the accounts of customers, filtered by balance
+    :param customers: The customers
+    :param min_balance: Lowest balance to include
+    :param max_balance: Highest balance to include
+    :return: An iterator over every owner and account
+    """
+    low = None if min_balance is None else to_cents(min_balance)
+    high = None if max_balance is None else to_cents(max_balance)
+    for customer in customers:
+        for account in customer.view_accounts():
+            cents = account.cents
+            if (low is None or cents >= low) and (high is None or cents <= high):
+                yield customer, account
+
+
+def iter_transactions(
+    accounts: Iterable[tuple[Customer, Account]],
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    archive: Optional[LedgerArchive] = None,
+) -> Iterator[tuple[Customer, Account, tuple[float, int, int, str]]]:
+    """
+    Walk the transactions of accounts in a time range, archived ones first
+    :param accounts: Owners and accounts
+    :param start: Earliest time to include in seconds since the epoch
+    :param end: Time to stop before in seconds since the epoch
+    :param archive: Archive the ledgers were spilled to
+    :return: An iterator over every owner, account and ledger entry
+    """
+    for customer, account in accounts:
+        entries = []
+        # Collected one account at a time under its lock, like Bank.statement,
+        # so a concurrent spill to the archive neither repeats nor drops entries
+        with account.lock:
+            if archive is not None:
+                entries.extend(archive.entries(account.account_number, start, end))
+            if account._ledger is not None:
+                entries.extend(account._ledger.entries(start, end))
+        for entry in entries:
+            yield customer, account, entry
+
+
+def customer_rows(customers: Iterable[Customer]) -> Iterator[tuple]:
+    """
+    :param customers: The customers
+    :return: An iterator over rows of CUSTOMER_FIELDS, never including password hashes
+    """
+    for customer in customers:
+        accounts = customer.view_accounts()
+        yield customer.name, len(accounts), sum(account.cents for account in accounts) / 100
+
+
+def account_rows(accounts: Iterable[tuple[Customer, Account]]) -> Iterator[tuple]:
+    """
+    :param accounts: Owners and accounts
+    :return: An iterator over rows of ACCOUNT_FIELDS
+    """
+    for customer, account in accounts:
+        yield customer.name, account.account_number, account.balance
+
+
+def transaction_rows(
+    transactions: Iterable[tuple[Customer, Account, tuple[float, int, int, str]]]
+) -> Iterator[tuple]:
+    """
+    :param transactions: Owners, accounts and ledger entries
+    :return: An iterator over rows of TRANSACTION_FIELDS, times in ISO 8601 UTC
+    """
+    for customer, account, (time, cents, balance, kind) in transactions:
+        yield (
+            customer.name,
+            account.account_number,
+            datetime.fromtimestamp(time, timezone.utc).isoformat(),
+            kind,
+            cents / 100,
+            balance / 100,
+        )
+
+
+def write_rows(
+    rows: Iterable[tuple],
+    file_path: str,
+    fields: tuple[str, ...],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """
+    Write rows to a CSV file, or a JSON lines file if the extension is .jsonl.
+    The file is replaced in one step once every row is written.
+    :param rows: The rows
+    :param file_path: Path to the file
+    :param fields: Names of the columns
+    :param chunk_size: Number of rows encoded before they are written
+    :return: The number of rows written
+    """
+    count = [0]
+    if os.path.splitext(str(file_path))[1].lower() == ".jsonl":
+        chunks = _jsonl_chunks(rows, fields, chunk_size, count)
+    else:
+        chunks = _csv_chunks(rows, fields, chunk_size, count)
+    _atomic_write(file_path, chunks)
+    return count[0]
+
+
+def _csv_chunks(
+    rows: Iterable[tuple], fields: tuple[str, ...], chunk_size: int, count: list[int]
+) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending == chunk_size:
+            count[0] += pending
+            pending = 0
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    count[0] += pending
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _jsonl_chunks(
+    rows: Iterable[tuple], fields: tuple[str, ...], chunk_size: int, count: list[int]
+) -> Iterator[bytes]:
+    encode = _ENCODER.encode
+    lines = []
+    for row in rows:
+        lines.append(encode(dict(zip(fields, row))))
+        if len(lines) == chunk_size:
+            count[0] += len(lines)
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines.clear()
+    count[0] += len(lines)
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
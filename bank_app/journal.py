@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+import time
+from typing import Iterator, Optional
+
+from .logger import DEFAULT_LOGGER
+
+
+class Journal:
+    """
+    Append-only log of bank mutations, one compact json array per line.
+
+    Records describe the state after the mutation rather than the change itself,
+    so replaying the whole journal on top of any snapshot taken while it was
+    being written gives the same result. Every record is handed to the OS as it
+    is appended, so it survives the process dying, and records are fsynced in
+    groups, at the latest sync_interval seconds after they were appended.
+    """
+
+    def __init__(
+        self, file_path: str, sync_every: int = 64, sync_interval: float = 0.05
+    ):
+        """
+        :param file_path: Path to the journal file, created if it does not exist
+        :param sync_every: Number of records to buffer before they are fsynced
+        :param sync_interval: Number of seconds after which appended records are fsynced
+        """
+        self.file_path = file_path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._repair()
+        self._file = open(file_path, "a", encoding="utf-8")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+
+    def _repair(self) -> None:
+        """
+        Cut off a partially written last record left behind by a crash
+        """
+        try:
+            with open(self.file_path, "rb+") as file:
+                data = file.read()
+                if data and not data.endswith(b"\n"):
+                    file.truncate(data.rfind(b"\n") + 1)
+                    DEFAULT_LOGGER.warning(f"Truncated torn record in {self.file_path}")
+        except FileNotFoundError:
+            pass
+
+    def append(self, *record) -> None:
+        """
+        Append a record, syncing when enough records or time have accumulated
+        :param record: Operation name followed by its json serializable arguments
+        """
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._pending += 1
+            if (
+                self._pending >= self.sync_every
+                or time.monotonic() - self._last_sync >= self.sync_interval
+            ):
+                self.sync()
+            elif self._timer is None:
+                # Records appended before the bank goes idle are still fsynced in time
+                self._timer = threading.Timer(self.sync_interval, self._timed_sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _timed_sync(self) -> None:
+        with self._lock:
+            self._timer = None
+            if not self._file.closed:
+                self.sync()
+
+    def sync(self) -> None:
+        """
+        Flush and fsync all appended records
+        """
+        with self._lock:
+            if self._pending:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._pending = 0
+            self._last_sync = time.monotonic()
+
+    def records(self) -> Iterator[list]:
+        """
+        Read back all records in the order they were appended
+        :return: An iterator over the records
+        """
+        with self._lock:
+            self._file.flush()
+        with open(self.file_path, "r", encoding="utf-8") as file:
+            for line in file:
+                yield json.loads(line)
+
+    def truncate(self) -> None:
+        """
+        Discard all records, used once they are covered by a snapshot
+        """
+        with self._lock:
+            self._file.flush()
+            self._file.truncate(0)
+            os.fsync(self._file.fileno())
+            self._pending = 0
+            self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        """
+        Sync and close the journal file
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._file.closed:
+                self.sync()
+                self._file.close()
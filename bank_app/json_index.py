@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import struct
+from array import array
+from json import JSONDecodeError
+from typing import Iterator, Optional
+
+from .customer import Customer
+from .parser_json import DEFAULT_CHUNK_SIZE, GENERATION, _atomic_write, _file_stamp, _iter_array
+
+MAGIC = b"BKIX"
+VERSION = 1
+# Magic, version, inode, size and modification time of the indexed file, number of customers and accounts
+HEADER = struct.Struct("<4sIQQqQQ")
+# Hash of the name, byte offset and byte length of a customer in the indexed file
+CUSTOMER_RECORD = struct.Struct("<QQQ")
+# Account number and the position of its owner among the customer records
+ACCOUNT_RECORD = struct.Struct("<qQ")
+
+
+def name_hash(name: str) -> int:
+    """
+    Hash a name the same way in every process, unlike the builtin hash
+    :param name: Normalized name of a customer
+    :return: A 64 bit hash
+    """
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def get_index_path(file_path: str) -> str:
+    """
+    :param file_path: Path to a json save file
+    :return: Path to the sidecar index of the file
+    """
+    return f"{file_path}.idx"
+
+
+def build_index(file_path: str, index_path: Optional[str] = None) -> None:
+    """
+    Find where every customer is in a json save file and write it to a sidecar index.
+    The file is decoded once a chunk at a time, which the index then saves every later start from.
+    :param file_path: Path to the json save file
+    :param index_path: Path to the index, next to the file if not specified
+    """
+    stamp = _file_stamp(file_path)
+    # Flat arrays instead of a tuple per customer, so the index takes less memory to build than the file
+    keys, offsets, lengths = array("Q"), array("Q"), array("Q")
+    account_numbers, owners = array("q"), array("Q")
+    with open(file_path, "rb") as file:
+        try:
+            for item, start, end in _iter_array(file, DEFAULT_CHUNK_SIZE, spans=True):
+                if GENERATION in item:
+                    continue
+                for account in item["accounts"] or ():
+                    account_numbers.append(account["account_number"])
+                    owners.append(len(keys))
+                keys.append(name_hash(Customer.normalize_name(item["name"])))
+                offsets.append(start)
+                lengths.append(end - start)
+        except (UnicodeDecodeError, JSONDecodeError) as e:
+            raise OSError(f"Can not index {file_path}: {e}") from e
+
+    # Records sorted by key are binary searched straight from the mapped index
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    positions = array("Q", bytes(8 * len(keys)))
+    for position, idx in enumerate(order):
+        positions[idx] = position
+    data = bytearray(HEADER.pack(MAGIC, VERSION, *stamp, len(keys), len(account_numbers)))
+    for idx in order:
+        data += CUSTOMER_RECORD.pack(keys[idx], offsets[idx], lengths[idx])
+    del order
+    for idx in sorted(range(len(account_numbers)), key=account_numbers.__getitem__):
+        data += ACCOUNT_RECORD.pack(account_numbers[idx], positions[owners[idx]])
+    _atomic_write(index_path if index_path else get_index_path(file_path), data)
+
+
+class JsonIndex:
+    """
+    Finds single customers in a json save file without decoding the others.
+
+    The file and its sidecar index are memory mapped, so opening costs the same for
+    any number of customers and only the pages of the customers that are looked up
+    are ever read. The index is rebuilt whenever the file changed since it was written.
+    """
+
+    def __init__(self, file_path: str, index_path: Optional[str] = None):
+        """
+        :param file_path: Path to the json save file
+        :param index_path: Path to the sidecar index, next to the file if not specified
+        """
+        self.file_path = file_path
+        self.index_path = index_path if index_path else get_index_path(file_path)
+        stamp = _file_stamp(file_path)
+        if not self._open_index(stamp):
+            build_index(file_path, self.index_path)
+            if not self._open_index(stamp):
+                raise OSError(f"Index {self.index_path} does not match {file_path}")
+
+        with open(file_path, "rb") as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _open_index(self, stamp: list[int]) -> bool:
+        """
+        Map the sidecar index if it was built for this version of the file
+        :param stamp: Identity of the current version of the file
+        :return: True if the index can be used else False
+        """
+        try:
+            with open(self.index_path, "rb") as file:
+                index = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        if len(index) >= HEADER.size:
+            magic, version, *index_stamp, customer_count, account_count = HEADER.unpack_from(index)
+            size = HEADER.size + customer_count * CUSTOMER_RECORD.size + account_count * ACCOUNT_RECORD.size
+            if magic == MAGIC and version == VERSION and index_stamp == stamp and len(index) == size:
+                self._index = index
+                self.customer_count = customer_count
+                self.account_count = account_count
+                self._accounts_at = HEADER.size + customer_count * CUSTOMER_RECORD.size
+                return True
+        index.close()
+        return False
+
+    def _customer_record(self, position: int) -> tuple[int, int, int]:
+        return CUSTOMER_RECORD.unpack_from(self._index, HEADER.size + position * CUSTOMER_RECORD.size)
+
+    def _account_record(self, position: int) -> tuple[int, int]:
+        return ACCOUNT_RECORD.unpack_from(self._index, self._accounts_at + position * ACCOUNT_RECORD.size)
+
+    def _read(self, offset: int, length: int) -> dict:
+        return json.loads(self._data[offset:offset + length])
+
+    def find(self, name: str) -> Optional[dict]:
+        """
+        Decode a single customer
+        :param name: Normalized name of the customer
+        :return: The json of the customer if it is in the file else None
+        """
+        key = name_hash(name)
+        low, high = 0, self.customer_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._customer_record(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        # Different names with the same hash are next to each other
+        for position in range(low, self.customer_count):
+            record_key, offset, length = self._customer_record(position)
+            if record_key != key:
+                break
+            customer_json = self._read(offset, length)
+            if Customer.normalize_name(customer_json["name"]) == name:
+                return customer_json
+        return None
+
+    def find_owner(self, account_number: int) -> Optional[str]:
+        """
+        Find who owns an account
+        :param account_number: Account number of the account
+        :return: Normalized name of the owner if the account is in the file else None
+        """
+        low, high = 0, self.account_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._account_record(middle)[0] < account_number:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low == self.account_count:
+            return None
+        record_number, position = self._account_record(low)
+        if record_number != account_number:
+            return None
+        _, offset, length = self._customer_record(position)
+        return Customer.normalize_name(self._read(offset, length)["name"])
+
+    def raw_items(self) -> Iterator[tuple[int, bytes]]:
+        """
+        Walk the customers in the order of the index without decoding them, holding one at a time
+        :return: An iterator over the name hash and the json bytes of every customer
+        """
+        for position in range(self.customer_count):
+            key, offset, length = self._customer_record(position)
+            yield key, self._data[offset:offset + length]
+
+    def __len__(self) -> int:
+        return self.customer_count
+
+    def close(self) -> None:
+        self._index.close()
+        self._data.close()
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Iterator, Optional
+
+DEPOSIT = 0
+WITHDRAWAL = 1
+TRANSFER_IN = 2
+TRANSFER_OUT = 3
+KINDS = ("deposit", "withdrawal", "transfer_in", "transfer_out")
+
+# Account number and number of entries of a segment in a LedgerArchive, followed by its columns
+SEGMENT_HEADER = struct.Struct("<qQ")
+# Bytes per entry: time, amount and balance as int64 plus the kind as one byte
+ENTRY_SIZE = 8 * 3 + 1
+
+
+def to_micros(seconds: Optional[float]) -> Optional[int]:
+    return None if seconds is None else int(seconds * 1_000_000)
+
+
+class Ledger:
+    """
+    Append-only transaction history of one account.
+
+    Entries are kept in four parallel arrays instead of one object each, 25 bytes
+    per entry, and times never decrease, so a time range is found by binary search.
+    """
+
+    __slots__ = ("times", "amounts", "balances", "kinds", "last_time")
+
+    def __init__(self):
+        # Microseconds since the epoch, amounts and balances in cents
+        self.times = array("q")
+        self.amounts = array("q")
+        self.balances = array("q")
+        self.kinds = array("B")
+        # Kept when older entries are taken, so times also follow on from the archived ones
+        self.last_time = 0
+
+    def append(self, time: int, cents: int, balance: int, kind: int) -> None:
+        """
+        Record a transaction
+        :param time: Microseconds since the epoch, the time of the previous entry if it is earlier
+        :param cents: Signed amount in cents
+        :param balance: Balance in cents after the transaction
+        :param kind: One of DEPOSIT, WITHDRAWAL, TRANSFER_IN or TRANSFER_OUT
+        """
+        # The wall clock can be set back, an entry is never recorded before the one it follows
+        if time < self.last_time:
+            time = self.last_time
+        self.last_time = time
+        self.times.append(time)
+        self.amounts.append(cents)
+        self.balances.append(balance)
+        self.kinds.append(kind)
+
+    def entries(
+        self, start: Optional[float] = None, end: Optional[float] = None
+    ) -> Iterator[tuple[float, int, int, str]]:
+        """
+        Walk the transactions in a time range
+        :param start: Earliest time to include in seconds since the epoch, the first entry if not specified
+        :param end: Time to stop before in seconds since the epoch, the last entry if not specified
+        :return: An iterator over the time in seconds, amount in cents, balance in cents and kind of every entry
+        """
+        return _iter_entries(self.times, self.amounts, self.balances, self.kinds, start, end)
+
+    def take_before(self, before: float) -> tuple[array, array, array, array]:
+        """
+        Remove the entries older than a time
+        :param before: Time in seconds since the epoch
+        :return: The times, amounts, balances and kinds of the removed entries
+        """
+        count = bisect_left(self.times, to_micros(before))
+        columns = (self.times, self.amounts, self.balances, self.kinds)
+        taken = tuple(column[:count] for column in columns)
+        for column in columns:
+            del column[:count]
+        return taken
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+def _iter_entries(
+    times: array,
+    amounts: array,
+    balances: array,
+    kinds: array,
+    start: Optional[float],
+    end: Optional[float],
+) -> Iterator[tuple[float, int, int, str]]:
+    low = 0 if start is None else bisect_left(times, to_micros(start))
+    high = len(times) if end is None else bisect_left(times, to_micros(end))
+    for idx in range(low, high):
+        yield times[idx] / 1_000_000, amounts[idx], balances[idx], KINDS[kinds[idx]]
+
+
+class LedgerArchive:
+    """
+    Append-only file that ledgers spill their older entries to.
+
+    Every spill of an account is one segment, its entries stored column by column.
+    The time range of every segment is kept in memory, so a range query only reads
+    the segments that overlap it. Reopening the file scans the segment headers.
+    """
+
+    def __init__(self, file_path: str):
+        """
+        :param file_path: Path to the archive, created if it does not exist
+        """
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._file = open(file_path, "ab+")
+        # First time, last time, offset of the columns and number of entries per account
+        self._segments: dict[int, list[tuple[int, int, int, int]]] = {}
+        self._scan()
+
+    def _scan(self) -> None:
+        """
+        Index the segments of the file, cutting off a segment torn by a crash
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        offset = 0
+        while offset + SEGMENT_HEADER.size <= size:
+            self._file.seek(offset)
+            account_number, count = SEGMENT_HEADER.unpack(self._file.read(SEGMENT_HEADER.size))
+            columns_at = offset + SEGMENT_HEADER.size
+            if columns_at + count * ENTRY_SIZE > size:
+                break
+            first, last = array("q"), array("q")
+            self._file.seek(columns_at)
+            first.frombytes(self._file.read(8))
+            self._file.seek(columns_at + (count - 1) * 8)
+            last.frombytes(self._file.read(8))
+            if sys.byteorder == "big":
+                first.byteswap()
+                last.byteswap()
+            self._segments.setdefault(account_number, []).append((first[0], last[0], columns_at, count))
+            offset = columns_at + count * ENTRY_SIZE
+        if offset != size:
+            self._file.truncate(offset)
+
+    def append(self, account_number: int, columns: tuple[array, array, array, array]) -> int:
+        """
+        Write entries of an account as a new segment
+        :param account_number: Account number of the account
+        :param columns: Times, amounts, balances and kinds of the entries, from Ledger.take_before
+        :return: The number of entries written
+        """
+        times = columns[0]
+        if not times:
+            return 0
+
+        if sys.byteorder == "big":
+            columns = tuple(array(column.typecode, column) for column in columns)
+            for column in columns:
+                column.byteswap()
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            columns_at = self._file.tell() + SEGMENT_HEADER.size
+            self._file.write(SEGMENT_HEADER.pack(account_number, len(times)))
+            for column in columns:
+                self._file.write(column.tobytes())
+            self._file.flush()
+            self._segments.setdefault(account_number, []).append(
+                (times[0], times[-1], columns_at, len(times))
+            )
+        return len(times)
+
+    def entries(
+        self, account_number: int, start: Optional[float] = None, end: Optional[float] = None
+    ) -> Iterator[tuple[float, int, int, str]]:
+        """
+        Walk the archived transactions of an account in a time range
+        :param account_number: Account number of the account
+        :param start: Earliest time to include in seconds since the epoch
+        :param end: Time to stop before in seconds since the epoch
+        :return: An iterator over the time in seconds, amount in cents, balance in cents and kind of every entry
+        """
+        low, high = to_micros(start), to_micros(end)
+        for first, last, columns_at, count in list(self._segments.get(account_number, ())):
+            if (low is not None and last < low) or (high is not None and first >= high):
+                continue
+            yield from _iter_entries(*self._read(columns_at, count), start, end)
+
+    def _read(self, columns_at: int, count: int) -> tuple[array, array, array, array]:
+        with self._lock:
+            self._file.seek(columns_at)
+            data = self._file.read(count * ENTRY_SIZE)
+        columns = []
+        for idx in range(3):
+            column = array("q")
+            column.frombytes(data[idx * count * 8:(idx + 1) * count * 8])
+            if sys.byteorder == "big":
+                column.byteswap()
+            columns.append(column)
+        kinds = array("B")
+        kinds.frombytes(data[3 * count * 8:])
+        return columns[0], columns[1], columns[2], kinds
+
+    def __contains__(self, account_number: int) -> bool:
+        return account_number in self._segments
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
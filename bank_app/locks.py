@@ -0,0 +1,118 @@
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Iterator
+
+
+class RWLock:
+    """
+    Readers-writer lock, any number of readers or a single writer.
+
+    Both sides are reentrant and a writer may also take the read side, but a
+    reader must not try to become a writer other than through upgrade.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+
+    def acquire_read(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            while self._writer is not None:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self) -> None:
+        with self._cond:
+            if self._writer == threading.get_ident():
+                self._write_depth -= 1
+                return
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self) -> None:
+        with self._cond:
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    @contextmanager
+    def upgrade(self) -> Iterator[None]:
+        """
+        Trade the read side held once by this thread for the write side, and back afterwards.
+        Other writers may run while it waits, so anything read before must be checked again.
+        A writer keeps writing.
+        """
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+            else:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._writer = me
+                self._write_depth = 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._write_depth -= 1
+                if not self._write_depth:
+                    # Back to reading without letting another writer in first
+                    self._writer = None
+                    self._readers += 1
+                    self._cond.notify_all()
+
+
+class NullRWLock:
+    """
+    Stand-in for RWLock when only one thread uses the bank
+    """
+
+    _context = nullcontext()
+
+    def read(self) -> ContextManager[None]:
+        return self._context
+
+    def write(self) -> ContextManager[None]:
+        return self._context
+
+    def upgrade(self) -> ContextManager[None]:
+        return self._context
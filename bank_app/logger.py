@@ -1,22 +1,40 @@
 from __future__ import annotations
 
+import atexit
 import functools
+import inspect
 import logging
+import logging.handlers
 import pathlib
+import queue
+import random
 import sys
 import tempfile
 import warnings
 from os import PathLike
+from time import perf_counter
 from typing import Callable, Any, Iterable, Type
 
+from .metrics import METRICS, Metrics
+
+
+_listeners: dict[str, tuple[logging.handlers.QueueHandler, logging.handlers.QueueListener]] = {}
+
 
 def get_logger(
-    name: str = "bankapp", parent_dir_path: PathLike[str] = "logs"
+    name: str = "bankapp",
+    parent_dir_path: PathLike[str] = "logs",
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    when: str | None = None,
 ) -> logging.Logger:
     """
-    Get a logger
+    Get a logger that writes to a rotating file from a background thread
     :param name: Name referring to the logger. Recommended value is the __name__ of the module for separate files. Leave default for one file.
     :param parent_dir_path: Parent directory of the logs
+    :param max_bytes: Size in bytes at which the log file is rotated, never if 0
+    :param backup_count: Number of rotated log files to keep
+    :param when: Rotate on time instead of size, any interval accepted by TimedRotatingFileHandler such as "midnight"
     :return: A logger with the specified name, creating it if necessary.
     """
 
@@ -27,18 +45,69 @@ def get_logger(
 
     logger = logging.getLogger(name)
     logger.setLevel(logging.DEBUG)
-    handler = logging.FileHandler(log_file_path, mode="w")
+    if when:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            log_file_path, when=when, backupCount=backup_count
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            log_file_path, mode="a", maxBytes=max_bytes, backupCount=backup_count
+        )
     formatter = logging.Formatter(
         "%(levelname)s - %(module)s - line %(lineno)d - %(message)s"
     )
     handler.setFormatter(formatter)
-    logger.addHandler(handler)
+
+    # Callers only put records on a queue, the listener thread does the file I/O
+    stop_logger(name)
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    logger.addHandler(queue_handler)
+    _listeners[name] = (queue_handler, listener)
     return logger
 
 
+def stop_logger(name: str = "bankapp") -> None:
+    """
+    Write out the queued records of a logger from get_logger and detach its file
+    :param name: Name of the logger
+    """
+    if entry := _listeners.pop(name, None):
+        queue_handler, listener = entry
+        logging.getLogger(name).removeHandler(queue_handler)
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def stop_loggers() -> None:
+    """
+    Write out the queued records of all loggers from get_logger, done automatically on exit
+    """
+    for name in list(_listeners):
+        stop_logger(name)
+
+
+atexit.register(stop_loggers)
+
+
 DEFAULT_LOGGER = get_logger()
 
 
+_call_sample_rate = 1.0
+
+
+def set_call_sample_rate(rate: float) -> None:
+    """
+    Log only a random fraction of the "Calling ..." traces of decorators without their own sample rate
+    :param rate: Fraction of calls to trace, between 0 and 1
+    """
+    global _call_sample_rate
+    _call_sample_rate = rate
+
+
 def log_exc(
     _func: Callable | None = None,
     *,
@@ -46,6 +115,8 @@ def log_exc(
     logger: logging.Logger | None = DEFAULT_LOGGER,
     raise_exc: bool = False,
     return_value: Any = None,
+    sample: float | None = None,
+    metrics: Metrics | None = METRICS,
 ):
     """
     Capture an expected exception, log it and then raise or return.
@@ -55,33 +126,71 @@ def log_exc(
     :param logger: The logger to be used for logging calls
     :param raise_exc: Will log and return **return_value** if False, log and raise the exception that was caught if True
     :param return_value: The value to return when an expected exception is caught as long as **raise_exc** is False
+    :param sample: Fraction of calls to trace at INFO level, the rate set with set_call_sample_rate if not specified
+    :param metrics: Where to count the calls, errors and latency, not counted if None
     :return: func value if no exception, **return_value** if expected exception is caught and **raise_exc** is False
     """
+    expected = tuple(exc) if isinstance(exc, Iterable) else (exc,)
+    # Checked on every call, so the level can still be changed at runtime
+    enabled = logger.isEnabledFor if logger is not None else lambda level: False
+
     def decorator(func: Callable) -> Callable:
+        name = func.__qualname__
+
+        def trace() -> None:
+            rate = _call_sample_rate if sample is None else sample
+            if rate >= 1 or random.random() < rate:
+                logger.info("Calling %s", name, stacklevel=3)
+
+        def handle(e: Exception) -> Any:
+            if logger is not None:
+                logger.error("%s: %s", e.__class__.__name__, e, stacklevel=3)
+            if raise_exc or not isinstance(e, expected):
+                raise e
+
+            return return_value
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs) -> Any:
+                if enabled(logging.INFO):
+                    trace()
+                if metrics is None or not metrics.enabled:
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        return handle(e)
+
+                start = perf_counter()
+                try:
+                    value = await func(*args, **kwargs)
+                except Exception as e:
+                    metrics.observe(name, perf_counter() - start, True)
+                    return handle(e)
+                metrics.observe(name, perf_counter() - start)
+                return value
+
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            logger.info(f"Calling {func.__qualname__}", stacklevel=2)
+            if enabled(logging.INFO):
+                trace()
+            if metrics is None or not metrics.enabled:
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    return handle(e)
+
+            start = perf_counter()
             try:
                 value = func(*args, **kwargs)
-                return value
             except Exception as e:
-                logger.error(f"{e.__class__.__name__}: {e}", stacklevel=2)
-                if raise_exc:
-                    raise e
-                if isinstance(exc, Iterable):
-                    if not any(isinstance(e, expected) for expected in exc):
-                        raise e
-                elif issubclass(exc, Exception):
-                    if not isinstance(e, exc):
-                        raise e
-
-            return return_value
+                metrics.observe(name, perf_counter() - start, True)
+                return handle(e)
+            metrics.observe(name, perf_counter() - start)
+            return value
 
         return wrapper
 
     return decorator if _func is None else decorator(_func)
-
-
-
-
-
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import math
+import os
+import tempfile
+import threading
+from bisect import bisect_left
+from typing import Iterable
+
+# Upper bounds in seconds of the latency histogram buckets, the last one catches the rest
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, math.inf)
+
+CALLS = 0
+ERRORS = 1
+SECONDS = 2
+FIRST_BUCKET = 3
+
+# Set to 1 to count the calls of the global METRICS, which is off otherwise since it slows every log_exc call
+ENV_ENABLED = "BANKAPP_METRICS"
+
+
+class Metrics:
+    """
+    Call and error counters plus latency histograms per operation.
+
+    Every thread records into its own shard, so recording takes no lock.
+    A snapshot adds up the shards of all threads that ever recorded.
+    """
+
+    def __init__(
+            self, buckets: Iterable[float] = DEFAULT_BUCKETS, prefix: str = "bankapp", enabled: bool = True
+    ):
+        """
+        :param buckets: Increasing upper bounds in seconds of the latency buckets
+        :param prefix: Prefix of the metric names in the Prometheus dump
+        :param enabled: Whether log_exc records calls, can be switched later with the enabled attribute
+        """
+        self.buckets = tuple(buckets)
+        if self.buckets[-1] != math.inf:
+            self.buckets += (math.inf,)
+        self.prefix = prefix
+        self.enabled = enabled
+        self._local = threading.local()
+        self._shards: list[dict[str, list]] = []
+        self._lock = threading.Lock()
+
+    def _row(self, operation: str) -> list:
+        """
+        Get the row of an operation in the shard of the current thread, creating both if necessary
+        :param operation: Name of the operation
+        :return: Calls, errors, total seconds and the count per bucket
+        """
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        if (row := shard.get(operation)) is None:
+            row = shard[operation] = [0, 0, 0.0] + [0] * len(self.buckets)
+        return row
+
+    def observe(self, operation: str, seconds: float, error: bool = False) -> None:
+        """
+        Record one call of an operation
+        :param operation: Name of the operation
+        :param seconds: How long the call took
+        :param error: Whether the call raised an exception
+        """
+        try:
+            row = self._local.shard[operation]
+        except (AttributeError, KeyError):
+            row = self._row(operation)
+        row[CALLS] += 1
+        row[SECONDS] += seconds
+        row[FIRST_BUCKET + bisect_left(self.buckets, seconds)] += 1
+        if error:
+            row[ERRORS] += 1
+
+    def snapshot(self) -> dict[str, dict]:
+        """
+        Add up the metrics of all threads
+        :return: Per operation the calls, errors, total seconds and the count per bucket upper bound
+        """
+        totals: dict[str, list] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for operation, row in list(shard.items()):
+                if (total := totals.get(operation)) is None:
+                    totals[operation] = list(row)
+                else:
+                    for idx, value in enumerate(row):
+                        total[idx] += value
+
+        return {
+            operation: {
+                "calls": row[CALLS],
+                "errors": row[ERRORS],
+                "seconds": row[SECONDS],
+                "buckets": dict(zip(self.buckets, row[FIRST_BUCKET:])),
+            }
+            for operation, row in sorted(totals.items())
+        }
+
+    def reset(self) -> None:
+        """
+        Forget everything recorded so far
+        """
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+
+    def to_prometheus(self) -> str:
+        """
+        Format a snapshot in the Prometheus text exposition format
+        :return: The metrics as text
+        """
+        prefix = self.prefix
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_calls_total Number of calls per operation",
+            f"# TYPE {prefix}_calls_total counter",
+        ]
+        for operation, values in snapshot.items():
+            lines.append(f'{prefix}_calls_total{{operation="{operation}"}} {values["calls"]}')
+
+        lines += [
+            f"# HELP {prefix}_errors_total Number of calls per operation that raised an exception",
+            f"# TYPE {prefix}_errors_total counter",
+        ]
+        for operation, values in snapshot.items():
+            lines.append(f'{prefix}_errors_total{{operation="{operation}"}} {values["errors"]}')
+
+        lines += [
+            f"# HELP {prefix}_call_duration_seconds Call latency per operation",
+            f"# TYPE {prefix}_call_duration_seconds histogram",
+        ]
+        for operation, values in snapshot.items():
+            cumulative = 0
+            for bound, count in values["buckets"].items():
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(
+                    f'{prefix}_call_duration_seconds_bucket{{operation="{operation}",le="{le}"}} {cumulative}'
+                )
+            lines.append(
+                f'{prefix}_call_duration_seconds_sum{{operation="{operation}"}} {values["seconds"]!r}'
+            )
+            lines.append(
+                f'{prefix}_call_duration_seconds_count{{operation="{operation}"}} {values["calls"]}'
+            )
+        return "\n".join(lines) + "\n"
+
+    def dump(self, file_path: str) -> None:
+        """
+        Write the metrics in the Prometheus text format, replacing the file in one step for scrapers
+        :param file_path: Path to the file, for example in a node exporter textfile directory
+        """
+        directory = os.path.dirname(os.path.abspath(file_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(self.to_prometheus())
+            os.replace(temp_path, file_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+METRICS = Metrics(enabled=os.environ.get(ENV_ENABLED, "0") not in ("", "0"))
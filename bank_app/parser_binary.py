@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import gc
+import struct
+import sys
+import zlib
+from array import array
+from typing import Callable, Iterable, Optional
+
+from .account import Account
+from .customer import Customer
+from .logger import log_exc
+from .parser_json import _atomic_write
+from .storage import Storage
+
+DEFAULT_FILE_PATH = "bank_app/data/saved_customers.bin"
+
+MAGIC = b"BKSN"
+VERSION = 1
+# Magic, version, reserved flags, number of customers and accounts, size of the customer records, crc32 of the body
+HEADER = struct.Struct("<4sHHQQQI")
+# Byte length of the name, byte length of the password hash and number of accounts, followed by the name and hash.
+# Bcrypt hashes are stored packed by customer.pack_hash, text hashes are packed when they are loaded
+CUSTOMER_RECORD = struct.Struct("<HHI")
+# Every account is an account number and a balance in cents, both little endian int64, after all customer records
+ACCOUNT_FIELDS = 2
+
+
+@log_exc(exc=(FileNotFoundError, OSError, ValueError, struct.error), return_value=None)
+def load_customers(file_path: Optional[str] = None) -> Optional[list[Customer]]:
+    """
+    Load customers from a binary snapshot
+    :param file_path: Path to file to load from
+    :return: The list of Customers that was loaded
+    """
+    file_path = file_path if file_path else DEFAULT_FILE_PATH
+    with open(file_path, "rb") as file:
+        data = file.read()
+
+    if len(data) < HEADER.size:
+        raise ValueError(f"{file_path} is too short for a snapshot")
+    magic, version, _, customer_count, account_count, records_size, checksum = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{file_path} is not a snapshot")
+    if version != VERSION:
+        raise ValueError(f"Snapshot version {version} of {file_path} is not supported")
+    body = memoryview(data)[HEADER.size:]
+    if len(body) != records_size + account_count * ACCOUNT_FIELDS * 8:
+        raise ValueError(f"Snapshot {file_path} is truncated")
+    if zlib.crc32(body) != checksum:
+        raise ValueError(f"Checksum of snapshot {file_path} does not match")
+
+    accounts = array("q")
+    accounts.frombytes(body[records_size:])
+    if sys.byteorder == "big":
+        accounts.byteswap()
+
+    # The new objects have no reference cycles, collecting while creating millions of them only costs time
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        customers, end, accounts_read = _decode_customers(data, accounts, customer_count)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    if end != HEADER.size + records_size or accounts_read != len(accounts):
+        raise ValueError(f"Snapshot {file_path} does not match its header")
+    return customers
+
+
+def _decode_customers(data: bytes, accounts: array, customer_count: int) -> tuple[list[Customer], int, int]:
+    """
+    Create the customers of a snapshot
+    :param data: The snapshot
+    :param accounts: Account numbers and balances in cents of all accounts
+    :param customer_count: Number of customer records after the header
+    :return: The customers, the offset after the last customer record and the number of account fields used
+    """
+    from_cents = Account.from_cents
+    unpack = CUSTOMER_RECORD.unpack_from
+    pos = HEADER.size
+    first = 0
+    customers = []
+    for _ in range(customer_count):
+        name_length, hash_length, count = unpack(data, pos)
+        pos += CUSTOMER_RECORD.size
+        name = data[pos:pos + name_length].decode("utf-8")
+        pos += name_length
+        customer = Customer(name, data[pos:pos + hash_length], hash_password=False)
+        pos += hash_length
+        last = first + count * ACCOUNT_FIELDS
+        customer.set_accounts(
+            [from_cents(accounts[idx], accounts[idx + 1]) for idx in range(first, last, ACCOUNT_FIELDS)]
+        )
+        first = last
+        customer.mark_clean()
+        customers.append(customer)
+    return customers, pos, first
+
+
+@log_exc(exc=OSError, return_value=False)
+def save_customers(customers: list[Customer], file_path: Optional[str] = None) -> bool:
+    """
+    Save a list of customers as a binary snapshot
+    :param customers: The list of customers to be saved
+    :param file_path: Path to save location
+    :return: True if successful else False
+    """
+    if not customers:
+        return False
+    file_path = file_path if file_path else DEFAULT_FILE_PATH
+
+    records = bytearray()
+    accounts = array("q")
+    pack = CUSTOMER_RECORD.pack
+    append = accounts.append
+    for customer in customers:
+        name = customer.name.encode("utf-8")
+        password_hash = customer.password_hash
+        customer_accounts = customer.view_accounts()
+        records += pack(len(name), len(password_hash), len(customer_accounts))
+        records += name
+        records += password_hash
+        for account in customer_accounts:
+            append(account.account_number)
+            append(account.cents)
+    if sys.byteorder == "big":
+        accounts.byteswap()
+
+    checksum = zlib.crc32(accounts, zlib.crc32(records))
+    header = HEADER.pack(
+        MAGIC, VERSION, 0, len(customers), len(accounts) // ACCOUNT_FIELDS, len(records), checksum
+    )
+    _atomic_write(file_path, (header, records, accounts.tobytes()))
+
+    for customer in customers:
+        customer.mark_clean()
+    return True
+
+
+class BinaryStorage(Storage):
+    """
+    A binary snapshot with all customers, every save rewrites it
+    """
+
+    def __init__(self, file_path: Optional[str] = None):
+        """
+        :param file_path: Path to the snapshot
+        """
+        self.file_path = file_path if file_path else DEFAULT_FILE_PATH
+
+    def load(
+        self, stream: bool = False, progress: Optional[Callable[[int, int], None]] = None
+    ) -> Optional[list[Customer]]:
+        return load_customers(self.file_path)
+
+    def save(
+        self, customers: list[Customer], removed: Iterable[str] = (), incremental: bool = False
+    ) -> bool:
+        return save_customers(customers, self.file_path)
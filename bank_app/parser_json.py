@@ -1,7 +1,13 @@
+import codecs
+import glob
 import json
 import logging
+import os
+import re
+import tempfile
+import uuid
 from json import JSONDecodeError
-from typing import Optional, Union
+from typing import Callable, Iterable, Iterator, Optional, Union
 
 from bank_app import logger
 from .account import Account
@@ -9,28 +15,189 @@ from .customer import Customer
 from .logger import log_exc
 
 DEFAULT_FILE_PATH = "bank_app/data/saved_customers.json"
+DEFAULT_CHUNK_SIZE = 1 << 16
+# Largest customer the streaming decoder reads ahead for before it gives up on a malformed item
+MAX_ITEM_SIZE = 16 << 20
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Key of the first item of a base file, which tells delta segments which save of the file it is
+GENERATION = "generation"
+NO_GENERATION = {GENERATION: 0, "id": None}
 
 
 @log_exc(exc=(FileNotFoundError, OSError, JSONDecodeError), return_value=None)
 def load_customers(
     file_path: Optional[str] = None,
+    stream: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None,
 ) -> Optional[list[Customer]]:
     """
     Load saved customers from the previous instance
     :param file_path: Path to file to load from
+    :param stream: Decode the file incrementally instead of reading it all at once
+    :param progress: Called with the number of customers and bytes read so far, only when streaming
     :return: The list of Customers that was loaded
     """
     file_path = file_path if file_path else DEFAULT_FILE_PATH
 
-    with open(file_path, "r", encoding="utf-8") as file:
-        json_str = file.read()
-        customers_json = json.loads(json_str)
-        customers = []
-        for customer_json in customers_json:
-            customers.append(create_customer(**customer_json))
+    if stream:
+        generation = read_generation(file_path)
+        customers = list(iter_customers(file_path, progress=progress))
+    else:
+        with open(file_path, "r", encoding="utf-8") as file:
+            json_str = file.read()
+            customers_json = json.loads(json_str)
+            customers = []
+            generation = dict(NO_GENERATION)
+            for customer_json in customers_json:
+                if GENERATION in customer_json:
+                    generation = customer_json
+                    continue
+                customers.append(create_customer(**customer_json))
+
+    return _apply_deltas(customers, file_path, generation)
+
 
+def _apply_deltas(customers: list[Customer], file_path: str, generation: dict) -> list[Customer]:
+    """
+    Apply the delta segments written against the current base file
+    :param customers: The customers loaded from the base file
+    :param file_path: Path to the base file
+    :param generation: Generation of the base file, see read_generation
+    :return: The list of Customers with all changes applied
+    """
+    delta_paths = get_delta_paths(file_path)
+    if not delta_paths:
         return customers
 
+    by_name = {customer.name: customer for customer in customers}
+    for delta_path in delta_paths:
+        with open(delta_path, "r", encoding="utf-8") as file:
+            delta = json.load(file)
+        if not delta_applies(delta, delta_path, file_path, generation):
+            continue
+        for name in delta["removed"]:
+            by_name.pop(name, None)
+        for customer_json in delta["customers"]:
+            customer = create_customer(**customer_json)
+            by_name[customer.name] = customer
+
+    return list(by_name.values())
+
+
+def iter_customers(
+    file_path: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Iterator[Customer]:
+    """
+    Yield saved customers one at a time, only keeping about one chunk of the file in memory
+    :param file_path: Path to file to load from
+    :param chunk_size: Number of bytes to read from the file at a time
+    :param progress: Called with the number of customers and bytes read so far after each customer
+    :return: An iterator over the Customers in the file
+    """
+    file_path = file_path if file_path else DEFAULT_FILE_PATH
+
+    with open(file_path, "rb") as file:
+        count = 0
+        for customer_json, bytes_read in _iter_array(file, chunk_size):
+            if GENERATION in customer_json:
+                continue
+            count += 1
+            yield create_customer(**customer_json)
+            if progress:
+                progress(count, bytes_read)
+
+
+def _iter_array(
+    file, chunk_size: int, max_item_size: int = MAX_ITEM_SIZE, spans: bool = False
+) -> Iterator[tuple]:
+    """
+    Incrementally decode the items of a top level json array
+    :param file: Binary file object positioned at the start of the array
+    :param chunk_size: Number of bytes to read from the file at a time
+    :param max_item_size: Number of characters an item may span before it is considered malformed
+    :param spans: Also find the byte offsets where every item starts and ends
+    :return: An iterator over tuples of an item and the number of bytes read so far,
+        or of an item and its start and end byte offsets with spans
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer, pos, bytes_read, eof = "", 0, 0, False
+    expected = "["
+    # Byte offset of a position in the buffer, offsets are only asked for in increasing order
+    char_pos = byte_pos = 0
+    ascii_only = True
+
+    def byte_offset(at: int) -> int:
+        nonlocal char_pos, byte_pos
+        byte_pos += at - char_pos if ascii_only else len(buffer[char_pos:at].encode("utf-8"))
+        char_pos = at
+        return byte_pos
+
+    def error(msg: str, at: int) -> JSONDecodeError:
+        # Bytes read but not yet in the buffer are held by the incremental decoder
+        offset = bytes_read - len(text_decoder.getstate()[0]) - len(buffer[at:].encode("utf-8"))
+        return JSONDecodeError(f"{msg.removesuffix(' starting at')} at byte {offset}", buffer, at)
+
+    def read_more() -> None:
+        nonlocal buffer, pos, bytes_read, eof, char_pos, ascii_only
+        if eof:
+            raise error("Unexpected end of data", len(buffer))
+        chunk = file.read(chunk_size)
+        bytes_read += len(chunk)
+        eof = not chunk
+        if spans:
+            byte_offset(pos)
+            char_pos = 0
+        buffer = buffer[pos:] + text_decoder.decode(chunk, final=eof)
+        pos = 0
+        if spans:
+            ascii_only = buffer.isascii()
+
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            read_more()
+            continue
+
+        char = buffer[pos]
+        if expected == "[":
+            if char != "[":
+                raise error("Expecting '['", pos)
+            pos += 1
+            expected = "item or ]"
+        elif char == "]" and expected != "item":
+            return
+        elif expected == ",":
+            if char != ",":
+                raise error("Expecting ',' delimiter", pos)
+            pos += 1
+            expected = "item"
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except JSONDecodeError as e:
+                # Only an item cut off by the end of the buffer can be completed by reading on. A cut off
+                # number or literal fails within its last few characters, a string at its opening quote
+                truncated = len(buffer) - e.pos <= 16 or e.msg.startswith("Unterminated string")
+                if eof or not truncated or len(buffer) - pos > max_item_size:
+                    raise error(e.msg, e.pos) from None
+                read_more()
+                continue
+            if end == len(buffer) and not eof:
+                # A number at the end of the buffer may continue in the next chunk
+                read_more()
+                continue
+            if spans:
+                yield item, byte_offset(pos), byte_offset(end)
+            else:
+                yield item, bytes_read
+            pos = end
+            expected = ","
+
 
 def create_customer(
     name: str, password: str, accounts: list[dict[str, Union[int, float]]]
@@ -40,9 +207,10 @@ def create_customer(
     """
     customer = Customer(name, password, hash_password=False)
     if accounts:
-        for account_args in accounts:
-            customer.add_account(Account(**account_args))
+        # Skips the type check and logging of add_account, the accounts are created right here
+        customer.set_accounts([Account(**account_args) for account_args in accounts])
 
+    customer.mark_clean()
     return customer
 
 
@@ -58,12 +226,150 @@ def save_customers(customers: list[Customer], file_path: Optional[str] = None) -
         return False
     file_path = file_path if file_path else DEFAULT_FILE_PATH
 
-    with open(file_path, "w", encoding="utf-8") as file:
-        json_str = json.dumps(
-            [customer.to_json() for customer in customers],
-            indent=2,
-        )
-        file.write(json_str)
+    json_str = json.dumps(
+        [next_generation(file_path)] + [customer.to_json() for customer in customers],
+        indent=2,
+    )
+    _atomic_write(file_path, json_str)
+
+    # The new base covers every delta segment
+    for delta_path in get_delta_paths(file_path):
+        os.remove(delta_path)
+    for customer in customers:
+        customer.mark_clean()
+    return True
+
+
+@log_exc(exc=OSError, return_value=False)
+def save_delta(
+    customers: Iterable[Customer],
+    removed: Iterable[str] = (),
+    file_path: Optional[str] = None,
+) -> bool:
+    """
+    Save only the customers that changed since they were last saved as a new delta segment
+    :param customers: The customers to check for changes
+    :param removed: Names of the customers that were removed since the last save
+    :param file_path: Path to the base file the delta segment is written against
+    :return: True if successful else False
+    """
+    file_path = file_path if file_path else DEFAULT_FILE_PATH
+
+    changed = [customer for customer in customers if customer.dirty]
+    removed = list(removed)
+    if not changed and not removed:
+        return True
+
+    delta_paths = get_delta_paths(file_path)
+    number = int(delta_paths[-1].rsplit("-", 1)[1]) + 1 if delta_paths else 1
+    json_str = json.dumps(
+        {
+            "base": read_generation(file_path),
+            "removed": removed,
+            "customers": [customer.to_json() for customer in changed],
+        }
+    )
+    _atomic_write(f"{file_path}.delta-{number:06d}", json_str)
+
+    for customer in changed:
+        customer.mark_clean()
+    return True
+
+
+def get_delta_paths(file_path: Optional[str] = None) -> list[str]:
+    """
+    List the delta segments of a base file
+    :param file_path: Path to the base file
+    :return: The paths of the delta segments in the order they were written
+    """
+    file_path = file_path if file_path else DEFAULT_FILE_PATH
+    return sorted(glob.glob(f"{glob.escape(str(file_path))}.delta-[0-9]*"))
+
+
+def read_generation(file_path: str) -> dict:
+    """
+    Read which save of a base file it is, delta segments name it as the base they were written against
+    :param file_path: Path to the base file
+    :return: The number of the save and a random id, 0 and None for a file written before generations
+    """
+    with open(file_path, "rb") as file:
+        # The generation is the first item of the array, so only the first chunk is read
+        for item, _ in _iter_array(file, 4096):
+            if GENERATION in item:
+                return item
+            break
+    return dict(NO_GENERATION)
+
+
+def next_generation(file_path: str) -> dict:
+    """
+    :param file_path: Path to the base file that is about to be replaced
+    :return: The generation to write at the start of the new base file
+    """
+    try:
+        number = read_generation(file_path)[GENERATION]
+    except (OSError, JSONDecodeError):
+        number = 0
+    return {GENERATION: number + 1, "id": uuid.uuid4().hex}
+
+
+def delta_applies(delta: dict, delta_path: str, file_path: str, generation: dict) -> bool:
+    """
+    Check that a delta segment was written against a base file, wherever the files were copied to
+    :param delta: The delta segment
+    :param delta_path: Path to the delta segment
+    :param file_path: Path to the base file
+    :param generation: Generation of the base file, see read_generation
+    :return: True if the delta segment applies, False if the base file already covers it
+    """
+    base = delta["base"]
+    if isinstance(base, list):
+        # Written before generations, against the inode, size and modification time of the file
+        if generation[GENERATION]:
+            return False
+        if base == _file_stamp(file_path):
+            return True
+    elif base == generation:
         return True
+    elif base[GENERATION] < generation[GENERATION]:
+        # Left behind by a crash between writing a full save and removing the segments it covers
+        return False
+    raise ValueError(f"Delta segment {delta_path} was not written against {file_path}")
+
+
+def _file_stamp(file_path: str) -> list[int]:
+    """
+    Identify a version of a file, a rewrite through _atomic_write always changes it
+    :param file_path: Path to the file
+    :return: The inode, size and modification time of the file
+    """
+    stat = os.stat(file_path)
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def _atomic_write(file_path: str, data: Union[str, bytes, bytearray, Iterable[bytes]]) -> None:
+    """
+    Write a file through a temporary file and a rename, so it is never left half written
+    :param file_path: Path to the file
+    :param data: The text, bytes or chunks of bytes to be written
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        if isinstance(data, str):
+            file = os.fdopen(fd, "w", encoding="utf-8")
+        else:
+            file = os.fdopen(fd, "wb")
+        with file:
+            if isinstance(data, (str, bytes, bytearray)):
+                file.write(data)
+            else:
+                file.writelines(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
 
 
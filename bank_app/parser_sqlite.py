@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from typing import Callable, Iterable, Iterator, Optional
+
+from .account import Account
+from .customer import Customer
+from .logger import log_exc
+from .storage import Storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    name TEXT PRIMARY KEY,
+    password TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS accounts (
+    account_number INTEGER PRIMARY KEY,
+    customer TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    cents INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS accounts_customer ON accounts (customer, position);
+"""
+# Rows fetched at a time when walking all customers
+ITER_BATCH_SIZE = 1024
+
+
+class SqliteStorage(Storage):
+    """
+    Customers and accounts in a SQLite database in WAL mode.
+
+    Customers are looked up by name and accounts by account number through the
+    primary keys, so the bank only has to hold the customers it has used. Every
+    save is one transaction.
+    """
+
+    def __init__(self, file_path: str, lazy: bool = True):
+        """
+        :param file_path: Path to the database file, created if it does not exist
+        :param lazy: Load customers when they are first used instead of all at once
+        """
+        self.file_path = file_path
+        self.lazy = lazy
+        # One connection shared by all threads, every use holds the lock
+        self._connection = sqlite3.connect(
+            file_path, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.RLock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+
+    @log_exc(exc=sqlite3.Error, return_value=None)
+    def load(
+        self, stream: bool = False, progress: Optional[Callable[[int, int], None]] = None
+    ) -> Optional[list[Customer]]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT name, password FROM customers ORDER BY name"
+            ).fetchall()
+            accounts: dict[str, list[Account]] = {}
+            for customer, account_number, cents in self._connection.execute(
+                "SELECT customer, account_number, cents FROM accounts ORDER BY customer, position"
+            ):
+                accounts.setdefault(customer, []).append(Account.from_cents(account_number, cents))
+
+        return [
+            self._create_customer(name, password, accounts.get(name, []))
+            for name, password in rows
+        ]
+
+    @log_exc(exc=sqlite3.Error, return_value=False)
+    def save(
+        self, customers: list[Customer], removed: Iterable[str] = (), incremental: bool = False
+    ) -> bool:
+        """
+        Save customers in one transaction. Saved customers that are not passed are kept,
+        so a bank that only loaded some customers does not lose the others.
+        :param customers: The customers of the bank
+        :param removed: Names of the customers that were removed since the last save
+        :param incremental: Only save the customers that changed since they were last saved
+        :return: True if successful else False
+        """
+        changed = [customer for customer in customers if customer.dirty or not incremental]
+        names = [(name,) for name in removed] + [(customer.name,) for customer in changed]
+        with self._lock:
+            cursor = self._connection.cursor()
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                # Removed first, so an account that moved to another customer can be inserted again
+                cursor.executemany("DELETE FROM accounts WHERE customer = ?", names)
+                cursor.executemany("DELETE FROM customers WHERE name = ?", names)
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO customers (name, password) VALUES (?, ?)",
+                    [(customer.name, customer.password) for customer in changed],
+                )
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO accounts (account_number, customer, position, cents) "
+                    "VALUES (?, ?, ?, ?)",
+                    [
+                        (account.account_number, customer.name, position, account.cents)
+                        for customer in changed
+                        for position, account in enumerate(customer.view_accounts())
+                    ],
+                )
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+
+        for customer in changed:
+            customer.mark_clean()
+        return True
+
+    def get_customer(self, name: str) -> Optional[Customer]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT password FROM customers WHERE name = ?", (name,)
+            ).fetchone()
+            if row is None:
+                return None
+            accounts = [
+                Account.from_cents(account_number, cents)
+                for account_number, cents in self._connection.execute(
+                    "SELECT account_number, cents FROM accounts WHERE customer = ? ORDER BY position",
+                    (name,),
+                )
+            ]
+        return self._create_customer(name, row[0], accounts)
+
+    def iter_customers(self) -> Iterator[Customer]:
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT name, password, account_number, cents FROM customers"
+                " LEFT JOIN accounts ON accounts.customer = customers.name ORDER BY name, position"
+            )
+        try:
+            name = password = None
+            accounts: list[Account] = []
+            while True:
+                # The lock is only held for a batch of rows, so other threads can use the connection in between
+                with self._lock:
+                    rows = cursor.fetchmany(ITER_BATCH_SIZE)
+                if not rows:
+                    break
+                for row_name, row_password, account_number, cents in rows:
+                    if row_name != name:
+                        if name is not None:
+                            yield self._create_customer(name, password, accounts)
+                        name, password, accounts = row_name, row_password, []
+                    if account_number is not None:
+                        accounts.append(Account.from_cents(account_number, cents))
+            if name is not None:
+                yield self._create_customer(name, password, accounts)
+        finally:
+            with self._lock:
+                cursor.close()
+
+    def find_account_owner(self, account_number: int) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT customer FROM accounts WHERE account_number = ?", (account_number,)
+            ).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _create_customer(name: str, password: str, accounts: list[Account]) -> Customer:
+        customer = Customer(name, password, hash_password=False)
+        customer.set_accounts(accounts)
+        customer.mark_clean()
+        return customer
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import cProfile
+import functools
+import io
+import pathlib
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from os import PathLike
+from typing import Any, Callable, Iterable, Optional
+
+from .logger import DEFAULT_LOGGER
+
+DEFAULT_OPERATIONS = (
+    "login",
+    "get_customer",
+    "get_account",
+    "deposit",
+    "withdraw",
+    "transfer",
+    "transfer_many",
+    "apply_batch",
+    "load_customers",
+    "save_customers",
+)
+MODES = ("timing", "cprofile", "tracemalloc")
+
+
+class Profiler:
+    """
+    Profiles some operations of one object by shadowing its methods with wrappers.
+
+    Nothing is wrapped until the profiler is started and the original methods are
+    back once it is stopped, so a live bank can be profiled for a few seconds at a
+    time and costs nothing otherwise. Stopping writes a report to the log directory.
+    """
+
+    def __init__(
+        self,
+        target: Any,
+        operations: Iterable[str] = DEFAULT_OPERATIONS,
+        mode: str = "timing",
+        sample: float = 1.0,
+        log_dir: PathLike[str] = "logs",
+    ):
+        """
+        :param target: The object whose methods are profiled, usually a Bank
+        :param operations: Names of the methods to profile
+        :param mode: "timing" for wall-clock latencies, "cprofile" for call statistics or "tracemalloc" for memory
+        :param sample: Fraction of calls to profile
+        :param log_dir: Directory the report is written to
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode {mode}, expected one of {MODES}")
+
+        self.target = target
+        self.operations = tuple(operations)
+        self.mode = mode
+        self.sample = sample
+        self.log_dir = pathlib.Path(log_dir)
+        self.report_path: Optional[pathlib.Path] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._timings: dict[str, list[float]] = {}
+        self._peaks: dict[str, list[int]] = {}
+        self._profiles: list[cProfile.Profile] = []
+        self._started_tracemalloc = False
+        self._start_time = 0.0
+        self.active = False
+
+    def start(self) -> Profiler:
+        """
+        Start profiling the operations
+        :return: The profiler
+        """
+        if self.active:
+            return self
+
+        if self.mode == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        for name in self.operations:
+            setattr(self.target, name, self._wrap(name, getattr(self.target, name)))
+        self._start_time = time.perf_counter()
+        self.active = True
+        return self
+
+    def stop(self) -> Optional[pathlib.Path]:
+        """
+        Stop profiling, restore the original methods and write the report
+        :return: Path to the report
+        """
+        if not self.active:
+            return self.report_path
+
+        for name in self.operations:
+            # Removing the instance attribute uncovers the method of the class again
+            self.target.__dict__.pop(name, None)
+        self.active = False
+        duration = time.perf_counter() - self._start_time
+
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        self.report_path = self.log_dir / f"profile-{stamp}-{self.mode}.txt"
+        header = (
+            f"Profiled {', '.join(self.operations)} of {type(self.target).__name__} "
+            f"for {duration:.3f} s, mode {self.mode}, sample {self.sample}\n\n"
+        )
+        if self.mode == "cprofile":
+            report = self._cprofile_report(self.report_path.with_suffix(".prof"))
+        elif self.mode == "tracemalloc":
+            report = self._tracemalloc_report()
+        else:
+            report = self._timing_report()
+        self.report_path.write_text(header + report, encoding="utf-8")
+        DEFAULT_LOGGER.info("Wrote profiling report to %s", self.report_path)
+        return self.report_path
+
+    def _wrap(self, name: str, method: Callable) -> Callable:
+        """
+        Wrap a bound method so its calls are profiled
+        :param name: Name of the operation
+        :param method: The bound method
+        :return: The wrapper
+        """
+        local = self._local
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs) -> Any:
+            # Operations called by other profiled operations are counted in the outer one
+            if getattr(local, "depth", 0) or (self.sample < 1 and random.random() >= self.sample):
+                return method(*args, **kwargs)
+
+            local.depth = 1
+            try:
+                if self.mode == "cprofile":
+                    return self._profile_call(method, args, kwargs)
+                if self.mode == "tracemalloc":
+                    return self._trace_call(name, method, args, kwargs)
+                return self._time_call(name, method, args, kwargs)
+            finally:
+                local.depth = 0
+
+        return wrapper
+
+    def _time_call(self, name: str, method: Callable, args: tuple, kwargs: dict) -> Any:
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self._timings.setdefault(name, []).append(seconds)
+
+    def _profile_call(self, method: Callable, args: tuple, kwargs: dict) -> Any:
+        # cProfile only sees the thread that enabled it, so every thread gets its own
+        if (profile := getattr(self._local, "profile", None)) is None:
+            profile = self._local.profile = cProfile.Profile()
+            with self._lock:
+                self._profiles.append(profile)
+        profile.enable()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            profile.disable()
+
+    def _trace_call(self, name: str, method: Callable, args: tuple, kwargs: dict) -> Any:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            # Allocations of other threads during the call are included
+            peak = tracemalloc.get_traced_memory()[1] - before
+            with self._lock:
+                self._peaks.setdefault(name, []).append(peak)
+
+    def _timing_report(self) -> str:
+        lines = [f"{'operation':<20}{'calls':>10}{'mean ms':>12}{'p50 ms':>12}{'p99 ms':>12}{'max ms':>12}"]
+        for name, timings in sorted(self._timings.items()):
+            timings.sort()
+            lines.append(
+                f"{name:<20}{len(timings):>10}"
+                f"{sum(timings) / len(timings) * 1e3:>12.3f}"
+                f"{timings[len(timings) // 2] * 1e3:>12.3f}"
+                f"{timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1e3:>12.3f}"
+                f"{timings[-1] * 1e3:>12.3f}"
+            )
+        return "\n".join(lines) + "\n"
+
+    def _cprofile_report(self, stats_path: pathlib.Path) -> str:
+        if not self._profiles:
+            return "No calls were profiled\n"
+
+        output = io.StringIO()
+        stats = pstats.Stats(*self._profiles, stream=output)
+        stats.dump_stats(stats_path)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(40)
+        return f"Raw statistics in {stats_path.name}\n" + output.getvalue()
+
+    def _tracemalloc_report(self) -> str:
+        lines = [f"{'operation':<20}{'calls':>10}{'mean peak KiB':>16}{'max peak KiB':>16}"]
+        for name, peaks in sorted(self._peaks.items()):
+            lines.append(
+                f"{name:<20}{len(peaks):>10}"
+                f"{sum(peaks) / len(peaks) / 1024:>16.1f}{max(peaks) / 1024:>16.1f}"
+            )
+        snapshot = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        lines += ["", "Largest allocations still alive:"]
+        lines += [str(stat) for stat in snapshot.statistics("lineno")[:20]]
+        return "\n".join(lines) + "\n"
+
+    def __enter__(self) -> Profiler:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
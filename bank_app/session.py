@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from .customer import Customer
+
+
+class SessionTable:
+    """
+    Maps opaque session tokens to logged in customers.
+
+    Sessions expire after being idle for ttl seconds. Every use moves a session to
+    the end of the table, so expired sessions are always found at the front.
+    """
+
+    def __init__(self, ttl: float = 900.0, clock: Callable[[], float] = time.monotonic):
+        """
+        :param ttl: Number of idle seconds after which a session expires
+        :param clock: Monotonic clock returning seconds
+        """
+        self.ttl = ttl
+        self._clock = clock
+        self._sessions: OrderedDict[str, list] = OrderedDict()
+        self._tokens: dict[Customer, set[str]] = {}
+        self._lock = threading.RLock()
+
+    def create(self, customer: Customer) -> str:
+        """
+        Start a new session
+        :param customer: The customer that logged in
+        :return: The session token
+        """
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self.evict_expired()
+            self._sessions[token] = [customer, self._clock() + self.ttl]
+            self._tokens.setdefault(customer, set()).add(token)
+        return token
+
+    def get(self, token: str) -> Optional[Customer]:
+        """
+        Get the customer of a session and extend the session
+        :param token: The session token
+        :return: The customer if the session is active else None
+        """
+        with self._lock:
+            entry = self._sessions.get(token)
+            if entry is None:
+                return None
+
+            now = self._clock()
+            if entry[1] <= now:
+                self.remove(token)
+                return None
+
+            entry[1] = now + self.ttl
+            self._sessions.move_to_end(token)
+            return entry[0]
+
+    def remove(self, token: str) -> bool:
+        """
+        End a session
+        :param token: The session token
+        :return: True if the session existed else False
+        """
+        with self._lock:
+            entry = self._sessions.pop(token, None)
+            if entry is None:
+                return False
+
+            tokens = self._tokens[entry[0]]
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens[entry[0]]
+            return True
+
+    def remove_customer(self, customer: Customer) -> int:
+        """
+        End all sessions of a customer
+        :param customer: The customer
+        :return: The number of sessions that were ended
+        """
+        with self._lock:
+            tokens = self._tokens.pop(customer, set())
+            for token in tokens:
+                del self._sessions[token]
+            return len(tokens)
+
+    def evict_expired(self) -> int:
+        """
+        End all sessions that have expired
+        :return: The number of sessions that were ended
+        """
+        now = self._clock()
+        count = 0
+        with self._lock:
+            while self._sessions:
+                token, (_, expires) = next(iter(self._sessions.items()))
+                if expires > now:
+                    break
+                self.remove(token)
+                count += 1
+        return count
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import sys
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, Iterator, Optional
+
+from bank_app import parser_json
+from .customer import Customer
+from .json_index import JsonIndex, name_hash
+from .logger import log_exc
+
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+BINARY_EXTENSIONS = (".bin",)
+
+
+class Storage(ABC):
+    """
+    Where a bank keeps its customers between runs.
+
+    An eager storage hands over every customer when the bank loads. A lazy storage
+    hands over nothing up front and the bank asks it for single customers and
+    accounts the first time they are used.
+    """
+
+    lazy = False
+
+    @abstractmethod
+    def load(
+        self, stream: bool = False, progress: Optional[Callable[[int, int], None]] = None
+    ) -> Optional[list[Customer]]:
+        """
+        Load all saved customers
+        :param stream: Keep memory use bounded while loading, if the storage supports it
+        :param progress: Called with the number of customers and bytes read so far, if the storage supports it
+        :return: The customers, None if loading failed
+        """
+
+    @abstractmethod
+    def save(
+        self, customers: list[Customer], removed: Iterable[str] = (), incremental: bool = False
+    ) -> bool:
+        """
+        Save customers
+        :param customers: The customers of the bank
+        :param removed: Names of the customers that were removed since the last save
+        :param incremental: Only save the customers that changed since they were last saved
+        :return: True if successful else False
+        """
+
+    def get_customer(self, name: str) -> Optional[Customer]:
+        """
+        Load a single customer, only used when the storage is lazy
+        :param name: Normalized name of the customer
+        :return: The customer if it was saved else None
+        """
+        return None
+
+    def find_account_owner(self, account_number: int) -> Optional[str]:
+        """
+        Find who owns a saved account, only used when the storage is lazy
+        :param account_number: Account number of the account
+        :return: Normalized name of the owner if the account was saved else None
+        """
+        return None
+
+    def iter_customers(self) -> Iterator[Customer]:
+        """
+        Walk all saved customers, one at a time if the storage is lazy
+        :return: An iterator over the customers
+        """
+        yield from self.load() or ()
+
+    def close(self) -> None:
+        """
+        Release the resources held by the storage
+        """
+
+
+class JsonStorage(Storage):
+    """
+    A json file with all customers, plus delta segments for incremental saves, see parser_json
+    """
+
+    def __init__(self, file_path: Optional[str] = None, compact_every: int = 16):
+        """
+        :param file_path: Path to the json file
+        :param compact_every: Number of delta segments after which an incremental save writes a full save instead
+        """
+        self.file_path = file_path if file_path else parser_json.DEFAULT_FILE_PATH
+        self.compact_every = compact_every
+
+    def load(
+        self, stream: bool = False, progress: Optional[Callable[[int, int], None]] = None
+    ) -> Optional[list[Customer]]:
+        return parser_json.load_customers(self.file_path, stream, progress)
+
+    def save(
+        self, customers: list[Customer], removed: Iterable[str] = (), incremental: bool = False
+    ) -> bool:
+        if (
+            incremental
+            and os.path.exists(self.file_path)
+            and len(parser_json.get_delta_paths(self.file_path)) < self.compact_every
+        ):
+            return parser_json.save_delta(customers, removed, self.file_path)
+        return parser_json.save_customers(customers, self.file_path)
+
+
+class LazyJsonStorage(JsonStorage):
+    """
+    A json file whose customers are decoded when they are first used, see json_index.
+
+    Delta segments are small, so they are decoded up front and take precedence over
+    the file. A full save merges the customers of the bank into the file and copies
+    the customers that were never loaded over as they are.
+    """
+
+    lazy = True
+
+    def __init__(self, file_path: Optional[str] = None, compact_every: int = 16):
+        """
+        :param file_path: Path to the json file
+        :param compact_every: Number of delta segments after which an incremental save writes a full save instead
+        """
+        super().__init__(file_path, compact_every)
+        self._open()
+
+    def _open(self) -> None:
+        """
+        Map the file and decode the delta segments written against it
+        """
+        self._index = JsonIndex(self.file_path)
+        self._removed: set[str] = set()
+        self._changed: dict[str, dict] = {}
+        self._owners: dict[int, str] = {}
+
+        generation = parser_json.read_generation(self.file_path)
+        for delta_path in parser_json.get_delta_paths(self.file_path):
+            with open(delta_path, "r", encoding="utf-8") as file:
+                delta = json.load(file)
+            if not parser_json.delta_applies(delta, delta_path, self.file_path, generation):
+                continue
+            for name in delta["removed"]:
+                self._removed.add(name)
+                self._changed.pop(name, None)
+            for customer_json in delta["customers"]:
+                name = Customer.normalize_name(customer_json["name"])
+                self._removed.discard(name)
+                self._changed[name] = customer_json
+        for name, customer_json in self._changed.items():
+            for account_json in customer_json["accounts"] or ():
+                self._owners[account_json["account_number"]] = name
+
+    def get_customer(self, name: str) -> Optional[Customer]:
+        if name in self._removed:
+            return None
+        if (customer_json := self._changed.get(name)) is None:
+            customer_json = self._index.find(name)
+        return parser_json.create_customer(**customer_json) if customer_json else None
+
+    def iter_customers(self) -> Iterator[Customer]:
+        # Customers of the delta segments replace theirs in the file and new ones follow it
+        pending = dict(self._changed)
+        for _, raw in self._index.raw_items():
+            customer_json = json.loads(raw)
+            name = Customer.normalize_name(customer_json["name"])
+            if name in self._removed:
+                continue
+            customer_json = pending.pop(name, customer_json)
+            yield parser_json.create_customer(**customer_json)
+        for customer_json in pending.values():
+            yield parser_json.create_customer(**customer_json)
+
+    def find_account_owner(self, account_number: int) -> Optional[str]:
+        if (owner := self._owners.get(account_number)) is not None:
+            return owner
+        owner = self._index.find_owner(account_number)
+        # A changed owner no longer has the account, else it would be in _owners
+        if owner is None or owner in self._removed or owner in self._changed:
+            return None
+        return owner
+
+    def save(
+        self, customers: list[Customer], removed: Iterable[str] = (), incremental: bool = False
+    ) -> bool:
+        """
+        Save customers. Saved customers that are not passed are kept,
+        so a bank that only loaded some customers does not lose the others.
+        :param customers: The customers of the bank
+        :param removed: Names of the customers that were removed since the last save
+        :param incremental: Only save the changed customers as a delta segment
+        :return: True if successful else False
+        """
+        removed = list(removed)
+        if incremental and len(parser_json.get_delta_paths(self.file_path)) < self.compact_every:
+            changed = [customer for customer in customers if customer.dirty]
+            if not parser_json.save_delta(changed, removed, self.file_path):
+                return False
+            # Keep answering like a freshly opened storage would
+            for name in removed:
+                self._removed.add(name)
+                self._changed.pop(name, None)
+            for customer in changed:
+                self._removed.discard(customer.name)
+                self._changed[customer.name] = customer.to_json()
+                for account in customer.view_accounts():
+                    self._owners[account.account_number] = customer.name
+            return True
+        return self._compact(customers, removed)
+
+    @log_exc(exc=OSError, return_value=False)
+    def _compact(self, customers: list[Customer], removed: list[str]) -> bool:
+        """
+        Write a new file with the customers of the bank and every other saved customer
+        :param customers: The customers of the bank
+        :param removed: Names of the customers that were removed since the last save
+        :return: True if successful else False
+        """
+        removed_names = self._removed.union(removed)
+        parser_json._atomic_write(self.file_path, self._merge(customers, removed_names))
+
+        self._index.close()
+        for delta_path in parser_json.get_delta_paths(self.file_path):
+            os.remove(delta_path)
+        self._open()
+        for customer in customers:
+            customer.mark_clean()
+        return True
+
+    def _merge(self, customers: list[Customer], removed: set[str]) -> Iterator[bytes]:
+        """
+        Encode the merged file in the same layout as parser_json.save_customers
+        :param customers: The customers of the bank
+        :param removed: Names of all customers that were removed since the file was written
+        :return: An iterator over chunks of the file
+        """
+        held = {customer.name for customer in customers}
+        # Saved customers that are not copied over as they are
+        skipped = held | removed | set(self._changed)
+        skipped_hashes = {name_hash(name) for name in skipped}
+        items = (
+            raw
+            for key, raw in self._index.raw_items()
+            # Only a customer with the hash of a skipped name is decoded to check its name
+            if key not in skipped_hashes
+            or Customer.normalize_name(json.loads(raw)["name"]) not in skipped
+        )
+        changed = (
+            customer_json
+            for name, customer_json in self._changed.items()
+            if name not in held and name not in removed
+        )
+        new_items = (
+            # Dumped inside a list, so nested lines are indented like the copied customers
+            json.dumps([customer_json], indent=2)[4:-2].encode("utf-8")
+            for customer_json in itertools.chain(changed, (customer.to_json() for customer in customers))
+        )
+
+        header = json.dumps([parser_json.next_generation(self.file_path)], indent=2)[4:-2].encode("utf-8")
+        separator = b"[\n  "
+        for item in itertools.chain((header,), items, new_items):
+            yield separator
+            yield item
+            separator = b",\n  "
+        yield b"\n]"
+
+    def close(self) -> None:
+        self._index.close()
+
+
+def open_storage(
+    file_path: Optional[str] = None, compact_every: int = 16, lazy: Optional[bool] = None
+) -> Storage:
+    """
+    Pick the storage for a file by its extension
+    :param file_path: Path to the file, the default json file if not specified
+    :param compact_every: Number of delta segments after which an incremental json save writes a full save instead
+    :param lazy: Load customers when they are first used, the default of the format if not specified
+    :return: The storage
+    """
+    extension = os.path.splitext(str(file_path))[1].lower() if file_path else ""
+    if extension in SQLITE_EXTENSIONS:
+        from .parser_sqlite import SqliteStorage
+
+        return SqliteStorage(file_path) if lazy is None else SqliteStorage(file_path, lazy)
+    if extension in BINARY_EXTENSIONS:
+        from .parser_binary import BinaryStorage
+
+        return BinaryStorage(file_path)
+    if lazy:
+        return LazyJsonStorage(file_path, compact_every)
+    return JsonStorage(file_path, compact_every)
+
+
+def convert(source_path: str, target_path: str) -> bool:
+    """
+    Copy all customers from one file to another, each in the format of its extension
+    :param source_path: Path to the file to load from
+    :param target_path: Path to the file to save to
+    :return: True if successful else False
+    """
+    source = open_storage(source_path, lazy=False)
+    target = open_storage(target_path, lazy=False)
+    try:
+        customers = source.load()
+        return bool(customers) and target.save(customers)
+    finally:
+        source.close()
+        target.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Convert saved customers between file formats")
+    parser.add_argument("source", help="File to load from, .json, .bin or .db")
+    parser.add_argument("target", help="File to save to, .json, .bin or .db")
+    args = parser.parse_args()
+    return 0 if convert(args.source, args.target) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
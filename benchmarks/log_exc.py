@@ -0,0 +1,60 @@
+"""
+Measure the overhead log_exc adds to a call that succeeds.
+
+    python -m benchmarks.log_exc --calls 200000
+"""
+import argparse
+import logging
+import tempfile
+import timeit
+
+from bank_app.logger import log_exc
+from bank_app.metrics import Metrics
+
+
+def plain(value: int) -> int:
+    return value
+
+
+def measure(calls: int) -> dict:
+    """
+    Time a plain function and log_exc wrapped versions of it with different logger setups
+    :param calls: Number of calls to time per setup
+    :return: Nanoseconds per call for every setup
+    """
+    logger = logging.getLogger("benchmark.log_exc")
+    logger.propagate = False
+    with tempfile.TemporaryDirectory() as directory:
+        handler = logging.FileHandler(f"{directory}/benchmark.log")
+        logger.addHandler(handler)
+        try:
+            setups = {
+                "plain": (plain, logging.INFO),
+                "info": (log_exc(plain, logger=logger), logging.INFO),
+                "info_sampled_1%": (log_exc(plain, logger=logger, sample=0.01), logging.INFO),
+                "warning": (log_exc(plain, logger=logger), logging.WARNING),
+                "warning_no_metrics": (log_exc(plain, logger=logger, metrics=None), logging.WARNING),
+                "warning_metrics": (log_exc(plain, logger=logger, metrics=Metrics()), logging.WARNING),
+            }
+            result = {}
+            for name, (func, level) in setups.items():
+                logger.setLevel(level)
+                seconds = min(timeit.repeat(lambda: func(1), number=calls, repeat=3))
+                result[name] = seconds / calls * 1e9
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    for name, nanoseconds in measure(args.calls).items():
+        print(f"{name}: {nanoseconds:,.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
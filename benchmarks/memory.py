@@ -0,0 +1,89 @@
+"""
+Measure the memory used by customers and accounts of a loaded bank.
+
+    python -m benchmarks.memory --customers 100000 --accounts 2
+"""
+import argparse
+import gc
+import resource
+import tracemalloc
+
+from bank_app.customer import Customer
+from bank_app.parser_json import create_customer
+
+# Same shape as a real bcrypt hash, 22 characters of salt and 31 of digest, without spending seconds per customer
+HASH_TEMPLATE = "$2b$13$" + "N9qo8uLOickgx2ZMRZoMye" + "IjZAgcfl7p92ldGxad68LJ{:09d}"
+
+
+def build(customers: int, accounts: int) -> list[Customer]:
+    """
+    Create customers that each own some accounts, the same way they are loaded from a file
+    :param customers: Number of customers
+    :param accounts: Number of accounts per customer
+    :return: The customers
+    """
+    return [
+        create_customer(
+            f"Customer{idx}",
+            HASH_TEMPLATE.format(idx),
+            [
+                {"account_number": number, "balance": 100.5}
+                for number in range(idx * accounts, (idx + 1) * accounts)
+            ],
+        )
+        for idx in range(customers)
+    ]
+
+
+def measure(customers: int, accounts: int) -> dict:
+    """
+    Measure how many bytes the customers and their accounts take
+    :param customers: Number of customers
+    :param accounts: Number of accounts per customer
+    :return: Bytes per customer including its accounts, bytes per account and resident bytes per customer
+    """
+    # Resident memory first, tracemalloc keeps a record of its own for every allocation
+    gc.collect()
+    start_rss = _peak_rss()
+    with_accounts = build(customers, accounts)
+    rss = _peak_rss() - start_rss
+    del with_accounts
+    gc.collect()
+
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    with_accounts = build(customers, accounts)
+    used = tracemalloc.get_traced_memory()[0] - start
+    del with_accounts
+    gc.collect()
+
+    start = tracemalloc.get_traced_memory()[0]
+    without_accounts = build(customers, 0)
+    used_customers = tracemalloc.get_traced_memory()[0] - start
+    del without_accounts
+    tracemalloc.stop()
+
+    return {
+        "bytes_per_customer": used / customers,
+        "bytes_per_customer_without_accounts": used_customers / customers,
+        "bytes_per_account": (used - used_customers) / (customers * accounts) if accounts else 0,
+        "resident_bytes_per_customer": rss / customers,
+    }
+
+
+def _peak_rss() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--accounts", type=int, default=1, help="Accounts per customer")
+    args = parser.parse_args()
+
+    for key, value in measure(args.customers, args.accounts).items():
+        print(f"{key}: {value:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
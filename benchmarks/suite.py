@@ -0,0 +1,215 @@
+"""
+Benchmark Bank operations on synthetic banks of growing size.
+
+    python -m benchmarks.suite --sizes 1000 100000 1000000 --output results.json --baseline baseline.json
+
+Sizes default to 1k and 100k customers. Every operation reports throughput, p50 and p99 latency
+and the peak memory it allocated.
+With --baseline the results are compared to a saved run and the exit code is 1 on a regression,
+--update-baseline saves the run as the new baseline instead.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+from bank_app.account import Account
+from bank_app.bank import Bank
+from bank_app.customer import Customer
+from bank_app.logger import DEFAULT_LOGGER
+
+DEFAULT_SIZES = (1_000, 100_000)
+# Logins verifying a hash at the cost used in production would dwarf every other operation measured
+DEFAULT_BCRYPT_ROUNDS = 4
+PASSWORD = "benchmark-password"
+
+
+def generate_customers(count: int, password_hash: str, accounts: int = 1) -> list[Customer]:
+    """
+    Create customers with the same password and funded accounts
+    :param count: Number of customers
+    :param password_hash: Hash shared by all customers, hashing each one would dominate the setup
+    :param accounts: Number of accounts per customer
+    :return: The customers
+    """
+    customers = []
+    for idx in range(count):
+        customer = Customer(f"customer{idx}", password_hash, hash_password=False)
+        customer.accounts = [
+            Account(number, 1000) for number in range(idx * accounts, (idx + 1) * accounts)
+        ]
+        customers.append(customer)
+    return customers
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def run(operation: Callable[[int], object], calls: int, memory_calls: int) -> dict:
+    """
+    Time an operation, then run it again under tracemalloc for its peak memory
+    :param operation: Called with the index of the call
+    :param calls: Number of timed calls
+    :param memory_calls: Number of calls traced for memory, tracing slows them down
+    :return: Throughput, latencies in seconds and peak memory in bytes
+    """
+    latencies = []
+    gc.collect()
+    start = time.perf_counter()
+    for idx in range(calls):
+        call_start = time.perf_counter()
+        operation(idx)
+        latencies.append(time.perf_counter() - call_start)
+    total = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    for idx in range(memory_calls):
+        operation(idx)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "calls": calls,
+        "ops_per_second": calls / total,
+        "p50": percentile(latencies, 0.50),
+        "p99": percentile(latencies, 0.99),
+        "peak_memory": peak,
+    }
+
+
+def bench_size(size: int, calls: int, login_calls: int, password_hash: str, directory: str) -> dict:
+    """
+    Run every operation against a bank with a number of customers
+    :param size: Number of customers
+    :param calls: Number of calls of the cheap operations
+    :param login_calls: Number of logins, each one verifies a bcrypt hash
+    :param password_hash: Hash shared by all customers
+    :param directory: Where the save file is written
+    :return: Results per operation
+    """
+    bank = Bank(generate_customers(size, password_hash), save_on_exit=False)
+    rng = random.Random(size)
+    names = [f"customer{rng.randrange(size)}" for _ in range(calls)]
+    sessions = [bank._start_session(bank.get_customer(name)) for name in names[:1000]]
+    file_path = os.path.join(directory, f"bank_{size}.json")
+    results = {}
+
+    results["get_customer"] = run(lambda idx: bank.get_customer(names[idx]), calls, min(calls, 1000))
+    results["login"] = run(
+        lambda idx: bank.login(names[idx], PASSWORD), login_calls, min(login_calls, 5)
+    )
+
+    def deposit(idx: int) -> None:
+        session = sessions[idx % len(sessions)]
+        account_number = bank.sessions.get(session).accounts[0].account_number
+        bank.deposit(account_number, 1.5, session)
+
+    results["deposit"] = run(deposit, calls, min(calls, 1000))
+
+    saves = max(1, min(5, 100_000 // size))
+    results["save_customers"] = run(lambda idx: bank.save_customers(file_path), saves, 1)
+
+    def load(idx: int) -> None:
+        Bank(save_on_exit=False).load_customers(file_path)
+
+    results["load_customers"] = run(load, saves, 1)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Find the operations that got slower than a baseline allows
+    :param results: Results of this run
+    :param baseline: Results of the baseline run
+    :param tolerance: Allowed relative slowdown, 0.2 allows 20% less throughput or 20% more p99 latency
+    :return: A description of every regression
+    """
+    regressions = []
+    for size, operations in results["sizes"].items():
+        for name, current in operations.items():
+            if not (previous := baseline["sizes"].get(size, {}).get(name)):
+                continue
+            if current["ops_per_second"] < previous["ops_per_second"] * (1 - tolerance):
+                regressions.append(
+                    f"{name} at {size} customers: {current['ops_per_second']:,.0f} ops/s, "
+                    f"baseline {previous['ops_per_second']:,.0f} ops/s"
+                )
+            if current["p99"] > previous["p99"] * (1 + tolerance):
+                regressions.append(
+                    f"{name} at {size} customers: p99 {current['p99'] * 1e3:.3f} ms, "
+                    f"baseline {previous['p99'] * 1e3:.3f} ms"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Numbers of customers")
+    parser.add_argument("--calls", type=int, default=10_000, help="Calls of the cheap operations")
+    parser.add_argument("--login-calls", type=int, default=20, help="Calls of login")
+    parser.add_argument(
+        "--bcrypt-rounds", type=int, default=DEFAULT_BCRYPT_ROUNDS, help="Cost factor of the customers' password hash"
+    )
+    parser.add_argument("--output", help="Write the results to this json file")
+    parser.add_argument("--baseline", help="Compare the results to this json file")
+    parser.add_argument("--update-baseline", action="store_true", help="Save the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown")
+    parser.add_argument("--log-level", default="WARNING", help="Level of the bank logger during the run")
+    args = parser.parse_args()
+
+    DEFAULT_LOGGER.setLevel(args.log_level)
+    # Logins verify the cost written in the hash, which every customer shares
+    password_hash = Customer.create_password_hash(PASSWORD, rounds=args.bcrypt_rounds)
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "bcrypt_rounds": args.bcrypt_rounds,
+            "log_level": logging.getLevelName(DEFAULT_LOGGER.level),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            operations = bench_size(size, args.calls, args.login_calls, password_hash, directory)
+            results["sizes"][str(size)] = operations
+            for name, values in operations.items():
+                print(
+                    f"{size:>9,} {name:<15} {values['ops_per_second']:>12,.1f} ops/s"
+                    f"  p50 {values['p50'] * 1e3:9.3f} ms  p99 {values['p99'] * 1e3:9.3f} ms"
+                    f"  peak {values['peak_memory'] / 1024:10,.1f} KiB"
+                )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    elif args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
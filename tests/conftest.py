@@ -0,0 +1,14 @@
+import pytest
+
+from bank_app.logger import get_logger, stop_logger
+
+
+@pytest.fixture(scope="session", autouse=True)
+def log_dir(tmp_path_factory):
+    """
+    Send the records of the default logger to a temporary directory instead of ./logs
+    """
+    path = tmp_path_factory.mktemp("logs")
+    get_logger(parent_dir_path=path)
+    yield path
+    stop_logger()
@@ -1,4 +1,6 @@
-from bank_app.account import Account
+import pytest
+
+from bank_app.account import Account, to_cents
 
 
 class TestAccount:
@@ -60,6 +62,53 @@ class TestAccount:
         assert acc.balance_sub(1)
         assert acc.balance == 0
 
+    def test_dirty(self):
+        acc = Account(123, 1)
+        assert acc.dirty
+        acc.dirty = False
+        assert acc.balance_sub(2) is False
+        assert not acc.dirty
+        assert acc.balance_add(1)
+        assert acc.dirty
+
+    def test_cents(self):
+        acc = Account(123, 0.1)
+        assert acc.cents == 10
+
+    def test_from_cents(self):
+        acc = Account.from_cents(123, 1050)
+        assert acc.balance == 10.5
+        assert acc == Account(123, 10.5)
+
+    def test_get_balance_str(self):
+        acc = Account(123, "12.345")
+        assert acc.cents == 1235
+
+    def test_balance_add_no_drift(self):
+        acc = Account(123)
+        for _ in range(10):
+            acc.balance_add(0.1)
+        assert acc.balance == 1.0
+        assert acc.cents == 100
+
+    def test_balance_add_less_than_a_cent(self):
+        acc = Account(123, 1)
+        assert acc.balance_add(0.001) is False
+        assert acc.cents == 100
+
+    def test_balance_sub_less_than_a_cent(self):
+        acc = Account(123, 1)
+        assert acc.balance_sub(0.004) is False
+        assert acc.cents == 100
+
+    def test_slots(self):
+        acc = Account(123, 1)
+        assert not hasattr(acc, "__dict__")
+
+    def test_lock(self):
+        assert Account(123).lock is Account(123).lock
+        assert Account(123).lock is not Account(124).lock
+
     def test___str__(self):
         acc = Account(123, 1)
         assert str(acc) == "Account(123, balance=1.0)"
@@ -67,3 +116,28 @@ class TestAccount:
     def test___repr__(self):
         acc = Account(123, 1)
         assert repr(acc) == "Account(123, balance=1.0)"
+
+
+class TestToCents:
+    @pytest.mark.parametrize(
+        "amount, cents",
+        [
+            (1, 100),
+            (0.1, 10),
+            (0.005, 1),
+            (1.005, 101),
+            (2.675, 268),
+            (-0.005, -1),
+            (1.23456789, 123),
+            (1e-30, 0),
+            (1e12, 100000000000000),
+            ("0.015", 2),
+        ],
+    )
+    def test_to_cents(self, amount, cents):
+        assert to_cents(amount) == cents
+
+    @pytest.mark.parametrize("amount", ["abc", float("nan"), None])
+    def test_to_cents_invalid(self, amount):
+        with pytest.raises(ValueError):
+            to_cents(amount)
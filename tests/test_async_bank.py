@@ -0,0 +1,150 @@
+import asyncio
+
+from bank_app.account import Account
+from bank_app.async_bank import AsyncBank
+from bank_app.bank import Bank
+from bank_app.customer import Customer
+
+
+def get_async_bank(customers: list[Customer] = None):
+    customers = customers if customers else []
+    return AsyncBank(Bank(customers, save_on_exit=False), max_workers=2)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestAsyncBank:
+    def test_add_customer(self):
+        abank = get_async_bank()
+        assert run(abank.add_customer("Bob", "123"))
+        assert abank.bank.get_customer("Bob").check_password("123")
+
+    def test_add_customer_non_unique(self):
+        abank = get_async_bank([Customer("Bob", "hash", hash_password=False)])
+        assert run(abank.add_customer("bob", "123")) is False
+        assert len(abank.bank.customers) == 1
+
+    def test_add_customer_wrong_type(self):
+        abank = get_async_bank()
+        assert run(abank.add_customer("Bob", 123)) is False
+        assert len(abank.bank.customers) == 0
+
+    def test_add_customer_concurrent_same_name(self):
+        abank = get_async_bank()
+
+        async def add_twice():
+            return await asyncio.gather(
+                abank.add_customer("Bob", "123"), abank.add_customer("Bob", "456")
+            )
+
+        assert sorted(run(add_twice())) == [False, True]
+        assert len(abank.bank.customers) == 1
+
+    def test_change_customer_password(self):
+        abank = get_async_bank([Customer("Bob", "123")])
+        assert run(abank.change_customer_password("Bob", "789"))
+        assert abank.bank.customers[0].check_password("789")
+
+    def test_change_customer_password_fail(self):
+        abank = get_async_bank()
+        assert run(abank.change_customer_password("Bob", "789")) is False
+
+    def test_login(self):
+        abank = get_async_bank([Customer("Bob", "123")])
+        session = run(abank.login("Bob", "123"))
+        assert abank.bank.sessions.get(session).check_name("Bob")
+        # Sessions of concurrent customers do not replace each other as the logged in customer
+        assert abank.bank.current_user is None
+
+    def test_login_session(self):
+        bob = Customer("Bob", "123")
+        bob.accounts = [Account(1)]
+        abank = get_async_bank([bob])
+
+        async def login_and_deposit():
+            session = await abank.login("Bob", "123")
+            assert await abank.deposit(1, 10, session)
+            assert await abank.logout(session)
+            assert await abank.deposit(1, 10, session) is False
+
+        run(login_and_deposit())
+        assert bob.accounts[0].balance == 10
+
+    def test_login_wrong_password(self):
+        abank = get_async_bank([Customer("Bob", "123")])
+        assert run(abank.login("Bob", "bad_password")) is False
+        assert abank.bank.current_user is None
+
+    def test_login_wrong_name(self):
+        abank = get_async_bank()
+        assert run(abank.login("Bob", "123")) is False
+
+    def test_login_customer_removed(self):
+        abank = get_async_bank([Customer("Bob", "123")])
+
+        async def login_and_remove():
+            login = asyncio.create_task(abank.login("Bob", "123"))
+            await asyncio.sleep(0)
+            assert await abank.remove_customer("Bob")
+            return await login
+
+        assert run(login_and_remove()) is False
+        assert not abank.bank.sessions._sessions
+
+    def test_login_customer_replaced(self):
+        abank = get_async_bank([Customer("Bob", "123")])
+
+        async def login_and_replace():
+            login = asyncio.create_task(abank.login("Bob", "123"))
+            await asyncio.sleep(0)
+            assert await abank.remove_customer("Bob")
+            assert await abank.add_customer("Bob", "456")
+            return await login
+
+        assert run(login_and_replace()) is False
+        assert not abank.bank.sessions._sessions
+
+    def test_login_does_not_block_loop(self):
+        bob = Customer("Bob", "123")
+        bob.accounts = [Account(1)]
+        abank = get_async_bank([bob])
+        abank.bank.current_user = bob
+
+        async def login_and_deposit():
+            login = asyncio.create_task(abank.login("Bob", "123"))
+            await asyncio.sleep(0)
+            for _ in range(10):
+                assert await abank.deposit(1, 1)
+            assert not login.done()
+            return await login
+
+        assert run(login_and_deposit())
+        assert bob.accounts[0].balance == 10
+
+    def test_account_operations(self):
+        bob = Customer("Bob", "hash", hash_password=False)
+        abank = get_async_bank([bob])
+        abank.bank.current_user = bob
+
+        async def operations():
+            assert await abank.add_account(1)
+            assert await abank.deposit(1, 100)
+            assert await abank.withdraw(1, 40)
+            assert (await abank.get_account(1)).balance == 60
+            assert len(await abank.get_accounts()) == 1
+            assert await abank.remove_account(1)
+            assert await abank.logout()
+            assert await abank.remove_customer("Bob")
+
+        run(operations())
+        assert abank.bank.customers == []
+
+    def test_context_manager(self):
+        async def use():
+            async with get_async_bank() as abank:
+                return abank
+
+        abank = run(use())
+        assert abank._executor._shutdown
@@ -0,0 +1,192 @@
+import pytest
+
+from bank_app.account import Account
+from bank_app.balance_file import HEADER, BalanceFile, MappedAccount
+from bank_app.bank import Bank
+from bank_app.customer import Customer
+
+
+def get_customers():
+    bob = Customer("Bob", "hash", hash_password=False)
+    bob.accounts = [Account(1, 100), Account(2, 50.5)]
+    alice = Customer("Alice", "hash", hash_password=False)
+    alice.accounts = [Account(3, 10)]
+    for customer in (bob, alice):
+        customer.mark_clean()
+    return [bob, alice]
+
+
+class TestBalanceFile:
+    def test_add(self, tmp_path):
+        balance_file = BalanceFile(str(tmp_path / "balances"), capacity=1)
+        accounts = [balance_file.add(number, number * 100) for number in range(5)]
+        assert len(balance_file) == 5
+        assert balance_file.capacity == 8
+        assert [account.balance for account in accounts] == [0, 1, 2, 3, 4]
+        balance_file.close()
+
+    def test_add_existing(self, tmp_path):
+        balance_file = BalanceFile(str(tmp_path / "balances"))
+        balance_file.add(1)
+        with pytest.raises(ValueError):
+            balance_file.add(1)
+        balance_file.close()
+
+    def test_mapped_account(self, tmp_path):
+        balance_file = BalanceFile(str(tmp_path / "balances"))
+        account = balance_file.add(1, 1000)
+        assert isinstance(account, Account)
+        assert account.balance_add(0.5)
+        assert not account.balance_sub(100)
+        assert balance_file.cents(1) == 1050
+        assert account.version == 2
+        balance_file.close()
+
+    def test_reopen(self, tmp_path):
+        file_path = str(tmp_path / "balances")
+        balance_file = BalanceFile(file_path)
+        balance_file.add(1, 1000).balance_add(1)
+        balance_file.add(2, 5)
+        balance_file.close()
+
+        balance_file = BalanceFile(file_path)
+        assert len(balance_file) == 2
+        assert balance_file.cents(1) == 1100
+        assert balance_file.cents(2) == 5
+        balance_file.close()
+
+    def test_remove_reuses_record(self, tmp_path):
+        file_path = str(tmp_path / "balances")
+        balance_file = BalanceFile(file_path, capacity=2)
+        first = balance_file.add(1, 100)
+        balance_file.add(2, 200)
+        assert balance_file.remove(first)
+        assert not balance_file.remove(first)
+        # The removed account keeps working on its own
+        assert first.balance_add(1)
+        assert first.balance == 2
+        assert 1 not in balance_file
+
+        balance_file.add(3, 300)
+        assert balance_file.capacity == 2
+        balance_file.close()
+        assert BalanceFile(file_path).cents(3) == 300
+
+    def test_adopt_takes_balance_from_file(self, tmp_path):
+        file_path = str(tmp_path / "balances")
+        balance_file = BalanceFile(file_path)
+        balance_file.add(1, 999)
+        mapped = balance_file.adopt(Account(1, 1))
+        assert mapped.cents == 999
+        assert balance_file.adopt(mapped) is mapped
+        assert balance_file.adopt(Account(2, 1)).cents == 100
+        balance_file.close()
+
+    def test_balance_changes_do_not_dirty(self, tmp_path):
+        balance_file = BalanceFile(str(tmp_path / "balances"))
+        account = Account(1, 10)
+        account.dirty = False
+        mapped = balance_file.adopt(account)
+        mapped.balance_add(1)
+        assert not mapped.dirty
+        assert balance_file.adopt(Account(2)).dirty
+        balance_file.close()
+
+    def test_not_a_balance_file(self, tmp_path):
+        file_path = tmp_path / "balances"
+        file_path.write_bytes(b"x" * (HEADER.size + 24))
+        with pytest.raises(OSError):
+            BalanceFile(str(file_path))
+
+
+class TestBankBalanceFile:
+    def test_enable(self, tmp_path):
+        bank = Bank(get_customers(), save_on_exit=False)
+        balance_file = bank.enable_balance_file(str(tmp_path / "balances"))
+        assert bank.enable_balance_file(str(tmp_path / "other")) is balance_file
+        assert all(isinstance(account, MappedAccount) for account in bank.customers[0].accounts)
+        assert bank.find_account(2)[1].balance == 50.5
+        with pytest.raises(ValueError):
+            bank.enable_columnar()
+
+    def test_balances_survive_restart(self, tmp_path):
+        file_path = str(tmp_path / "balances")
+        bank = Bank(get_customers(), save_on_exit=False)
+        bank.enable_balance_file(file_path)
+        session = bank._start_session(bank.get_customer("Bob"))
+        assert bank.transfer(1, 3, 25, session)
+        # Nothing but the balances changed, there is nothing to save
+        assert not any(customer.dirty for customer in bank.customers)
+        bank.balance_file.close()
+
+        restarted = Bank(get_customers(), save_on_exit=False)
+        restarted.enable_balance_file(file_path)
+        assert restarted.find_account(1)[1].balance == 75
+        assert restarted.find_account(3)[1].balance == 35
+
+    def test_new_accounts_after_enable(self, tmp_path):
+        bank = Bank(get_customers(), save_on_exit=False)
+        balance_file = bank.enable_balance_file(str(tmp_path / "balances"))
+        session = bank._start_session(bank.get_customer("Alice"))
+        assert bank.add_account(4, session)
+        assert 4 in balance_file
+        assert bank.remove_account(4, session)
+        assert 4 not in balance_file
+        assert bank.remove_customer("Bob")
+        assert len(balance_file) == 1
+
+    def crash_with_stale_pages(self, tmp_path):
+        """
+        Transfer with a journal, then put back the balance file as it was before the transfer
+        """
+        file_path = tmp_path / "balances"
+        bank = Bank(get_customers(), save_on_exit=False, journal_path=str(tmp_path / "journal.log"))
+        bank.enable_balance_file(str(file_path))
+        bank.balance_file.flush()
+        stale = file_path.read_bytes()
+        assert bank.transfer(1, 3, 25, bank._start_session(bank.get_customer("Bob")))
+        bank.journal.close()
+        bank.balance_file.close()
+        file_path.write_bytes(stale)
+        return Bank(get_customers(), save_on_exit=False, journal_path=str(tmp_path / "journal.log"))
+
+    def test_journal_newer_than_file(self, tmp_path):
+        restarted = self.crash_with_stale_pages(tmp_path)
+        assert restarted.replay_journal() == 2
+        restarted.enable_balance_file(str(tmp_path / "balances"))
+        assert restarted.find_account(1)[1].balance == 75
+        assert restarted.find_account(3)[1].balance == 35
+        assert restarted.find_account(2)[1].balance == 50.5
+
+    def test_journal_newer_than_file_replayed_after_enable(self, tmp_path):
+        restarted = self.crash_with_stale_pages(tmp_path)
+        restarted.enable_balance_file(str(tmp_path / "balances"))
+        assert restarted.replay_journal() == 2
+        assert restarted.find_account(1)[1].balance == 75
+        assert restarted.find_account(3)[1].balance == 35
+
+    def test_file_newer_than_journal(self, tmp_path):
+        file_path = str(tmp_path / "balances")
+        bank = Bank(get_customers(), save_on_exit=False, journal_path=str(tmp_path / "journal.log"))
+        bank.enable_balance_file(file_path)
+        account = bank.find_account(1)[1]
+        assert bank.deposit(1, 5, bank._start_session(bank.get_customer("Bob")))
+        # A change the journal did not get to before the crash, but the flushed pages did
+        account.balance_add(1)
+        bank.journal.close()
+        bank.balance_file.close()
+
+        restarted = Bank(get_customers(), save_on_exit=False, journal_path=str(tmp_path / "journal.log"))
+        restarted.replay_journal()
+        restarted.enable_balance_file(file_path)
+        assert restarted.find_account(1)[1].balance == 106
+
+    def test_save_flushes(self, tmp_path):
+        bank = Bank(get_customers(), save_on_exit=False)
+        bank.enable_balance_file(str(tmp_path / "balances"))
+        bank.find_account(1)[1].balance_add(5)
+        assert bank.save_customers(str(tmp_path / "bank.json"))
+
+        loaded = Bank(save_on_exit=False)
+        loaded.load_customers(str(tmp_path / "bank.json"))
+        assert loaded.find_account(1)[1].balance == 105
@@ -1,8 +1,18 @@
 import atexit
+import sys
+import threading
+
+import pytest
 
 from bank_app import parser_json
-from bank_app.account import Account
-from bank_app.bank import Bank
+from bank_app.account import LOCK_STRIPES, Account
+from bank_app.bank import (
+    BATCH_INSUFFICIENT_FUNDS,
+    BATCH_INVALID,
+    BATCH_NOT_FOUND,
+    BATCH_OK,
+    Bank,
+)
 from bank_app.customer import Customer
 
 
@@ -11,9 +21,22 @@ def get_bank(customers: list[Customer] = None):
     return Bank(customers, save_on_exit=False)
 
 
+def run_threads(target, count: int = 8):
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+
 class TestBank:
     def test_save_on_exit(self, tmp_path):
-        Bank(save_on_exit=True, save_file_path=tmp_path)
+        bank = Bank(save_on_exit=True, save_file_path=tmp_path)
         funcs = []
 
         class Capture:
@@ -23,13 +46,25 @@ class TestBank:
 
         c = Capture()
         atexit.unregister(c)
-        assert funcs[-1] == parser_json.save_customers
+        assert funcs[-1] == bank._save_on_exit
+        atexit.unregister(bank._save_on_exit)
 
     def test_load_customers(self):
         bank = get_bank()
         assert bank.load_customers("tests/data/test_saved_customers_load.json")
         assert len(bank.customers) > 0
 
+    def test_load_customers_stream(self):
+        bank = get_bank()
+        calls = []
+        assert bank.load_customers(
+            "tests/data/test_saved_customers_load.json",
+            stream=True,
+            progress=lambda count, bytes_read: calls.append(count),
+        )
+        assert len(bank.customers) == len(calls) == 2
+        assert bank.get_customer("Bob") is bank.customers[0]
+
     def test_load_customers_wrong_file(self, tmp_path):
         bank = get_bank()
         assert bank.load_customers(tmp_path / "empty.json") is False
@@ -40,6 +75,81 @@ class TestBank:
         file_path = tmp_path / "test_saved_customers.json"
         assert bank.save_customers(file_path)
 
+    def test_save_customers_truncates_journal(self, tmp_path):
+        bob = Customer("Bob", "hash", hash_password=False)
+        bob.accounts = [Account(1)]
+        bank = Bank([bob], save_on_exit=False, journal_path=tmp_path / "journal.log")
+        bank.current_user = bob
+        assert bank.deposit(1, 100)
+        assert bank.save_customers(tmp_path / "saved.json")
+        assert list(bank.journal.records()) == []
+
+    def test_replay_journal(self, tmp_path):
+        journal_path = tmp_path / "journal.log"
+        bank = Bank(save_on_exit=False, journal_path=journal_path)
+        assert bank.load_customers("tests/data/test_saved_customers_load.json")
+        bank.current_user = bank.get_customer("Bob")
+        assert bank.deposit(1, 50)
+        assert bank.withdraw(2, 15.24)
+        assert bank.remove_account(1)
+        assert bank.add_account(5)
+        assert bank.deposit(5, 1.5)
+        assert bank.remove_customer("Alice")
+        bank.journal.close()
+
+        restored = Bank(save_on_exit=False, journal_path=journal_path)
+        assert restored.load_customers("tests/data/test_saved_customers_load.json")
+        assert [c.to_json() for c in restored.customers] == [
+            c.to_json() for c in bank.customers
+        ]
+
+    def test_replay_journal_twice(self, tmp_path):
+        journal_path = tmp_path / "journal.log"
+        bank = Bank(save_on_exit=False, journal_path=journal_path)
+        assert bank.load_customers("tests/data/test_saved_customers_load.json")
+        bank.current_user = bank.get_customer("Bob")
+        assert bank.remove_account(1)
+        assert bank.add_account(1)
+        assert bank.deposit(1, 7)
+        expected = [c.to_json() for c in bank.customers]
+        assert bank.replay_journal() == 3
+        assert [c.to_json() for c in bank.customers] == expected
+
+    def test_replay_journal_legacy_balance(self, tmp_path):
+        # Journals written before balances were kept in cents hold float balances
+        journal_path = tmp_path / "journal.log"
+        journal_path.write_text('["balance",1,0.29]\n["balance",2,1234567.89]\n')
+        bank = Bank(save_on_exit=False, journal_path=journal_path)
+        assert bank.load_customers("tests/data/test_saved_customers_load.json")
+        bank.current_user = bank.get_customer("Bob")
+        assert bank.get_account(1).cents == 29
+        assert bank.get_account(2).cents == 123456789
+
+    def test_replay_journal_no_journal(self):
+        assert get_bank().replay_journal() == 0
+
+    def test_save_customers_incremental(self, tmp_path):
+        file_path = tmp_path / "test_saved_customers.json"
+        bank = get_bank()
+        bank.compact_every = 2
+        assert bank.load_customers("tests/data/test_saved_customers_load.json")
+        assert bank.save_customers(file_path, incremental=True)
+        assert parser_json.get_delta_paths(file_path) == []
+
+        bank.current_user = bank.get_customer("Bob")
+        assert bank.deposit(1, 10)
+        assert bank.save_customers(file_path, incremental=True)
+        assert bank.remove_customer("Alice")
+        assert bank.save_customers(file_path, incremental=True)
+        assert len(parser_json.get_delta_paths(file_path)) == 2
+
+        restored = get_bank()
+        assert restored.load_customers(file_path)
+        assert restored.to_json()["customers"] == bank.to_json()["customers"]
+
+        assert bank.save_customers(file_path, incremental=True)
+        assert parser_json.get_delta_paths(file_path) == []
+
     def test_save_customers_no_customers(self):
         bank = get_bank()
         assert bank.save_customers() is False
@@ -66,11 +176,52 @@ class TestBank:
         c = bank.customers[0]
         assert c.check_name(name) and c.check_password(password)
 
+    def test_add_customer_non_unique_capitalization(self):
+        bank = get_bank([Customer("Bob", "hash", hash_password=False)])
+        assert bank.add_customer("BOB", "123") is False
+        assert len(bank.customers) == 1
+
     def test_add_customer_wrong_type(self):
         bank = get_bank()
         assert bank.add_customer(["bob"], 123) is False
         assert len(bank.customers) == 0
 
+    def test_add_customers_bulk(self):
+        bank = get_bank()
+        assert bank.add_customers_bulk([("Bob", "123"), ("Alice", "456")], processes=2) == [
+            None,
+            None,
+        ]
+        assert [c.name for c in bank.customers] == ["bob", "alice"]
+        assert bank.get_customer("Alice").check_password("456")
+
+    def test_add_customers_bulk_errors(self):
+        bank = get_bank([Customer("Bob", "hash", hash_password=False)])
+        errors = bank.add_customers_bulk(
+            [("BOB", "123"), ("Alice", "456"), ("alice", "789"), (1, "123"), ("Carol",)],
+            processes=1,
+        )
+        assert errors[1] is None
+        assert [type(e) for i, e in enumerate(errors) if i != 1] == [
+            ValueError,
+            ValueError,
+            TypeError,
+            ValueError,
+        ]
+        assert [c.name for c in bank.customers] == ["bob", "alice"]
+        assert bank.get_customer("Alice").check_password("456")
+
+    def test_add_customers_bulk_atomic(self, monkeypatch):
+        bank = get_bank()
+
+        def fail(password):
+            raise RuntimeError("hashing failed")
+
+        monkeypatch.setattr(Customer, "create_password_hash", staticmethod(fail))
+        with pytest.raises(RuntimeError):
+            bank.add_customers_bulk([("Bob", "123"), ("Alice", "456")], processes=1)
+        assert bank.customers == []
+
     def test_get_customer(self):
         name, password = "Bob", "123"
         bank = get_bank([Customer(name, password)])
@@ -82,11 +233,32 @@ class TestBank:
         bank = get_bank()
         assert bank.get_customer("Bob") is None
 
+    def test_get_customer_loaded(self):
+        bank = get_bank()
+        assert bank.load_customers("tests/data/test_saved_customers_load.json")
+        assert bank.get_customer("Alice") is bank.customers[1]
+
+    def test_get_customer_removed(self):
+        bank = get_bank([Customer("Bob", "hash", hash_password=False)])
+        assert bank.remove_customer("Bob")
+        assert bank.get_customer("Bob") is None
+
     def test_change_customer_password(self):
         bank = get_bank([Customer("Bob", "123"), Customer("Alice", "456")])
         assert bank.change_customer_password("Bob", "789")
         assert bank.customers[0].check_password("789")
 
+    def test_change_customer_password_journal(self, tmp_path):
+        journal_path = tmp_path / "journal.log"
+        bank = Bank(save_on_exit=False, journal_path=journal_path)
+        assert bank.add_customer("Bob", "123")
+        assert bank.change_customer_password("Bob", "789")
+        bank.journal.close()
+
+        restored = Bank(save_on_exit=False, journal_path=journal_path)
+        assert restored.replay_journal() == 2
+        assert restored.get_customer("Bob").check_password("789")
+
     def test_change_customer_password_fail(self):
         bank = get_bank([Customer("Bob", "123")])
         assert bank.change_customer_password("Alice", "789") is False
@@ -132,6 +304,64 @@ class TestBank:
         assert not bank.login("Alice", "123")
         assert bank.current_user is None
 
+    def test_login_session(self):
+        bob = Customer("Bob", "123")
+        bob.accounts = [Account(1)]
+        alice = Customer("Alice", "456")
+        alice.accounts = [Account(2)]
+        bank = get_bank([bob, alice])
+        bob_session = bank.login("Bob", "123")
+        alice_session = bank.login("Alice", "456")
+        assert bob_session != alice_session
+        assert bank.deposit(1, 10, bob_session)
+        assert bank.deposit(2, 20, alice_session)
+        assert bank.deposit(2, 20, bob_session) is False
+        assert bank.get_accounts(bob_session) == [Account(1, 10)]
+        assert bank.get_account(2, alice_session).balance == 20
+
+    def test_open_session(self):
+        bob = Customer("Bob", "123")
+        bob.accounts = [Account(1)]
+        bank = get_bank([bob, Customer("Alice", "456")])
+        assert bank.login("Alice", "456")
+        session = bank.open_session("Bob", "123")
+        assert bank.sessions.get(session) is bob
+        assert bank.current_user.check_name("Alice")
+        assert bank.open_session("Bob", "bad_password") is False
+
+    def test_session_unknown(self):
+        bank = get_bank()
+        assert bank.get_accounts("unknown") is None
+        assert bank.add_account(1, "unknown") is False
+        assert bank.remove_account(1, "unknown") is False
+        assert bank.deposit(1, 100, "unknown") is False
+
+    def test_session_account_operations(self):
+        bob = Customer("Bob", "hash", hash_password=False)
+        bank = get_bank([bob])
+        session = bank.sessions.create(bob)
+        assert bank.add_account(1, session)
+        assert bank.withdraw(1, 10, session) is False
+        assert bank.deposit(1, 10, session)
+        assert bank.withdraw(1, 5, session)
+        assert bank.remove_account(1, session)
+        assert bob.accounts == []
+
+    def test_logout_session(self):
+        bob = Customer("Bob", "hash", hash_password=False)
+        bank = get_bank([bob])
+        session = bank.sessions.create(bob)
+        assert bank.logout(session)
+        assert bank.logout(session) is False
+        assert bank.get_accounts(session) is None
+
+    def test_remove_customer_ends_sessions(self):
+        bob = Customer("Bob", "hash", hash_password=False)
+        bank = get_bank([bob])
+        session = bank.sessions.create(bob)
+        assert bank.remove_customer("Bob")
+        assert bank.get_accounts(session) is None
+
     def test_logout(self):
         bank = get_bank()
         bank.current_user = Customer("Bob", "123")
@@ -169,6 +399,14 @@ class TestBank:
         assert bank.add_account(1) is False
         assert len(bank.current_user.accounts) == 1
 
+    def test_add_account_non_unique_other_customer(self):
+        bank = get_bank()
+        bank.current_user = Customer("Bob", "hash", hash_password=False)
+        assert bank.add_account(1)
+        bank.current_user = Customer("Alice", "hash", hash_password=False)
+        assert bank.add_account(1) is False
+        assert len(bank.current_user.accounts) == 0
+
     def test_add_account_wrong_type(self):
         bank = get_bank()
         bank.current_user = Customer("Bob", "123")
@@ -215,6 +453,39 @@ class TestBank:
         bank.current_user.accounts = [Account(1), Account(2)]
         assert bank.get_account(3) is None
 
+    def test_find_account(self):
+        bob = Customer("Bob", "hash", hash_password=False)
+        bob.accounts = [Account(1), Account(2)]
+        bank = get_bank([bob])
+        owner, acc = bank.find_account(2)
+        assert owner is bob
+        assert acc is bob.accounts[1]
+
+    def test_find_account_loaded(self):
+        bank = get_bank()
+        assert bank.load_customers("tests/data/test_saved_customers_load.json")
+        owner, acc = bank.find_account(3)
+        assert owner.check_name("Alice")
+        assert acc.account_number == 3
+
+    def test_find_account_fail(self):
+        bank = get_bank()
+        assert bank.find_account(1) is None
+
+    def test_find_account_removed_account(self):
+        bank = get_bank()
+        bank.current_user = Customer("Bob", "hash", hash_password=False)
+        assert bank.add_account(1)
+        assert bank.remove_account(1)
+        assert bank.find_account(1) is None
+
+    def test_find_account_removed_customer(self):
+        bob = Customer("Bob", "hash", hash_password=False)
+        bob.accounts = [Account(1)]
+        bank = get_bank([bob])
+        assert bank.remove_customer("Bob")
+        assert bank.find_account(1) is None
+
     def test_deposit_int(self):
         bank = get_bank()
         bank.current_user = Customer("Bob", "123")
@@ -301,6 +572,267 @@ class TestBank:
         assert bank.withdraw(1, "1") is False
         assert bank.current_user.accounts[0].balance == 100
 
+    def test_thread_safe_deposit_withdraw(self, tmp_path):
+        bob = Customer("Bob", "hash", hash_password=False)
+        bob.accounts = [Account(1, 1000), Account(2)]
+        bank = Bank(
+            [bob], save_on_exit=False, journal_path=tmp_path / "journal.log", thread_safe=True
+        )
+        session = bank.sessions.create(bob)
+
+        def work(i):
+            for _ in range(500):
+                assert bank.deposit(1, 1, session)
+                assert bank.withdraw(1, 1, session)
+                assert bank.deposit(2, 1, session)
+
+        run_threads(work)
+        assert bob.accounts[0].balance == 1000
+        assert bob.accounts[1].balance == 8 * 500
+
+        bank.journal.sync()
+        restored_bob = Customer("Bob", "hash", hash_password=False)
+        restored_bob.accounts = [Account(1, 1000), Account(2)]
+        restored = Bank(
+            [restored_bob], save_on_exit=False, journal_path=tmp_path / "journal.log"
+        )
+        restored.replay_journal()
+        assert restored.customers[0].to_json() == bob.to_json()
+
+    def test_thread_safe_add_account(self):
+        customers = [Customer(f"user{i}", "hash", hash_password=False) for i in range(8)]
+        bank = Bank(customers, save_on_exit=False, thread_safe=True)
+        sessions = [bank.sessions.create(customer) for customer in customers]
+        added = []
+
+        def work(i):
+            for account_number in range(100):
+                if bank.add_account(account_number, sessions[i]):
+                    added.append(account_number)
+
+        run_threads(work)
+        assert sorted(added) == list(range(100))
+        assert sum(len(customer.accounts) for customer in customers) == 100
+
+    def test_thread_safe_get_accounts(self):
+        bob = Customer("Bob", "hash", hash_password=False)
+        bank = Bank([bob], save_on_exit=False, thread_safe=True)
+        session = bank.sessions.create(bob)
+
+        def work(i):
+            for j in range(100):
+                if i % 2:
+                    assert bank.add_account(i * 100 + j, session)
+                else:
+                    bank.get_accounts(session)
+
+        run_threads(work)
+        assert len(bank.get_accounts(session)) == 400
+
+    def test_thread_safe_add_remove_customer(self):
+        bank = Bank(save_on_exit=False, thread_safe=True)
+
+        def work(i):
+            for j in range(50):
+                bank.add_hashed_customer(f"user{j}", "hash")
+                bank.remove_customer(f"user{(j + i) % 50}")
+
+        run_threads(work)
+        assert len(bank.customers) == len(bank._customer_index)
+        assert all(bank.get_customer(c.name) is c for c in bank.customers)
+
+    def test_thread_safe_lazy_load(self, tmp_path):
+        customers = [Customer(f"user{i}", "hash", hash_password=False) for i in range(200)]
+        for i, customer in enumerate(customers):
+            customer.accounts = [Account(i, 10)]
+        file_path = str(tmp_path / "bank.json")
+        assert parser_json.save_customers(customers, file_path)
+        bank = Bank(save_on_exit=False, thread_safe=True)
+        bank.enable_columnar()
+        assert bank.load_customers(file_path, lazy=True)
+
+        def work(i):
+            for j in range(i, 200, 8):
+                assert bank.get_customer(f"user{j}")
+                assert bank.transfer_many([(j, (j * 7 + i) % 200, 1)])
+                assert bank.find_account((j * 13 + i) % 200)
+
+        run_threads(work)
+        assert sorted(c.name for c in bank.customers) == sorted(c.name for c in customers)
+        assert len(bank._account_index) == 200
+        assert sum(account.cents for _, account in bank._account_index.values()) == 200_000
+
+    def get_transfer_bank(self, **kwargs):
+        bob = Customer("Bob", "hash", hash_password=False)
+        bob.accounts = [Account(1, 100), Account(2, 50)]
+        alice = Customer("Alice", "hash", hash_password=False)
+        alice.accounts = [Account(3, 10)]
+        bank = Bank([bob, alice], save_on_exit=False, **kwargs)
+        bank.current_user = bob
+        return bank, bob, alice
+
+    def test_transfer(self):
+        bank, bob, alice = self.get_transfer_bank()
+        assert bank.transfer(1, 3, 40)
+        assert bob.accounts[0].balance == 60
+        assert alice.accounts[0].balance == 50
+
+    def test_transfer_insufficient_funds(self):
+        bank, bob, alice = self.get_transfer_bank()
+        assert bank.transfer(2, 3, 50.01) is False
+        assert bob.accounts[1].balance == 50
+        assert alice.accounts[0].balance == 10
+
+    def test_transfer_not_owner(self):
+        bank, bob, alice = self.get_transfer_bank()
+        assert bank.transfer(3, 1, 5) is False
+        assert alice.accounts[0].balance == 10
+
+    def test_transfer_unknown_account(self):
+        bank, bob, _ = self.get_transfer_bank()
+        assert bank.transfer(1, 4, 5) is False
+        assert bank.transfer(4, 1, 5) is False
+        assert bob.accounts[0].balance == 100
+
+    def test_transfer_invalid(self):
+        bank, bob, _ = self.get_transfer_bank()
+        assert bank.transfer(1, 1, 5) is False
+        assert bank.transfer(1, 2, -5) is False
+        assert bank.transfer(1, 2, "5") is False
+        assert bank.transfer(1, 2, float("inf")) is False
+        assert [acc.balance for acc in bob.accounts] == [100, 50]
+
+    def test_amounts_below_a_cent(self, tmp_path):
+        bank, bob, _ = self.get_transfer_bank(journal_path=tmp_path / "journal.log")
+        assert bank.transfer(1, 2, 0.001) is False
+        assert bank.transfer_many([(1, 2, 0.004)]) == [False]
+        assert list(bank.apply_batch([("deposit", 1, 0.001), ("withdraw", 1, 0.001)])) == [
+            BATCH_INVALID,
+            BATCH_INVALID,
+        ]
+        assert bank.deposit(1, 0.001) is False
+        assert len(bob.accounts[0].ledger) == 0
+        assert list(bank.journal.records()) == []
+
+    def test_transfer_no_user(self):
+        bank, bob, _ = self.get_transfer_bank()
+        bank.current_user = None
+        assert bank.transfer(1, 2, 5) is False
+
+    def test_transfer_many(self, tmp_path):
+        bank, bob, alice = self.get_transfer_bank(journal_path=tmp_path / "journal.log")
+        results = bank.transfer_many(
+            [(1, 3, 30), (3, 2, 40), (3, 1, 1), (2, 2, 1), (1, 9, 1), (1, 2, "1"), (2, 1, 0)]
+        )
+        assert results == [True, True, False, False, False, False, False]
+        assert [acc.balance for acc in bob.accounts] == [70, 90]
+        assert alice.accounts[0].balance == 0
+        assert sorted(bank.journal.records()) == [
+            ["cents", 1, 7000],
+            ["cents", 2, 9000],
+            ["cents", 3, 0],
+        ]
+
+    def test_transfer_many_malformed(self, tmp_path):
+        bank, bob, alice = self.get_transfer_bank(journal_path=tmp_path / "journal.log")
+        results = bank.transfer_many([(1, 3, 5), (1, 3), (1, 3, float("inf")), ([1], 3, 1), (3, 2, 5)])
+        assert results == [True, False, False, False, True]
+        assert [acc.balance for acc in bob.accounts + alice.accounts] == [95, 55, 10]
+        assert sorted(bank.journal.records()) == [["cents", 1, 9500], ["cents", 2, 5500], ["cents", 3, 1000]]
+
+    def test_transfer_many_journals_when_input_fails(self, tmp_path):
+        bank, bob, alice = self.get_transfer_bank(journal_path=tmp_path / "journal.log")
+
+        def transfers():
+            yield 1, 3, 5
+            raise RuntimeError("feed broke")
+
+        with pytest.raises(RuntimeError):
+            bank.transfer_many(transfers())
+        assert sorted(bank.journal.records()) == [["cents", 1, 9500], ["cents", 3, 1500]]
+
+    def test_transfer_many_concurrent(self):
+        bank, bob, alice = self.get_transfer_bank(thread_safe=True)
+
+        def work(i):
+            src, dst = (1, 3) if i % 2 else (3, 1)
+            for _ in range(200):
+                bank.transfer_many([(src, dst, 1), (2, src, 0.5)])
+
+        run_threads(work)
+        balances = [acc.balance for acc in bob.accounts + alice.accounts]
+        assert sum(balances) == 160
+        assert all(balance >= 0 for balance in balances)
+
+    def test_transfer_many_concurrent_lock_stripes(self):
+        # Account order and lock stripe order disagree for these accounts
+        bob = Customer("Bob", "hash", hash_password=False)
+        bob.accounts = [Account(1, 100), Account(2, 100)]
+        alice = Customer("Alice", "hash", hash_password=False)
+        alice.accounts = [Account(LOCK_STRIPES + 2, 100), Account(LOCK_STRIPES + 1, 100)]
+        bank = Bank([bob, alice], save_on_exit=False, thread_safe=True)
+
+        def work(i):
+            pairs = [(1, LOCK_STRIPES + 2), (LOCK_STRIPES + 1, 2)]
+            src, dst = pairs[i % 2] if i % 4 < 2 else pairs[i % 2][::-1]
+            for _ in range(200):
+                bank.transfer_many([(src, dst, 1)])
+
+        run_threads(work)
+        assert sum(acc.balance for acc in bob.accounts + alice.accounts) == 400
+
+    def test_apply_batch(self, tmp_path):
+        bank, bob, alice = self.get_transfer_bank(journal_path=tmp_path / "journal.log")
+        results = bank.apply_batch(
+            [
+                ("withdraw", 3, 15),
+                ("deposit", 1, 10.5),
+                ("deposit", 3, 10),
+                ("withdraw", 3, 15),
+                ("withdraw", 2, 50),
+            ]
+        )
+        assert list(results) == [BATCH_INSUFFICIENT_FUNDS, BATCH_OK, BATCH_OK, BATCH_OK, BATCH_OK]
+        assert [acc.balance for acc in bob.accounts] == [110.5, 0]
+        assert alice.accounts[0].balance == 5
+        assert sorted(bank.journal.records()) == [
+            ["cents", 1, 11050],
+            ["cents", 2, 0],
+            ["cents", 3, 500],
+        ]
+
+    def test_apply_batch_invalid(self):
+        bank, bob, _ = self.get_transfer_bank()
+        results = bank.apply_batch(
+            [
+                ("deposit", 1, "10"),
+                ("transfer", 1, 10),
+                ("deposit", 1, -10),
+                ("deposit", 9, 10),
+                ("withdraw", 1, 1),
+            ]
+        )
+        assert list(results) == [
+            BATCH_INVALID,
+            BATCH_INVALID,
+            BATCH_INVALID,
+            BATCH_NOT_FOUND,
+            BATCH_OK,
+        ]
+        assert bob.accounts[0].balance == 99
+
+    def test_apply_batch_malformed(self):
+        bank, bob, _ = self.get_transfer_bank()
+        results = bank.apply_batch(
+            [("deposit", 1), ("deposit", 1, float("inf")), ("deposit", [1], 1), ("deposit", 1, 1)]
+        )
+        assert list(results) == [BATCH_INVALID, BATCH_INVALID, BATCH_INVALID, BATCH_OK]
+        assert bob.accounts[0].balance == 101
+
+    def test_apply_batch_empty(self):
+        bank, _, _ = self.get_transfer_bank()
+        assert len(bank.apply_batch([])) == 0
+
     def test_to_json(self):
         customers = [Customer("Bob", "123"), Customer("Alice", "456")]
         customers[0].accounts = [Account(1, 123.4), Account(2, 456)]
@@ -0,0 +1,161 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from bank_app.account import Account
+from bank_app.bank import Bank
+from bank_app.columnar import AccountView, ColumnarAccounts
+from bank_app.customer import Customer
+from bank_app.journal import Journal
+
+
+def get_columnar_bank():
+    bob = Customer("Bob", "hash", hash_password=False)
+    bob.accounts = [Account(1, 100), Account(2, 50.5)]
+    alice = Customer("Alice", "hash", hash_password=False)
+    alice.accounts = [Account(3, 10)]
+    bank = Bank([bob, alice], save_on_exit=False)
+    return bank, bank.enable_columnar(), bob, alice
+
+
+class TestColumnarAccounts:
+    def test_add(self):
+        store = ColumnarAccounts(capacity=1)
+        for number in range(5):
+            store.add("bob", number, number * 100)
+        assert len(store) == 5
+        assert store.account_numbers.tolist() == [0, 1, 2, 3, 4]
+        assert store.total() == 10
+
+    def test_add_existing(self):
+        store = ColumnarAccounts()
+        store.add("bob", 1)
+        with pytest.raises(ValueError):
+            store.add("alice", 1)
+
+    def test_view(self):
+        store = ColumnarAccounts()
+        view = store.add("bob", 1, 1000)
+        assert isinstance(view, Account)
+        assert view.balance_add(0.5)
+        assert view.balance_sub(100) is False
+        assert store.cents.tolist() == [1050]
+        assert view == Account(1, 10.5)
+
+    def test_view_slots(self):
+        store = ColumnarAccounts()
+        assert not hasattr(store.add("bob", 1), "__dict__")
+
+    def test_adopt(self):
+        store = ColumnarAccounts()
+        account = Account(1, 5)
+        account.dirty = False
+        view = store.adopt("bob", account)
+        assert view.cents == 500
+        assert not view.dirty
+        assert store.adopt("bob", view) is view
+
+    def test_remove(self):
+        store = ColumnarAccounts()
+        first = store.add("bob", 1, 100)
+        store.add("bob", 2, 200)
+        last = store.add("alice", 3, 300)
+        assert store.remove(1)
+        assert not store.remove(1)
+        assert store.account_numbers.tolist() == [3, 2]
+        assert store.find(3) is last
+        last.balance_add(1)
+        assert store.cents.tolist() == [400, 200]
+
+        # The removed view keeps its balance without touching the store
+        first.balance_add(1)
+        assert first.balance == 2
+        assert store.total() == 6
+
+    def test_columns_read_only(self):
+        store = ColumnarAccounts()
+        store.add("bob", 1, 100)
+        with pytest.raises(ValueError):
+            store.cents[0] = 0
+
+    def test_below_between(self):
+        store = ColumnarAccounts()
+        for number, cents in enumerate([0, 500, 1000, 1500]):
+            store.add("bob", number, cents)
+        assert store.below(10).tolist() == [0, 1]
+        assert store.between(5, 10).tolist() == [1, 2]
+
+    def test_histogram(self):
+        store = ColumnarAccounts()
+        for number, cents in enumerate([0, 500, 1000, 1500]):
+            store.add("bob", number, cents)
+        counts, edges = store.histogram([0, 10, 20])
+        assert counts.tolist() == [2, 2]
+        assert edges.tolist() == [0, 10, 20]
+
+    def test_owner_totals(self):
+        store = ColumnarAccounts()
+        store.add("bob", 1, 150)
+        store.add("alice", 2, 200)
+        store.add("bob", 3, 50)
+        store.remove(2)
+        assert store.owner_totals() == {"bob": 2.0}
+
+
+class TestBankColumnar:
+    def test_enable_columnar(self):
+        bank, store, bob, alice = get_columnar_bank()
+        assert bank.enable_columnar() is store
+        assert all(isinstance(account, AccountView) for account in bob.accounts)
+        assert bank.find_account(3) == (alice, alice.accounts[0])
+        assert store.total() == 160.5
+        assert store.owner_totals() == {"bob": 150.5, "alice": 10.0}
+
+    def test_deposit_withdraw(self):
+        bank, store, bob, alice = get_columnar_bank()
+        session = bank._start_session(bob)
+        assert bank.deposit(1, 10, session)
+        assert bank.withdraw(2, 0.5, session)
+        assert store.cents.tolist() == [11000, 5000, 1000]
+
+    def test_transfer_many(self):
+        bank, store, bob, alice = get_columnar_bank()
+        assert bank.transfer_many([(1, 3, 100), (3, 2, 0.5)]) == [True, True]
+        assert store.cents.tolist() == [0, 5100, 10950]
+        assert store.total() == 160.5
+
+    def test_add_remove_account(self):
+        bank, store, bob, alice = get_columnar_bank()
+        session = bank._start_session(alice)
+        assert bank.add_account(4, session)
+        assert 4 in store
+        assert isinstance(alice.accounts[-1], AccountView)
+        assert bank.remove_account(3, session)
+        assert store.account_numbers.tolist() == [1, 2, 4]
+
+    def test_remove_customer(self):
+        bank, store, bob, alice = get_columnar_bank()
+        assert bank.remove_customer("Bob")
+        assert store.account_numbers.tolist() == [3]
+
+    def test_load_customers(self, tmp_path):
+        bank, store, bob, alice = get_columnar_bank()
+        file_path = tmp_path / "customers.json"
+        bank.save_customers(file_path)
+        other = Bank(save_on_exit=False)
+        other_store = other.enable_columnar()
+        assert other.load_customers(file_path)
+        assert other_store.total() == 160.5
+
+    def test_replay_journal(self, tmp_path):
+        journal = Journal(tmp_path / "journal.log")
+        journal.append("cents", 1, 123)
+        journal.close()
+
+        bob = Customer("Bob", "hash", hash_password=False)
+        bob.accounts = [Account(1, 100)]
+        bank = Bank([bob], save_on_exit=False, journal_path=tmp_path / "journal.log")
+        store = bank.enable_columnar()
+        assert bank.replay_journal() == 1
+        assert store.cents.tolist() == [123]
+        assert bob.accounts[0].balance == 1.23
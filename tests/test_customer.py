@@ -1,5 +1,5 @@
 from bank_app.account import Account
-from bank_app.customer import Customer
+from bank_app.customer import Customer, pack_hash, unpack_hash
 
 
 class TestCustomer:
@@ -37,6 +37,40 @@ class TestCustomer:
         c = Customer("Bob", "123456789")
         assert c.add_account("Hi") is False
 
+    def test_dirty(self):
+        c = Customer("Bob", "hash", hash_password=False)
+        assert c.dirty
+        c.mark_clean()
+        assert not c.dirty
+        c.add_account(Account(1, 0))
+        assert c.dirty
+
+    def test_dirty_account(self):
+        c = Customer("Bob", "hash", hash_password=False)
+        c.add_account(Account(1, 0))
+        c.mark_clean()
+        assert not c.accounts[0].dirty
+        c.accounts[0].balance_add(1)
+        assert c.dirty
+
+    def test_dirty_password(self):
+        c = Customer("Bob", "hash", hash_password=False)
+        c.mark_clean()
+        c.set_password_hash("other_hash")
+        assert c.dirty
+
+    def test_create_password_hash_rounds(self):
+        assert Customer.create_password_hash("123", rounds=4).startswith("$2b$04$")
+        assert Customer.create_password_hash("123").startswith("$2b$13$")
+
+    def test_password_hash(self):
+        c = Customer("Bob", "hash", hash_password=False)
+        assert c.password == "hash"
+
+    def test_slots(self):
+        c = Customer("Bob", "hash", hash_password=False)
+        assert not hasattr(c, "__dict__")
+
     def test___eq__false(self):
         bob = Customer("Bob", "123")
         alice = Customer("Alice", "456")
@@ -55,3 +89,32 @@ class TestCustomer:
         c = Customer("Bob", "123")
         c.add_account(Account(1, 0))
         assert repr(c) == f"Customer({c.name}, {c.password})"
+
+    def test_pack_hash(self):
+        password_hash = Customer.create_password_hash("123").encode()
+        packed = pack_hash(password_hash)
+        assert len(packed) == 45
+        assert unpack_hash(packed) == password_hash
+        assert pack_hash(b"hash") == unpack_hash(b"hash") == b"hash"
+
+    def test_single_account_inline(self):
+        c = Customer("Bob", "hash", hash_password=False)
+        assert c.view_accounts() == ()
+        c.add_account(Account(1, 0))
+        assert c._accounts == Account(1, 0)
+        assert c.view_accounts() == (Account(1, 0),)
+        c.add_account(Account(2, 0))
+        assert c.accounts == [Account(1, 0), Account(2, 0)]
+        c.set_accounts([Account(3, 0)])
+        assert c._accounts == Account(3, 0)
+        c.remove_account(c._accounts)
+        assert c.accounts == []
+
+    def test_accounts_getter_leaves_customer_alone(self):
+        c = Customer("Bob", "hash", hash_password=False)
+        c.add_account(Account(1, 0))
+        accounts = c.accounts
+        assert accounts == [Account(1, 0)]
+        assert c._accounts == Account(1, 0)
+        accounts.append(Account(2, 0))
+        assert c.view_accounts() == (Account(1, 0),)
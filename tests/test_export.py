@@ -0,0 +1,146 @@
+import csv
+import json
+
+from bank_app import export, parser_json
+from bank_app.account import Account
+from bank_app.bank import Bank
+from bank_app.customer import Customer
+from bank_app.ledger import DEPOSIT, WITHDRAWAL, Ledger
+
+
+def get_customers():
+    bob = Customer("Bob", "hash", hash_password=False)
+    bob.accounts = [Account(1, 100), Account(2, 50.5)]
+    alice = Customer("Alice", "hash", hash_password=False)
+    alice.accounts = [Account(3, 10)]
+    return [bob, alice]
+
+
+def get_bank():
+    bank = Bank(get_customers(), save_on_exit=False)
+    ledger = Ledger()
+    ledger.append(1_000_000, 10000, 10000, DEPOSIT)
+    ledger.append(2_000_000, -2500, 7500, WITHDRAWAL)
+    ledger.append(3_000_000, 2500, 10000, DEPOSIT)
+    bank.find_account(1)[1]._ledger = ledger
+    return bank
+
+
+def read_csv(file_path):
+    with open(file_path, newline="") as file:
+        return list(csv.DictReader(file))
+
+
+def read_jsonl(file_path):
+    with open(file_path) as file:
+        return [json.loads(line) for line in file]
+
+
+class TestExport:
+    def test_iter_customers(self):
+        customers = get_customers()
+        assert list(export.iter_customers(customers)) == customers
+        assert [c.name for c in export.iter_customers(customers, ["alice", "Nobody"])] == ["alice"]
+
+    def test_iter_accounts(self):
+        accounts = export.iter_accounts(get_customers(), min_balance=20, max_balance="100.00")
+        assert [account.account_number for _, account in accounts] == [1, 2]
+        assert len(list(export.iter_accounts(get_customers()))) == 3
+
+    def test_iter_transactions(self):
+        bank = get_bank()
+        accounts = export.iter_accounts(bank.customers)
+        transactions = list(export.iter_transactions(accounts, start=2, end=3))
+        assert [(account.account_number, entry) for _, account, entry in transactions] == [
+            (1, (2.0, -2500, 7500, "withdrawal"))
+        ]
+
+    def test_iter_transactions_archive(self, tmp_path):
+        bank = get_bank()
+        bank.enable_ledger_archive(str(tmp_path / "ledger"))
+        assert bank.spill_ledgers(2.5) == 2
+        transactions = export.iter_transactions(
+            export.iter_accounts(bank.customers), archive=bank.ledger_archive
+        )
+        assert [entry[0] for _, _, entry in transactions] == [1.0, 2.0, 3.0]
+
+    def test_write_csv(self, tmp_path):
+        file_path = str(tmp_path / "customers.csv")
+        rows = export.customer_rows(get_customers())
+        assert export.write_rows(rows, file_path, export.CUSTOMER_FIELDS, chunk_size=1) == 2
+        assert read_csv(file_path) == [
+            {"name": "bob", "accounts": "2", "balance": "150.5"},
+            {"name": "alice", "accounts": "1", "balance": "10.0"},
+        ]
+
+    def test_write_jsonl(self, tmp_path):
+        file_path = str(tmp_path / "accounts.jsonl")
+        rows = export.account_rows(export.iter_accounts(get_customers()))
+        assert export.write_rows(rows, file_path, export.ACCOUNT_FIELDS, chunk_size=2) == 3
+        assert read_jsonl(file_path) == [
+            {"name": "bob", "account_number": 1, "balance": 100.0},
+            {"name": "bob", "account_number": 2, "balance": 50.5},
+            {"name": "alice", "account_number": 3, "balance": 10.0},
+        ]
+
+    def test_write_no_rows(self, tmp_path):
+        assert export.write_rows(iter(()), str(tmp_path / "empty.jsonl"), export.ACCOUNT_FIELDS) == 0
+        assert (tmp_path / "empty.jsonl").read_text() == ""
+        assert export.write_rows(iter(()), str(tmp_path / "empty.csv"), export.ACCOUNT_FIELDS) == 0
+        assert read_csv(str(tmp_path / "empty.csv")) == []
+
+    def test_stream_from_save_file(self, tmp_path):
+        save_path = str(tmp_path / "bank.json")
+        assert parser_json.save_customers(get_customers(), save_path)
+        accounts = export.iter_accounts(parser_json.iter_customers(save_path), max_balance=50.5)
+        file_path = str(tmp_path / "accounts.csv")
+        assert export.write_rows(export.account_rows(accounts), file_path, export.ACCOUNT_FIELDS) == 2
+        assert [row["account_number"] for row in read_csv(file_path)] == ["2", "3"]
+
+
+class TestBankExport:
+    def test_export_customers(self, tmp_path):
+        file_path = str(tmp_path / "customers.jsonl")
+        assert get_bank().export_customers(file_path, names=["bob", "Nobody"]) == 1
+        assert read_jsonl(file_path) == [{"name": "bob", "accounts": 2, "balance": 150.5}]
+
+    def test_export_accounts(self, tmp_path):
+        file_path = str(tmp_path / "accounts.csv")
+        assert get_bank().export_accounts(file_path, min_balance=50.5) == 2
+        assert [row["account_number"] for row in read_csv(file_path)] == ["1", "2"]
+
+    def test_export_statements(self, tmp_path):
+        bank = get_bank()
+        bank.enable_ledger_archive(str(tmp_path / "ledger"))
+        bank.spill_ledgers(2)
+        file_path = str(tmp_path / "statements.csv")
+        assert bank.export_statements(file_path, start=1, end=3) == 2
+        assert read_csv(file_path) == [
+            {
+                "name": "bob",
+                "account_number": "1",
+                "time": "1970-01-01T00:00:01+00:00",
+                "kind": "deposit",
+                "amount": "100.0",
+                "balance": "100.0",
+            },
+            {
+                "name": "bob",
+                "account_number": "1",
+                "time": "1970-01-01T00:00:02+00:00",
+                "kind": "withdrawal",
+                "amount": "-25.0",
+                "balance": "75.0",
+            },
+        ]
+
+    def test_export_statements_records_transactions(self, tmp_path):
+        bank = Bank(get_customers(), save_on_exit=False)
+        session = bank._start_session(bank.get_customer("Bob"))
+        assert bank.transfer(1, 3, 25, session)
+        file_path = str(tmp_path / "statements.jsonl")
+        assert bank.export_statements(file_path, names=["Alice"]) == 1
+        assert read_jsonl(file_path)[0]["kind"] == "transfer_in"
+
+    def test_export_os_error(self, tmp_path):
+        assert get_bank().export_accounts(str(tmp_path / "missing" / "accounts.csv")) is None
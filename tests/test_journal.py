@@ -0,0 +1,66 @@
+from bank_app.journal import Journal
+
+
+def test_append_records(tmp_path):
+    journal = Journal(tmp_path / "journal.log")
+    journal.append("balance", 1, 10.5)
+    journal.append("del_account", 1)
+    assert list(journal.records()) == [["balance", 1, 10.5], ["del_account", 1]]
+
+
+def test_append_group_sync(tmp_path):
+    journal = Journal(tmp_path / "journal.log", sync_every=3, sync_interval=60)
+    journal.append("del_account", 1)
+    journal.append("del_account", 2)
+    assert journal._pending == 2
+    journal.append("del_account", 3)
+    assert journal._pending == 0
+
+
+def test_records_reopen(tmp_path):
+    journal = Journal(tmp_path / "journal.log")
+    journal.append("del_account", 1)
+    journal.close()
+    assert list(Journal(tmp_path / "journal.log").records()) == [["del_account", 1]]
+
+
+def test_repair_torn_record(tmp_path):
+    with open(tmp_path / "journal.log", "w", encoding="utf-8") as file:
+        file.write('["del_account",1]\n["balance",2,1')
+    journal = Journal(tmp_path / "journal.log")
+    journal.append("del_account", 3)
+    assert list(journal.records()) == [["del_account", 1], ["del_account", 3]]
+
+
+def test_truncate(tmp_path):
+    journal = Journal(tmp_path / "journal.log")
+    journal.append("del_account", 1)
+    journal.truncate()
+    journal.append("del_account", 2)
+    assert list(journal.records()) == [["del_account", 2]]
+
+
+def test_close_twice(tmp_path):
+    journal = Journal(tmp_path / "journal.log")
+    journal.close()
+    journal.close()
+
+
+def test_append_reaches_os(tmp_path):
+    journal = Journal(tmp_path / "journal.log", sync_every=64, sync_interval=60)
+    journal.append("del_account", 1)
+    # Readable by another process before any fsync, so it survives the process dying
+    assert (tmp_path / "journal.log").read_text() == '["del_account",1]\n'
+    journal.close()
+
+
+def test_idle_records_synced_by_timer(tmp_path):
+    journal = Journal(tmp_path / "journal.log", sync_every=64, sync_interval=0.2)
+    journal.append("del_account", 1)
+    journal.append("del_account", 2)
+    timer = journal._timer
+    assert timer is not None
+    timer.join(5)
+    assert journal._pending == 0
+    assert journal._timer is None
+    journal.close()
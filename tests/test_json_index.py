@@ -0,0 +1,279 @@
+import json
+import os
+import shutil
+import threading
+
+from bank_app import parser_json
+from bank_app.account import Account
+from bank_app.bank import Bank
+from bank_app.customer import Customer
+from bank_app.json_index import JsonIndex, build_index, get_index_path
+from bank_app.storage import LazyJsonStorage, open_storage
+
+
+def get_customer_list():
+    bob = Customer("Bob", "123")
+    bob.accounts = [Account(1, 200), Account(2, 41515.24)]
+    alice = Customer("Alice", "123")
+    alice.accounts = [Account(3, 300), Account(4, 1.22)]
+    carol = Customer("Carol", "123")
+    return [bob, alice, carol]
+
+
+def save(tmp_path, customers=None):
+    file_path = str(tmp_path / "bank.json")
+    parser_json.save_customers(customers if customers else get_customer_list(), file_path)
+    return file_path
+
+
+def load_json(file_path):
+    """
+    :return: The customers of a save file, without its generation
+    """
+    with open(file_path, encoding="utf-8") as file:
+        return [item for item in json.load(file) if parser_json.GENERATION not in item]
+
+
+class TestJsonIndex:
+    def test_find(self, tmp_path):
+        index = JsonIndex(save(tmp_path))
+        assert len(index) == 3
+        assert index.find("alice")["accounts"][1] == {"account_number": 4, "balance": 1.22}
+        assert index.find("carol")["accounts"] == []
+        assert index.find("dave") is None
+        index.close()
+
+    def test_find_owner(self, tmp_path):
+        index = JsonIndex(save(tmp_path))
+        assert index.find_owner(2) == "bob"
+        assert index.find_owner(4) == "alice"
+        assert index.find_owner(0) is None
+        assert index.find_owner(5) is None
+        index.close()
+
+    def test_writes_sidecar(self, tmp_path):
+        file_path = save(tmp_path)
+        JsonIndex(file_path).close()
+        assert os.path.exists(get_index_path(file_path))
+
+    def test_reuses_sidecar(self, tmp_path):
+        file_path = save(tmp_path)
+        JsonIndex(file_path).close()
+        mtime = os.stat(get_index_path(file_path)).st_mtime_ns
+        JsonIndex(file_path).close()
+        assert os.stat(get_index_path(file_path)).st_mtime_ns == mtime
+
+    def test_rebuilds_stale_sidecar(self, tmp_path):
+        file_path = save(tmp_path)
+        JsonIndex(file_path).close()
+        save(tmp_path, get_customer_list()[:1])
+        index = JsonIndex(file_path)
+        assert len(index) == 1
+        assert index.find("alice") is None
+        index.close()
+
+    def test_non_ascii(self, tmp_path):
+        file_path = str(tmp_path / "bank.json")
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump(
+                [
+                    {"name": "Åsa", "password": "x", "accounts": [{"account_number": 1, "balance": 1}]},
+                    {"name": "Örjan", "password": "y", "accounts": []},
+                ],
+                file,
+                ensure_ascii=False,
+            )
+        index = JsonIndex(file_path)
+        assert index.find("örjan")["password"] == "y"
+        assert index.find_owner(1) == "åsa"
+        index.close()
+
+    def test_non_ascii_across_chunks(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("bank_app.json_index.DEFAULT_CHUNK_SIZE", 7)
+        customers = [Customer(f"Åsa{idx}Ö", "hash", hash_password=False) for idx in range(20)]
+        for idx, customer in enumerate(customers):
+            customer.add_account(Account(idx, idx))
+        index = JsonIndex(save(tmp_path, customers))
+        assert index.find("åsa13ö")["accounts"] == [{"account_number": 13, "balance": 13.0}]
+        assert index.find_owner(19) == "åsa19ö"
+        index.close()
+
+    def test_invalid_file(self, tmp_path):
+        file_path = tmp_path / "bank.json"
+        file_path.write_text('[{"name": "bob"', encoding="utf-8")
+        try:
+            build_index(str(file_path))
+        except OSError:
+            pass
+        else:
+            assert False, "Expected OSError"
+
+
+class TestLazyJsonStorage:
+    def test_open_storage(self, tmp_path):
+        storage = open_storage(save(tmp_path), lazy=True)
+        assert isinstance(storage, LazyJsonStorage)
+        storage.close()
+
+    def test_get_customer_with_deltas(self, tmp_path):
+        customers = get_customer_list()
+        file_path = save(tmp_path, customers)
+        customers[0].add_account(Account(5, 1))
+        dave = Customer("Dave", "123")
+        parser_json.save_delta([customers[0], dave], ["alice"], file_path)
+
+        storage = LazyJsonStorage(file_path)
+        assert [a.account_number for a in storage.get_customer("bob").accounts] == [1, 2, 5]
+        assert storage.get_customer("alice") is None
+        assert storage.get_customer("dave") is not None
+        assert storage.find_account_owner(5) == "bob"
+        assert storage.find_account_owner(3) is None
+        storage.close()
+
+    def test_compact_keeps_unloaded(self, tmp_path):
+        file_path = save(tmp_path)
+        storage = LazyJsonStorage(file_path)
+        bob = storage.get_customer("bob")
+        bob.accounts[0].balance_add(1)
+        dave = Customer("Dave", "123")
+        assert storage.save([bob, dave], removed=["carol"])
+
+        saved = {c["name"]: c for c in load_json(file_path)}
+        assert sorted(saved) == ["alice", "bob", "dave"]
+        assert saved["bob"]["accounts"][0]["balance"] == 201
+        assert saved["alice"]["accounts"][0]["balance"] == 300
+        assert storage.get_customer("dave") is not None
+        storage.close()
+
+    def test_compact_applies_deltas(self, tmp_path):
+        customers = get_customer_list()
+        file_path = save(tmp_path, customers)
+        storage = LazyJsonStorage(file_path, compact_every=1)
+        customers[1].accounts[0].balance_add(5)
+        assert storage.save(customers[1:2], incremental=True)
+        assert len(parser_json.get_delta_paths(file_path)) == 1
+        # Compacts, alice was only written to the delta segment
+        assert storage.save([], removed=["bob"], incremental=True)
+
+        assert parser_json.get_delta_paths(file_path) == []
+        saved = {c["name"]: c for c in load_json(file_path)}
+        assert sorted(saved) == ["alice", "carol"]
+        assert saved["alice"]["accounts"][0]["balance"] == 305
+        storage.close()
+
+    def test_compact_empty(self, tmp_path):
+        file_path = save(tmp_path, get_customer_list()[:1])
+        storage = LazyJsonStorage(file_path)
+        assert storage.save([], removed=["bob"])
+        assert load_json(file_path) == []
+        assert storage.get_customer("bob") is None
+        storage.close()
+
+
+class TestBankLazyJson:
+    def test_load_lazy(self, tmp_path):
+        file_path = save(tmp_path)
+        bank = Bank(save_on_exit=False)
+        assert bank.load_customers(file_path, lazy=True)
+        assert bank.customers == []
+        assert bank.login("Bob", "123")
+        assert [customer.name for customer in bank.customers] == ["bob"]
+        assert bank.find_account(3)[0].name == "alice"
+        assert bank.get_customer("Dave") is None
+        bank.storage.close()
+
+    def test_save_keeps_unloaded(self, tmp_path):
+        file_path = save(tmp_path)
+        storage = LazyJsonStorage(file_path)
+        bank = Bank(save_on_exit=False, storage=storage)
+        bank.load_customers()
+        session = bank.login("Bob", "123")
+        assert bank.transfer(1, 3, 50, session)
+        assert bank.save_customers(incremental=True)
+        assert bank.save_customers()
+        storage.close()
+
+        restored = Bank(save_on_exit=False)
+        restored.load_customers(file_path)
+        assert restored.get_account(1, session=restored.login("Bob", "123")).balance == 150
+        assert restored.get_account(3, session=restored.login("Alice", "123")).balance == 350
+        assert restored.has_customer("Carol")
+
+    def test_save_on_exit_keeps_unloaded(self, tmp_path):
+        file_path = save(tmp_path)
+        bank = Bank(save_on_exit=False)
+        assert bank.load_customers(file_path, lazy=True)
+        assert bank.get_customer("Bob")
+        bank._save_on_exit()
+        assert sorted(c["name"] for c in load_json(file_path)) == ["alice", "bob", "carol"]
+
+    def test_load_closes_replaced_storage(self, tmp_path, monkeypatch):
+        storage = LazyJsonStorage(save(tmp_path))
+        closed = []
+        monkeypatch.setattr(storage, "close", lambda: closed.append(storage))
+        bank = Bank(save_on_exit=False, storage=storage)
+        assert bank.load_customers()
+        assert closed == []
+        other_path = str(tmp_path / "other.json")
+        parser_json.save_customers(get_customer_list(), other_path)
+        assert bank.load_customers(other_path, lazy=True)
+        assert closed == [storage]
+        bank.storage.close()
+
+    def test_export_unloaded(self, tmp_path):
+        file_path = save(tmp_path)
+        storage = LazyJsonStorage(file_path)
+        bank = Bank(save_on_exit=False, storage=storage)
+        bank.load_customers()
+        assert bank.transfer(1, 3, 50, bank.login("Bob", "123"))
+        assert bank.remove_customer("Carol")
+        assert bank.add_customer("Dave", "123")
+        assert bank.save_customers(incremental=True)
+        assert bank.add_customer("Erin", "123")
+
+        export_path = str(tmp_path / "customers.jsonl")
+        assert bank.export_customers(export_path) == 4
+        with open(export_path, encoding="utf-8") as file:
+            rows = [json.loads(line) for line in file]
+        assert sorted((row["name"], row["balance"]) for row in rows) == [
+            ("alice", 351.22), ("bob", 41665.24), ("dave", 0), ("erin", 0)
+        ]
+        assert sorted(customer.name for customer in bank.customers) == ["alice", "bob", "dave", "erin"]
+        storage.close()
+
+    def test_export_during_save(self, tmp_path):
+        storage = LazyJsonStorage(save(tmp_path))
+        bank = Bank(save_on_exit=False, storage=storage, thread_safe=True)
+        bank.load_customers()
+        assert bank.get_customer("Bob")
+
+        customers = bank._export_customers(None)
+        exported = [next(customers).name]
+        # A full save closes the mapped file the export reads, so it waits for the export
+        saver = threading.Thread(target=bank.save_customers)
+        saver.start()
+        saver.join(0.2)
+        assert saver.is_alive()
+        exported += [customer.name for customer in customers]
+        saver.join()
+        assert sorted(exported) == ["alice", "bob", "carol"]
+        storage.close()
+
+    def test_deltas_after_copy(self, tmp_path):
+        (tmp_path / "data").mkdir()
+        file_path = save(tmp_path / "data")
+        bank = Bank(save_on_exit=False)
+        assert bank.load_customers(file_path, lazy=True)
+        assert bank.transfer(1, 3, 50, bank.login("Bob", "123"))
+        assert bank.save_customers(incremental=True)
+        bank.storage.close()
+
+        shutil.copytree(tmp_path / "data", tmp_path / "copy")
+        copied = Bank(save_on_exit=False)
+        assert copied.load_customers(str(tmp_path / "copy" / "bank.json"), lazy=True)
+        assert copied.find_account(3)[1].balance == 350
+        copied.storage.close()
+
+    def test_missing_file(self, tmp_path):
+        bank = Bank(save_on_exit=False)
+        assert bank.load_customers(str(tmp_path / "missing.json"), lazy=True) is False
@@ -0,0 +1,164 @@
+import sys
+import time
+
+from bank_app.account import Account
+from bank_app.bank import Bank
+from bank_app.customer import Customer
+from bank_app.ledger import DEPOSIT, ENTRY_SIZE, Ledger, LedgerArchive
+
+
+def get_ledger(count: int = 10) -> Ledger:
+    ledger = Ledger()
+    for idx in range(count):
+        ledger.append(idx * 1_000_000, 100, (idx + 1) * 100, DEPOSIT)
+    return ledger
+
+
+def get_bank():
+    bob = Customer("Bob", "hash", hash_password=False)
+    bob.accounts = [Account(1, 100)]
+    alice = Customer("Alice", "hash", hash_password=False)
+    alice.accounts = [Account(2, 0)]
+    bank = Bank([bob, alice], save_on_exit=False)
+    return bank, bank._start_session(bob)
+
+
+class TestLedger:
+    def test_entries(self):
+        entries = list(get_ledger(3).entries())
+        assert entries == [
+            (0.0, 100, 100, "deposit"),
+            (1.0, 100, 200, "deposit"),
+            (2.0, 100, 300, "deposit"),
+        ]
+
+    def test_entries_range(self):
+        ledger = get_ledger()
+        assert [entry[0] for entry in ledger.entries(3, 6)] == [3.0, 4.0, 5.0]
+        assert [entry[0] for entry in ledger.entries(start=8)] == [8.0, 9.0]
+        assert [entry[0] for entry in ledger.entries(end=1.5)] == [0.0, 1.0]
+        assert list(ledger.entries(20, 30)) == []
+
+    def test_take_before(self):
+        ledger = get_ledger()
+        times, amounts, balances, kinds = ledger.take_before(4)
+        assert list(times) == [0, 1_000_000, 2_000_000, 3_000_000]
+        assert list(balances) == [100, 200, 300, 400]
+        assert len(ledger) == 6
+        assert next(ledger.entries())[0] == 4.0
+
+    def test_clock_set_back(self):
+        ledger = get_ledger(3)
+        ledger.append(500_000, 100, 400, DEPOSIT)
+        assert [entry[0] for entry in ledger.entries()] == [0.0, 1.0, 2.0, 2.0]
+        assert [entry[0] for entry in ledger.entries(start=2)] == [2.0, 2.0]
+        ledger.take_before(3)
+        ledger.append(1_000_000, 100, 500, DEPOSIT)
+        assert next(ledger.entries())[0] == 2.0
+
+    def test_compact(self):
+        ledger = get_ledger(100_000)
+        size = sum(
+            sys.getsizeof(column)
+            for column in (ledger.times, ledger.amounts, ledger.balances, ledger.kinds)
+        )
+        assert size / len(ledger) < ENTRY_SIZE * 1.2
+
+
+class TestAccountLedger:
+    def test_balance_changes_are_recorded(self):
+        account = Account(1, 10)
+        before = time.time()
+        account.balance_add(5)
+        account.balance_sub(2.5)
+        assert not account.balance_sub(100)
+        entries = list(account.ledger.entries())
+        assert [entry[1:] for entry in entries] == [
+            (500, 1500, "deposit"),
+            (-250, 1250, "withdrawal"),
+        ]
+        assert before <= entries[0][0] <= entries[1][0] <= time.time()
+
+    def test_no_ledger_until_used(self):
+        assert Account(1, 10)._ledger is None
+
+
+class TestLedgerArchive:
+    def test_append_entries(self, tmp_path):
+        archive = LedgerArchive(str(tmp_path / "ledger"))
+        ledger = get_ledger()
+        assert archive.append(1, ledger.take_before(5)) == 5
+        assert archive.append(1, ledger.take_before(5)) == 0
+        assert archive.append(1, ledger.take_before(8)) == 3
+        assert [entry[0] for entry in archive.entries(1)] == [0, 1, 2, 3, 4, 5, 6, 7]
+        assert [entry[0] for entry in archive.entries(1, 4, 6)] == [4, 5]
+        assert list(archive.entries(2)) == []
+        archive.close()
+
+    def test_reopen(self, tmp_path):
+        file_path = str(tmp_path / "ledger")
+        archive = LedgerArchive(file_path)
+        archive.append(1, get_ledger(3).take_before(10))
+        archive.append(2, get_ledger(2).take_before(10))
+        archive.close()
+
+        archive = LedgerArchive(file_path)
+        assert 1 in archive and 2 in archive
+        assert list(archive.entries(2)) == list(get_ledger(2).entries())
+        archive.close()
+
+    def test_torn_segment(self, tmp_path):
+        file_path = tmp_path / "ledger"
+        archive = LedgerArchive(str(file_path))
+        archive.append(1, get_ledger(3).take_before(10))
+        archive.append(2, get_ledger(3).take_before(10))
+        archive.close()
+        file_path.write_bytes(file_path.read_bytes()[:-10])
+
+        archive = LedgerArchive(str(file_path))
+        assert 1 in archive
+        assert 2 not in archive
+        archive.append(3, get_ledger(1).take_before(10))
+        assert len(list(archive.entries(3))) == 1
+        archive.close()
+
+
+class TestBankLedger:
+    def test_statement(self):
+        bank, session = get_bank()
+        assert bank.deposit(1, 10, session)
+        assert bank.transfer(1, 2, 50, session)
+        statement = bank.statement(1, session=session)
+        assert [entry[1:] for entry in statement] == [
+            (1000, 11000, "deposit"),
+            (-5000, 6000, "transfer_out"),
+        ]
+        entry = next(bank.find_account(2)[1].ledger.entries())
+        assert entry[1:] == (5000, 5000, "transfer_in")
+
+    def test_statement_not_owned(self):
+        bank, session = get_bank()
+        assert bank.statement(2, session=session) is None
+
+    def test_spill(self, tmp_path):
+        bank, session = get_bank()
+        for _ in range(3):
+            bank.deposit(1, 1, session)
+        bank.enable_ledger_archive(str(tmp_path / "ledger"))
+        assert bank.spill_ledgers(time.time() + 1) == 3
+        assert len(bank.find_account(1)[1].ledger) == 0
+        bank.deposit(1, 1, session)
+
+        statement = bank.statement(1, session=session)
+        assert [entry[2] for entry in statement] == [10100, 10200, 10300, 10400]
+        assert len(bank.statement(1, start=statement[3][0], session=session)) == 1
+
+    def test_ledger_moves_with_columnar(self):
+        bank, session = get_bank()
+        bank.deposit(1, 1, session)
+        try:
+            bank.enable_columnar()
+        except ImportError:
+            return
+        assert len(bank.find_account(1)[1].ledger) == 1
+        assert next(bank.find_account(1)[1].ledger.entries())[3] == "deposit"
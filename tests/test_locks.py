@@ -0,0 +1,102 @@
+import threading
+
+from bank_app.locks import NullRWLock, RWLock
+
+
+def test_read_shared():
+    lock = RWLock()
+    entered = threading.Barrier(2, timeout=5)
+
+    def reader():
+        with lock.read():
+            entered.wait()
+
+    threads = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_write_exclusive():
+    lock = RWLock()
+    events = []
+    lock.acquire_write()
+
+    def reader():
+        with lock.read():
+            events.append("read")
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    thread.join(0.05)
+    events.append("write")
+    lock.release_write()
+    thread.join()
+    assert events == ["write", "read"]
+
+
+def test_write_waits_for_readers():
+    lock = RWLock()
+    events = []
+    lock.acquire_read()
+
+    def writer():
+        with lock.write():
+            events.append("write")
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    thread.join(0.05)
+    events.append("read")
+    lock.release_read()
+    thread.join()
+    assert events == ["read", "write"]
+
+
+def test_reentrant():
+    lock = RWLock()
+    with lock.write():
+        with lock.write():
+            with lock.read():
+                pass
+    with lock.read():
+        with lock.read():
+            pass
+    with lock.write():
+        pass
+
+
+def test_upgrade():
+    lock = RWLock()
+    events = []
+    reading = []
+    entered = threading.Barrier(2, timeout=5)
+
+    def reader(name):
+        with lock.read():
+            entered.wait()
+            with lock.upgrade():
+                events.append(name)
+            # Back to reading, so no writer can get in
+            reading.append(lock._readers > 0 and lock._writer is None)
+
+    threads = [threading.Thread(target=reader, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(events) == ["a", "b"]
+    assert reading == [True, True]
+    with lock.write():
+        with lock.upgrade():
+            pass
+
+
+def test_null_lock():
+    lock = NullRWLock()
+    with lock.read():
+        with lock.write():
+            pass
+        with lock.upgrade():
+            pass
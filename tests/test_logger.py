@@ -1,4 +1,6 @@
+import asyncio
 import logging
+import logging.handlers
 import os.path
 
 import pytest
@@ -12,6 +14,40 @@ def test_get_logger(tmp_path):
     assert isinstance(logger, logging.Logger)
 
 
+def test_get_logger_queue(tmp_path):
+    logger = get_logger("LOGGER.QUEUE", tmp_path)
+    logger = get_logger("LOGGER.QUEUE", tmp_path)
+    handlers = [h for h in logger.handlers if isinstance(h, logging.handlers.QueueHandler)]
+    assert len(handlers) == 1
+    stop_logger("LOGGER.QUEUE")
+    assert not any(isinstance(h, logging.handlers.QueueHandler) for h in logger.handlers)
+
+
+def test_get_logger_append(tmp_path):
+    get_logger("LOGGER.APPEND", tmp_path).warning("first")
+    get_logger("LOGGER.APPEND", tmp_path).warning("second")
+    stop_logger("LOGGER.APPEND")
+    text = (tmp_path / "LOGGER_APPEND.log").read_text()
+    assert "first" in text and "second" in text
+
+
+def test_get_logger_rotate_size(tmp_path):
+    logger = get_logger("LOGGER.ROTATE", tmp_path, max_bytes=100, backup_count=2)
+    for i in range(20):
+        logger.warning(f"message {i}")
+    stop_logger("LOGGER.ROTATE")
+    assert os.path.exists(tmp_path / "LOGGER_ROTATE.log.1")
+    assert os.path.exists(tmp_path / "LOGGER_ROTATE.log.2")
+    assert not os.path.exists(tmp_path / "LOGGER_ROTATE.log.3")
+
+
+def test_get_logger_rotate_time(tmp_path):
+    logger = get_logger("LOGGER.TIMED", tmp_path, when="midnight")
+    logger.warning("timed")
+    stop_logger("LOGGER.TIMED")
+    assert "timed" in (tmp_path / "LOGGER_TIMED.log").read_text()
+
+
 def test_get_logger_file_exists_error(tmp_path):
 
     open(tmp_path / "logs", "a").close()
@@ -109,3 +145,80 @@ def test_log_exc_error_msg_raise(tmp_path, caplog):
     assert f"{ValueError().__class__.__name__}: {ValueError('test')}" in caplog.text
 
 
+def test_log_exc_async():
+    @log_exc(logger=logging.getLogger())
+    async def f():
+        return True
+
+    assert asyncio.run(f()) is True
+
+
+def test_log_exc_async_error_catch():
+    @log_exc(exc=ValueError, return_value="foo", logger=logging.getLogger())
+    async def f():
+        raise ValueError("test")
+
+    assert asyncio.run(f()) == "foo"
+
+
+def test_log_exc_async_wrong_error():
+    @log_exc(exc=AttributeError, logger=logging.getLogger())
+    async def f():
+        raise ValueError("test")
+
+    with pytest.raises(ValueError):
+        asyncio.run(f())
+
+
+def test_log_exc_info_msg_disabled(caplog):
+    logger = logging.getLogger("LOGGER.DISABLED")
+    logger.setLevel(logging.WARNING)
+
+    @log_exc(logger=logger)
+    def f():
+        return True
+
+    assert f() is True
+    assert "Calling" not in caplog.text
+
+
+def test_log_exc_sample(caplog):
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+
+    @log_exc(logger=logger, sample=0)
+    def f():
+        return True
+
+    @log_exc(logger=logger, sample=1)
+    def g():
+        return True
+
+    assert f() is True
+    assert g() is True
+    assert f"Calling {f.__qualname__}" not in caplog.text
+    assert f"Calling {g.__qualname__}" in caplog.text
+
+
+def test_set_call_sample_rate(caplog):
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+
+    @log_exc(logger=logger)
+    def f():
+        return True
+
+    set_call_sample_rate(0)
+    try:
+        assert f() is True
+    finally:
+        set_call_sample_rate(1)
+    assert f"Calling {f.__qualname__}" not in caplog.text
+
+
+def test_log_exc_no_logger():
+    @log_exc(exc=ValueError, logger=None, return_value="foo")
+    def f():
+        raise ValueError("test")
+
+    assert f() == "foo"
@@ -0,0 +1,142 @@
+import asyncio
+import math
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from bank_app.logger import log_exc
+from bank_app.metrics import ENV_ENABLED, METRICS, Metrics
+
+
+class TestMetrics:
+    def test_observe(self):
+        metrics = Metrics(buckets=(0.1, 1))
+        metrics.observe("op", 0.05)
+        metrics.observe("op", 0.5, error=True)
+        metrics.observe("op", 2)
+        assert metrics.snapshot() == {
+            "op": {
+                "calls": 3,
+                "errors": 1,
+                "seconds": 2.55,
+                "buckets": {0.1: 1, 1: 1, math.inf: 1},
+            }
+        }
+
+    def test_observe_bucket_bound(self):
+        metrics = Metrics(buckets=(0.1, 1))
+        metrics.observe("op", 0.1)
+        assert metrics.snapshot()["op"]["buckets"] == {0.1: 1, 1: 0, math.inf: 0}
+
+    def test_snapshot_threads(self):
+        metrics = Metrics()
+
+        def work():
+            for _ in range(100):
+                metrics.observe("op", 0.001)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert metrics.snapshot()["op"]["calls"] == 400
+
+    def test_reset(self):
+        metrics = Metrics()
+        metrics.observe("op", 0.001)
+        metrics.reset()
+        assert metrics.snapshot() == {}
+        metrics.observe("op", 0.001)
+        assert metrics.snapshot()["op"]["calls"] == 1
+
+    def test_to_prometheus(self):
+        metrics = Metrics(buckets=(0.1,))
+        metrics.observe("Bank.deposit", 0.05)
+        metrics.observe("Bank.deposit", 0.5, error=True)
+        text = metrics.to_prometheus()
+        assert 'bankapp_calls_total{operation="Bank.deposit"} 2' in text
+        assert 'bankapp_errors_total{operation="Bank.deposit"} 1' in text
+        assert 'bankapp_call_duration_seconds_bucket{operation="Bank.deposit",le="0.1"} 1' in text
+        assert 'bankapp_call_duration_seconds_bucket{operation="Bank.deposit",le="+Inf"} 2' in text
+        assert 'bankapp_call_duration_seconds_count{operation="Bank.deposit"} 2' in text
+        assert "# TYPE bankapp_call_duration_seconds histogram" in text
+
+    def test_dump(self, tmp_path):
+        metrics = Metrics()
+        metrics.observe("op", 0.001)
+        metrics.dump(tmp_path / "metrics.prom")
+        assert (tmp_path / "metrics.prom").read_text() == metrics.to_prometheus()
+
+
+class TestLogExcMetrics:
+    def test_log_exc(self):
+        metrics = Metrics()
+
+        @log_exc(exc=ValueError, logger=None, metrics=metrics)
+        def f(fail):
+            if fail:
+                raise ValueError("test")
+            return True
+
+        assert f(False)
+        assert f(True) is None
+        values = metrics.snapshot()[f.__qualname__]
+        assert values["calls"] == 2
+        assert values["errors"] == 1
+
+    def test_log_exc_unexpected(self):
+        metrics = Metrics()
+
+        @log_exc(exc=TypeError, logger=None, metrics=metrics)
+        def f():
+            raise ValueError("test")
+
+        with pytest.raises(ValueError):
+            f()
+        assert metrics.snapshot()[f.__qualname__]["errors"] == 1
+
+    def test_log_exc_disabled(self):
+        metrics = Metrics()
+        metrics.enabled = False
+
+        @log_exc(logger=None, metrics=metrics)
+        def f():
+            return True
+
+        assert f()
+        assert metrics.snapshot() == {}
+
+    def test_global_metrics_opt_in(self):
+        def enabled(value):
+            env = {**os.environ, ENV_ENABLED: value}
+            code = "from bank_app.metrics import METRICS; print(METRICS.enabled)"
+            return subprocess.run(
+                [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+            ).stdout.strip()
+
+        assert enabled("") == enabled("0") == "False"
+        assert enabled("1") == "True"
+
+    def test_log_exc_global_metrics_disabled(self, monkeypatch):
+        monkeypatch.setattr(METRICS, "enabled", False)
+
+        @log_exc(logger=None)
+        def f():
+            return True
+
+        assert f()
+        assert f.__qualname__ not in METRICS.snapshot()
+
+    def test_log_exc_async(self):
+        metrics = Metrics()
+
+        @log_exc(exc=ValueError, logger=None, metrics=metrics)
+        async def f():
+            raise ValueError("test")
+
+        assert asyncio.run(f()) is None
+        assert metrics.snapshot()[f.__qualname__]["errors"] == 1
@@ -0,0 +1,91 @@
+import os
+
+from bank_app import parser_binary, parser_json
+from bank_app.account import Account
+from bank_app.bank import Bank
+from bank_app.customer import Customer
+from bank_app.parser_binary import HEADER, BinaryStorage
+from bank_app.storage import convert, open_storage
+
+
+def get_customer_list():
+    customers = []
+    bob = Customer("Bob", "123")
+    bob.accounts = [Account(1, 200), Account(2, 41515.24)]
+    customers.append(bob)
+    alice = Customer("Alice", "123")
+    alice.accounts = [Account(3, 300), Account(4, -1.22)]
+    customers.append(alice)
+    customers.append(Customer("Åsa", "123"))
+    return customers
+
+
+def test_save_load(tmp_path):
+    customers = get_customer_list()
+    assert parser_binary.save_customers(customers, tmp_path / "bank.bin")
+    assert not any(customer.dirty for customer in customers)
+    loaded = parser_binary.load_customers(tmp_path / "bank.bin")
+    assert [c.to_json() for c in loaded] == [c.to_json() for c in customers]
+    assert not any(customer.dirty for customer in loaded)
+    assert loaded[0].check_password("123")
+
+
+def test_save_empty(tmp_path):
+    assert parser_binary.save_customers([], tmp_path / "bank.bin") is False
+
+
+def test_smaller_than_json(tmp_path):
+    customers = get_customer_list()
+    parser_json.save_customers(customers, tmp_path / "bank.json")
+    parser_binary.save_customers(customers, tmp_path / "bank.bin")
+    assert os.path.getsize(tmp_path / "bank.bin") < os.path.getsize(tmp_path / "bank.json") / 2
+
+
+def test_load_missing_file(tmp_path):
+    assert parser_binary.load_customers(tmp_path / "missing.bin") is None
+
+
+def test_load_not_a_snapshot(tmp_path):
+    parser_json.save_customers(get_customer_list(), tmp_path / "bank.bin")
+    assert parser_binary.load_customers(tmp_path / "bank.bin") is None
+
+
+def test_load_corrupt(tmp_path):
+    file_path = tmp_path / "bank.bin"
+    parser_binary.save_customers(get_customer_list(), file_path)
+    data = bytearray(file_path.read_bytes())
+    data[HEADER.size + 10] ^= 0xFF
+    file_path.write_bytes(bytes(data))
+    assert parser_binary.load_customers(file_path) is None
+
+
+def test_load_truncated(tmp_path):
+    file_path = tmp_path / "bank.bin"
+    parser_binary.save_customers(get_customer_list(), file_path)
+    file_path.write_bytes(file_path.read_bytes()[:-8])
+    assert parser_binary.load_customers(file_path) is None
+
+
+def test_open_storage_by_extension(tmp_path):
+    assert isinstance(open_storage(str(tmp_path / "bank.bin")), BinaryStorage)
+
+
+def test_bank_by_extension(tmp_path):
+    file_path = str(tmp_path / "bank.bin")
+    assert Bank(get_customer_list(), save_on_exit=False).save_customers(file_path)
+    bank = Bank(save_on_exit=False)
+    assert bank.load_customers(file_path)
+    assert bank.find_account(4)[1].balance == -1.22
+
+
+def test_convert(tmp_path):
+    customers = get_customer_list()
+    parser_json.save_customers(customers, tmp_path / "bank.json")
+    assert convert(str(tmp_path / "bank.json"), str(tmp_path / "bank.bin"))
+    assert convert(str(tmp_path / "bank.bin"), str(tmp_path / "copy.json"))
+    loaded = parser_json.load_customers(tmp_path / "copy.json")
+    assert [c.to_json() for c in loaded] == [c.to_json() for c in customers]
+
+
+def test_convert_missing_source(tmp_path):
+    assert convert(str(tmp_path / "missing.json"), str(tmp_path / "bank.bin")) is False
@@ -1,3 +1,10 @@
+import io
+import json
+import os
+import shutil
+from json import JSONDecodeError
+
+import pytest
 from passlib.hash import bcrypt
 
 from bank_app import parser_json
@@ -37,6 +44,88 @@ def test_load_customers_os_error(tmp_path):
     assert parser_json.load_customers(isdir) is None
 
 
+def test_load_customers_stream():
+    file_path = "tests/data/test_saved_customers_load.json"
+    customers = parser_json.load_customers(file_path, stream=True)
+    expected = parser_json.load_customers(file_path)
+    assert [c.to_json() for c in customers] == [c.to_json() for c in expected]
+
+
+def test_load_customers_stream_empty_file(tmp_path):
+    open(tmp_path / "empty.json", "a").close()
+    assert parser_json.load_customers(tmp_path / "empty.json", stream=True) is None
+
+
+def test_load_customers_stream_truncated_file(tmp_path):
+    with open("tests/data/test_saved_customers_load.json", encoding="utf-8") as file:
+        json_str = file.read()
+    with open(tmp_path / "truncated.json", "w", encoding="utf-8") as file:
+        file.write(json_str[: len(json_str) // 2])
+    assert parser_json.load_customers(tmp_path / "truncated.json", stream=True) is None
+
+
+def test_iter_customers_malformed_item_fails_early(tmp_path):
+    file_path = tmp_path / "malformed.json"
+    file_path.write_bytes(b'[{"name" "bob"}, ' + b'{"name": "alice"}, ' * 100_000 + b"{}]")
+    reads = []
+
+    class CountingFile(io.FileIO):
+        def read(self, size=-1):
+            reads.append(size)
+            return super().read(size)
+
+    with CountingFile(file_path) as file:
+        with pytest.raises(JSONDecodeError, match="Expecting ':' delimiter at byte 9"):
+            list(parser_json._iter_array(file, 1024))
+    assert len(reads) == 1
+
+
+def test_iter_customers_item_too_large(tmp_path):
+    file_path = tmp_path / "unterminated.json"
+    file_path.write_bytes(b'[{"name": "bob' + b"x" * 100_000 + b'"}]')
+    with open(file_path, "rb") as file:
+        with pytest.raises(JSONDecodeError, match="Unterminated string at byte 10"):
+            list(parser_json._iter_array(file, 1024, max_item_size=4096))
+
+
+def test_iter_array_spans(tmp_path):
+    data = '[{"name": "Åsa"} , {"name": "Örjan", "n": 12}]'.encode("utf-8")
+    file_path = tmp_path / "spans.json"
+    file_path.write_bytes(data)
+    for chunk_size in range(1, len(data) + 1):
+        with open(file_path, "rb") as file:
+            spans = list(parser_json._iter_array(file, chunk_size, spans=True))
+        assert [json.loads(data[start:end]) for _, start, end in spans] == [item for item, _, _ in spans]
+        assert len(spans) == 2
+
+
+def test_iter_customers_small_chunks():
+    file_path = "tests/data/test_saved_customers_load.json"
+    customers = list(parser_json.iter_customers(file_path, chunk_size=7))
+    expected = parser_json.load_customers(file_path)
+    assert [c.to_json() for c in customers] == [c.to_json() for c in expected]
+
+
+def test_iter_customers_empty_list(tmp_path):
+    with open(tmp_path / "empty_list.json", "w", encoding="utf-8") as file:
+        file.write(" [ ] ")
+    assert list(parser_json.iter_customers(tmp_path / "empty_list.json")) == []
+
+
+def test_iter_customers_progress():
+    calls = []
+    customers = list(
+        parser_json.iter_customers(
+            "tests/data/test_saved_customers_load.json",
+            chunk_size=16,
+            progress=lambda count, bytes_read: calls.append((count, bytes_read)),
+        )
+    )
+    assert [count for count, _ in calls] == [1, 2]
+    assert calls[0][1] <= calls[1][1]
+    assert len(customers) == 2
+
+
 def test_create_customer():
     name, password = "Bob", "123"
     acc1_num, acc1_balance = 1, 200
@@ -73,6 +162,130 @@ def test_save_customers_no_accounts(tmp_path):
     )
 
 
+def test_save_customers_marks_clean(tmp_path):
+    customers = get_customer_list()
+    assert parser_json.save_customers(customers, tmp_path / "test_saved_customers.json")
+    assert not any(customer.dirty for customer in customers)
+
+
+def test_save_customers_atomic(tmp_path, monkeypatch):
+    file_path = tmp_path / "test_saved_customers.json"
+    customers = get_customer_list()
+    assert parser_json.save_customers(customers, file_path)
+    with open(file_path, encoding="utf-8") as file:
+        saved = file.read()
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(parser_json.os, "replace", fail)
+    customers[0].accounts[0].balance_add(1)
+    assert parser_json.save_customers(customers, file_path) is False
+    with open(file_path, encoding="utf-8") as file:
+        assert file.read() == saved
+    assert os.listdir(tmp_path) == ["test_saved_customers.json"]
+
+
+def test_save_delta(tmp_path):
+    file_path = tmp_path / "test_saved_customers.json"
+    customers = get_customer_list()
+    assert parser_json.save_customers(customers, file_path)
+    customers[1].accounts[0].balance_add(5)
+    assert parser_json.save_delta(customers, [], file_path)
+    assert len(parser_json.get_delta_paths(file_path)) == 1
+    assert not customers[1].dirty
+
+    with open(parser_json.get_delta_paths(file_path)[0], encoding="utf-8") as file:
+        delta = json.load(file)
+    assert [c["name"] for c in delta["customers"]] == ["alice"]
+
+
+def test_save_delta_no_changes(tmp_path):
+    file_path = tmp_path / "test_saved_customers.json"
+    customers = get_customer_list()
+    assert parser_json.save_customers(customers, file_path)
+    assert parser_json.save_delta(customers, [], file_path)
+    assert parser_json.get_delta_paths(file_path) == []
+
+
+def test_save_delta_no_base(tmp_path):
+    customers = get_customer_list()
+    assert parser_json.save_delta(customers, [], tmp_path / "missing.json") is False
+
+
+def test_load_customers_deltas(tmp_path):
+    file_path = tmp_path / "test_saved_customers.json"
+    customers = get_customer_list()
+    assert parser_json.save_customers(customers, file_path)
+    customers[0].accounts[1].balance_sub(15.24)
+    assert parser_json.save_delta(customers, [], file_path)
+    carol = Customer("Carol", "hash", hash_password=False)
+    assert parser_json.save_delta(customers[:1] + [carol], ["alice"], file_path)
+
+    loaded = parser_json.load_customers(file_path)
+    assert [c.to_json() for c in loaded] == [
+        c.to_json() for c in [customers[0], carol]
+    ]
+
+
+def test_load_customers_stale_deltas(tmp_path):
+    file_path = tmp_path / "test_saved_customers.json"
+    customers = get_customer_list()
+    assert parser_json.save_customers(customers, file_path)
+    customers[0].accounts[0].balance_add(1)
+    assert parser_json.save_delta(customers, [], file_path)
+    stale_delta = parser_json.get_delta_paths(file_path)[0]
+    with open(stale_delta, encoding="utf-8") as file:
+        stale = file.read()
+
+    customers[0].accounts[0].balance_add(1)
+    assert parser_json.save_customers(customers, file_path)
+    assert parser_json.get_delta_paths(file_path) == []
+
+    # A crash after replacing the base but before removing the old segments
+    with open(stale_delta, "w", encoding="utf-8") as file:
+        file.write(stale)
+    loaded = parser_json.load_customers(file_path)
+    assert loaded[0].accounts[0].balance == 202
+
+
+def test_load_customers_deltas_after_copy(tmp_path):
+    file_path = tmp_path / "data" / "bank.json"
+    file_path.parent.mkdir()
+    customers = get_customer_list()
+    assert parser_json.save_customers(customers, file_path)
+    customers[0].accounts[0].balance_add(1)
+    assert parser_json.save_delta(customers, [], file_path)
+
+    shutil.copytree(tmp_path / "data", tmp_path / "copy")
+    for stream in (False, True):
+        loaded = parser_json.load_customers(tmp_path / "copy" / "bank.json", stream=stream)
+        assert loaded[0].accounts[0].balance == 201
+
+
+def test_load_customers_foreign_delta(tmp_path):
+    customers = get_customer_list()
+    for name in ("a.json", "b.json"):
+        assert parser_json.save_customers(customers, tmp_path / name)
+    customers[0].accounts[0].balance_add(1)
+    assert parser_json.save_delta(customers, [], tmp_path / "a.json")
+    os.rename(parser_json.get_delta_paths(tmp_path / "a.json")[0], tmp_path / "b.json.delta-000001")
+
+    with pytest.raises(ValueError, match="not written against"):
+        parser_json.load_customers(tmp_path / "b.json")
+
+
+def test_load_customers_delta_before_generations(tmp_path):
+    file_path = tmp_path / "test_saved_customers.json"
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump([customer.to_json() for customer in get_customer_list()], file)
+    assert parser_json.read_generation(file_path) == parser_json.NO_GENERATION
+    carol = Customer("Carol", "hash", hash_password=False)
+    with open(f"{file_path}.delta-000001", "w", encoding="utf-8") as file:
+        json.dump({"base": parser_json._file_stamp(file_path), "removed": [], "customers": [carol.to_json()]}, file)
+    assert [c.name for c in parser_json.load_customers(file_path)] == ["bob", "alice", "carol"]
+
+
 def test_save_customers_os_error(tmp_path):
     isdir = tmp_path / "isdir"
     isdir.mkdir()
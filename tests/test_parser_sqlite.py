@@ -0,0 +1,192 @@
+import pytest
+
+from bank_app.account import Account
+from bank_app.bank import Bank
+from bank_app.customer import Customer
+from bank_app.parser_json import save_customers
+from bank_app.parser_sqlite import SqliteStorage
+from bank_app.storage import JsonStorage, open_storage
+
+
+def get_customer_list():
+    bob = Customer("Bob", "123")
+    bob.accounts = [Account(1, 200), Account(2, 41515.24)]
+    alice = Customer("Alice", "123")
+    alice.accounts = [Account(3, 300), Account(4, 1.22)]
+    return [bob, alice]
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "bank.db"))
+    yield storage
+    storage.close()
+
+
+def test_open_storage_by_extension(tmp_path):
+    json_storage = open_storage(str(tmp_path / "bank.json"))
+    assert isinstance(json_storage, JsonStorage)
+    sqlite_storage = open_storage(str(tmp_path / "bank.sqlite3"))
+    assert isinstance(sqlite_storage, SqliteStorage)
+    sqlite_storage.close()
+
+
+def test_json_storage_round_trip(tmp_path):
+    storage = JsonStorage(str(tmp_path / "bank.json"))
+    customers = get_customer_list()
+    assert storage.save(customers)
+    assert [c.to_json() for c in storage.load()] == [c.to_json() for c in customers]
+
+
+def test_wal_mode(storage):
+    assert storage._connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_save_load(storage):
+    customers = get_customer_list()
+    assert storage.save(customers)
+    assert not any(customer.dirty for customer in customers)
+    loaded = storage.load()
+    assert [c.to_json() for c in loaded] == [
+        c.to_json() for c in sorted(customers, key=lambda c: c.name)
+    ]
+
+
+def test_get_customer(storage):
+    storage.save(get_customer_list())
+    bob = storage.get_customer("bob")
+    assert [account.account_number for account in bob.accounts] == [1, 2]
+    assert bob.accounts[1].balance == 41515.24
+    assert bob.check_password("123")
+    assert not bob.dirty
+    assert storage.get_customer("carol") is None
+
+
+def test_find_account_owner(storage):
+    storage.save(get_customer_list())
+    assert storage.find_account_owner(3) == "alice"
+    assert storage.find_account_owner(5) is None
+
+
+def test_save_incremental_keeps_unchanged(storage):
+    customers = get_customer_list()
+    storage.save(customers)
+    customers[0].accounts[0].balance_add(1)
+    # Customers that are not passed are kept as they were
+    assert storage.save(customers[:1], incremental=True)
+    assert storage.get_customer("bob").accounts[0].balance == 201
+    assert storage.get_customer("alice").accounts[0].balance == 300
+
+
+def test_save_removed(storage):
+    customers = get_customer_list()
+    storage.save(customers)
+    assert storage.save([], removed=["alice"])
+    assert storage.get_customer("alice") is None
+    assert storage.find_account_owner(3) is None
+
+
+def test_save_moved_account(storage):
+    bob, alice = get_customer_list()
+    storage.save([bob, alice])
+    account = bob.view_accounts()[-1]
+    bob.remove_account(account)
+    alice.add_account(account)
+    storage.save([bob, alice])
+    assert storage.find_account_owner(2) == "alice"
+    assert [a.account_number for a in storage.get_customer("bob").accounts] == [1]
+
+
+def test_bank_lazy_load(tmp_path):
+    file_path = str(tmp_path / "bank.db")
+    Bank(get_customer_list(), save_on_exit=False).save_customers(file_path)
+
+    bank = Bank(save_on_exit=False)
+    assert bank.load_customers(file_path)
+    assert bank.customers == []
+    assert bank.login("Bob", "123")
+    assert [customer.name for customer in bank.customers] == ["bob"]
+    assert bank.find_account(4)[0].name == "alice"
+    assert not bank.has_customer("Carol")
+    bank.storage.close()
+
+
+def test_bank_save_to_storage(tmp_path):
+    file_path = str(tmp_path / "bank.db")
+    Bank(get_customer_list(), save_on_exit=False).save_customers(file_path)
+
+    storage = SqliteStorage(file_path)
+    bank = Bank(save_on_exit=False, storage=storage)
+    bank.load_customers()
+    session = bank.login("Bob", "123")
+    assert bank.transfer(1, 3, 50, session)
+    assert bank.remove_customer("Bob") is True
+    assert bank.add_customer("Carol", "456")
+    assert bank.save_customers(incremental=True)
+
+    assert storage.get_customer("bob") is None
+    assert storage.get_customer("alice").accounts[0].balance == 350
+    assert storage.get_customer("carol").check_password("456")
+    storage.close()
+
+
+def test_bank_removed_customer_not_reloaded(tmp_path):
+    file_path = str(tmp_path / "bank.db")
+    Bank(get_customer_list(), save_on_exit=False).save_customers(file_path)
+
+    storage = SqliteStorage(file_path)
+    bank = Bank(save_on_exit=False, storage=storage)
+    bank.load_customers()
+    assert bank.remove_customer("Bob")
+    assert not bank.has_customer("Bob")
+    assert bank.find_account(1) is None
+    assert bank.add_account(1, bank.login("Alice", "123"))
+    storage.close()
+
+
+def test_bank_json_to_sqlite(tmp_path):
+    save_customers(get_customer_list(), tmp_path / "bank.json")
+    bank = Bank(save_on_exit=False)
+    bank.load_customers(str(tmp_path / "bank.json"))
+    assert bank.save_customers(str(tmp_path / "bank.db"))
+
+    storage = SqliteStorage(str(tmp_path / "bank.db"))
+    assert len(storage.load()) == 2
+    storage.close()
+
+
+def test_bank_save_on_exit_to_lazy_storage(tmp_path):
+    file_path = str(tmp_path / "bank.db")
+    Bank(get_customer_list(), save_on_exit=False).save_customers(file_path)
+
+    bank = Bank(save_on_exit=False)
+    assert bank.load_customers(file_path)
+    assert bank.transfer(1, 3, 50, bank.login("Bob", "123"))
+    bank._save_on_exit(str(tmp_path / "bank.json"))
+
+    assert not (tmp_path / "bank.json").exists()
+    storage = SqliteStorage(file_path)
+    assert sorted(customer.name for customer in storage.load()) == ["alice", "bob"]
+    assert storage.get_customer("alice").accounts[0].balance == 350
+    storage.close()
+
+
+def test_iter_customers(storage, monkeypatch):
+    monkeypatch.setattr("bank_app.parser_sqlite.ITER_BATCH_SIZE", 1)
+    customers = get_customer_list() + [Customer("Carol", "hash", hash_password=False)]
+    storage.save(customers)
+    assert [c.name for c in storage.iter_customers()] == ["alice", "bob", "carol"]
+    assert {c.name: c.to_json() for c in storage.iter_customers()} == {c.name: c.to_json() for c in customers}
+
+
+def test_bank_export_unloaded(tmp_path):
+    file_path = str(tmp_path / "bank.db")
+    Bank(get_customer_list(), save_on_exit=False).save_customers(file_path)
+
+    bank = Bank(save_on_exit=False)
+    assert bank.load_customers(file_path)
+    assert bank.add_customer("Carol", "456")
+    assert bank.export_accounts(str(tmp_path / "accounts.csv")) == 4
+    assert bank.export_customers(str(tmp_path / "customers.csv"), names=["Alice"]) == 1
+    assert [customer.name for customer in bank.customers] == ["carol", "alice"]
+    bank.storage.close()
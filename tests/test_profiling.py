@@ -0,0 +1,66 @@
+import pytest
+
+from bank_app.account import Account
+from bank_app.bank import Bank
+from bank_app.customer import Customer
+from bank_app.profiling import Profiler
+
+
+def get_profiled_bank():
+    bob = Customer("Bob", "hash", hash_password=False)
+    bob.accounts = [Account(1, 100)]
+    bank = Bank([bob], save_on_exit=False)
+    bank.current_user = bob
+    return bank
+
+
+class TestProfiler:
+    def test_timing(self, tmp_path):
+        bank = get_profiled_bank()
+        profiler = bank.enable_profiling(["deposit", "get_account"], log_dir=tmp_path)
+        assert bank.profiler is profiler
+        for _ in range(5):
+            assert bank.deposit(1, 1)
+        report_path = bank.disable_profiling()
+
+        assert bank.profiler is None
+        assert "deposit" not in bank.__dict__
+        report = report_path.read_text()
+        assert "deposit" in report
+        # get_account is called by deposit, so its time is part of the deposits
+        assert "\nget_account" not in report
+        assert bank.get_account(1).balance == 105
+
+    def test_cprofile(self, tmp_path):
+        bank = get_profiled_bank()
+        with bank.enable_profiling(["deposit"], mode="cprofile", log_dir=tmp_path) as profiler:
+            bank.deposit(1, 1)
+        assert profiler.report_path.with_suffix(".prof").exists()
+        assert "balance_add" in profiler.report_path.read_text()
+
+    def test_tracemalloc(self, tmp_path):
+        bank = get_profiled_bank()
+        with Profiler(bank, ["deposit"], mode="tracemalloc", log_dir=tmp_path) as profiler:
+            bank.deposit(1, 1)
+        report = profiler.report_path.read_text()
+        assert "deposit" in report
+        assert "Largest allocations" in report
+
+    def test_sample(self, tmp_path):
+        bank = get_profiled_bank()
+        with Profiler(bank, ["deposit"], sample=0, log_dir=tmp_path) as profiler:
+            bank.deposit(1, 1)
+        assert "\ndeposit" not in profiler.report_path.read_text()
+
+    def test_enable_twice(self, tmp_path):
+        bank = get_profiled_bank()
+        first = bank.enable_profiling(["deposit"], log_dir=tmp_path)
+        bank.enable_profiling(["withdraw"], log_dir=tmp_path)
+        assert not first.active
+        assert "deposit" not in bank.__dict__
+        bank.disable_profiling()
+        assert bank.disable_profiling() is None
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValueError):
+            Profiler(get_profiled_bank(), mode="perf")
@@ -0,0 +1,77 @@
+from bank_app.customer import Customer
+from bank_app.session import SessionTable
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def get_table(ttl: float = 10):
+    clock = Clock()
+    return SessionTable(ttl, clock), clock
+
+
+class TestSessionTable:
+    def test_create(self):
+        table, _ = get_table()
+        bob = Customer("Bob", "hash", hash_password=False)
+        token = table.create(bob)
+        assert isinstance(token, str)
+        assert table.get(token) is bob
+
+    def test_create_unique(self):
+        table, _ = get_table()
+        bob = Customer("Bob", "hash", hash_password=False)
+        assert table.create(bob) != table.create(bob)
+        assert len(table) == 2
+
+    def test_get_unknown(self):
+        table, _ = get_table()
+        assert table.get("unknown") is None
+
+    def test_get_expired(self):
+        table, clock = get_table()
+        token = table.create(Customer("Bob", "hash", hash_password=False))
+        clock.now = 10
+        assert table.get(token) is None
+        assert len(table) == 0
+
+    def test_get_extends(self):
+        table, clock = get_table()
+        bob = Customer("Bob", "hash", hash_password=False)
+        token = table.create(bob)
+        clock.now = 9
+        assert table.get(token) is bob
+        clock.now = 18
+        assert table.get(token) is bob
+
+    def test_remove(self):
+        table, _ = get_table()
+        token = table.create(Customer("Bob", "hash", hash_password=False))
+        assert table.remove(token)
+        assert table.remove(token) is False
+        assert table.get(token) is None
+
+    def test_remove_customer(self):
+        table, _ = get_table()
+        bob = Customer("Bob", "hash", hash_password=False)
+        alice = Customer("Alice", "hash", hash_password=False)
+        tokens = [table.create(bob), table.create(bob)]
+        alice_token = table.create(alice)
+        assert table.remove_customer(bob) == 2
+        assert all(table.get(token) is None for token in tokens)
+        assert table.get(alice_token) is alice
+
+    def test_evict_expired(self):
+        table, clock = get_table()
+        first = table.create(Customer("Bob", "hash", hash_password=False))
+        clock.now = 5
+        second = table.create(Customer("Alice", "hash", hash_password=False))
+        clock.now = 12
+        assert table.evict_expired() == 1
+        assert table.get(first) is None
+        assert table.get(second) is not None